@@ -11,26 +11,64 @@ from aiogram.types import (
 )
 
 from app.handlers.voice import register_voice_handlers
-from app.i18n import t, set_user_language, LangCode
+from app.user_store import preload_user
+from app.i18n import (
+    SPEECH_AUTO,
+    t,
+    set_user_language,
+    set_user_speech_language,
+    LangCode,
+)
 
 logger = logging.getLogger(__name__)
 
 
+LANGUAGE_LABELS: dict[LangCode, str] = {
+    "en": "English 🇬🇧",
+    "uk": "Українська 🇺🇦",
+    "ru": "Русский 🇷🇺",
+}
+
+
 def get_language_keyboard() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(
         inline_keyboard=[
             [
-                InlineKeyboardButton(text="English 🇬🇧", callback_data="lang:en"),
-                InlineKeyboardButton(text="Українська 🇺🇦", callback_data="lang:uk"),
-                InlineKeyboardButton(text="Русский 🇷🇺", callback_data="lang:ru"),
+                InlineKeyboardButton(text=label, callback_data=f"lang:{lang}")
+                for lang, label in LANGUAGE_LABELS.items()
             ]
         ]
     )
 
 
+def get_speech_language_keyboard(user_id: int | None) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton(text=label, callback_data=f"speech:{lang}")
+                for lang, label in LANGUAGE_LABELS.items()
+            ],
+            [
+                InlineKeyboardButton(
+                    text=t(user_id, "speech_language_auto_button"),
+                    callback_data=f"speech:{SPEECH_AUTO}",
+                )
+            ],
+        ]
+    )
+
+
 def create_dispatcher(*, ffmpeg_path: str | Path | None = None) -> Dispatcher:
     dp = Dispatcher()
 
+    @dp.update.outer_middleware()
+    async def load_user_languages(handler, event, data):
+        # языки пользователя — в кэш заранее: t() не ходит в SQLite/Redis
+        user = data.get("event_from_user")
+        if user is not None:
+            await preload_user(user.id)
+        return await handler(event, data)
+
     @dp.message(CommandStart())
     async def cmd_start(message: Message):
         user = message.from_user
@@ -66,6 +104,21 @@ def create_dispatcher(*, ffmpeg_path: str | Path | None = None) -> Dispatcher:
             reply_markup=get_language_keyboard(),
         )
 
+    @dp.message(Command("speech"))
+    async def cmd_speech(message: Message):
+        user = message.from_user
+        user_id = user.id if user else None
+
+        logger.info(
+            "User %s requested /speech",
+            user_id,
+        )
+
+        await message.answer(
+            t(user_id, "choose_speech_language"),
+            reply_markup=get_speech_language_keyboard(user_id),
+        )
+
     @dp.message(F.text)
     async def echo(message: Message):
         logger.debug("Text message received: %r", message.text)
@@ -101,6 +154,34 @@ def create_dispatcher(*, ffmpeg_path: str | Path | None = None) -> Dispatcher:
             # приветствие на выбранном языке
             await callback.message.answer(t(user_id, "start_greeting"))
 
+    @dp.callback_query(F.data.startswith("speech:"))
+    async def on_speech_language_chosen(callback: CallbackQuery):
+        user = callback.from_user
+        user_id = user.id if user else None
+
+        raw = callback.data.split(":", 1)[1] if callback.data else SPEECH_AUTO
+        if raw not in LANGUAGE_LABELS:
+            raw = SPEECH_AUTO
+
+        if user_id is not None:
+            set_user_speech_language(user_id, raw)
+
+        await callback.answer()
+
+        if callback.message:
+            await callback.message.edit_reply_markup(reply_markup=None)
+
+            if raw == SPEECH_AUTO:
+                await callback.message.answer(t(user_id, "speech_language_auto"))
+            else:
+                await callback.message.answer(
+                    t(
+                        user_id,
+                        "speech_language_set",
+                        language=LANGUAGE_LABELS[raw],  # type: ignore[index]
+                    )
+                )
+
     # подключаем модуль с voice-логикой
     register_voice_handlers(dp, ffmpeg_path=ffmpeg_path)
 
@@ -15,6 +15,25 @@ load_dotenv()
 class TranscriberBackend(str, Enum):
     WHISPER = "whisper"
     DEEPGRAM = "deepgram"
+    FASTER_WHISPER = "faster-whisper"  # CTranslate2, int8 на CPU
+
+
+class ModelLoadPolicy(str, Enum):
+    EAGER = "eager"  # грузим при старте и ждём (как раньше при импорте)
+    LAZY = "lazy"  # грузим на первом сообщении
+    BACKGROUND = "background"  # начинаем грузить при старте, не блокируя запуск
+
+
+class InferenceExecutorKind(str, Enum):
+    THREAD = "thread"
+    PROCESS = "process"
+    REMOTE = "remote"  # отдельный воркер-демон (worker.py), общий для процессов
+
+
+class UserStoreBackend(str, Enum):
+    SQLITE = "sqlite"  # файл с WAL, общий для процессов на одной машине
+    REDIS = "redis"  # общий для нескольких машин (нужен пакет redis)
+    MEMORY = "memory"  # как раньше: только в памяти процесса
 
 
 @dataclass
@@ -27,13 +46,154 @@ class Settings:
         Path | None
     )  # Path("/usr/local/bin/ffmpeg"), если переменная задана, None, если не задана
     log_level: str = "INFO"  # уровень логирования (строкой)
+    log_format: str = "text"  # text / json (JSON Lines)
+    log_max_bytes: int = 10 * 1024 * 1024  # ротация bot.log по размеру, 0 — нет
+    log_backup_count: int = 5
+    log_rotate_when: str | None = None  # "midnight", "H"... — ротация по времени
+    log_debug_sample_rate: float = 1.0  # доля DEBUG-записей, которые пишутся
+    log_queue_size: int = 10_000  # записей в очереди до фонового писателя
 
     # Deepgram
     dg_api_key: str | None = None  # ключ для Deepgram, может быть не задан
+    # можно подменить на локальный стенд
+    dg_api_url: str = "https://api.deepgram.com/v1/listen"
+    dg_timeout_s: float = 30.0
+    dg_connect_timeout_s: float = 5.0
+    dg_max_connections: int = 20
+    dg_max_keepalive_connections: int = 10
+    dg_keepalive_expiry_s: float = 60.0
+    dg_http2: bool = True
+    dg_max_in_flight: int = 8  # одновременных запросов к Deepgram
+    dg_passthrough: bool = True  # слать исходный файл, а не WAV после ffmpeg
+    dg_breaker_failures: int = 5  # ошибок подряд до размыкания цепи
+    dg_breaker_reset_s: float = 30.0  # через сколько пробовать снова
+    dg_hedge_enabled: bool = False  # параллельный Whisper, если Deepgram тормозит
+    dg_hedge_percentile: float = 95.0
+    dg_hedge_min_samples: int = 20  # меньше замеров — не хеджируем
+    dg_hedge_max_audio_s: float = 60.0  # длиннее — не хеджируем (дорого)
 
     # Webhook (optional secret path)
     webhook_secret: str | None = None
 
+    # Inference executor: где крутится Whisper, чтобы не блокировать event loop
+    inference_executor: InferenceExecutorKind = InferenceExecutorKind.THREAD
+    inference_workers: int = 1  # размер пула (для process — число копий модели)
+
+    # Whisper: модель, устройство, потоки torch и параметры декодирования
+    whisper_model: str = "small"  # tiny / base / small / medium / large-v3 ...
+    whisper_device: str | None = None  # None — выбирает whisper (cuda, если есть)
+    whisper_download_root: Path | None = None  # None — ~/.cache/whisper
+    whisper_load_policy: ModelLoadPolicy = ModelLoadPolicy.EAGER
+    torch_num_threads: int = 0  # intra-op; 0 — оставить дефолт torch
+    torch_interop_threads: int = 0  # inter-op; 0 — оставить дефолт torch
+    whisper_fp16: bool = False
+    whisper_beam_size: int = 5
+    whisper_temperature: float = 0.0
+    whisper_batching: bool = False  # пакетный инференс коротких клипов
+    whisper_batch_window_ms: float = 30.0  # сколько ждать попутчиков
+    whisper_batch_max_size: int = 8
+
+    # faster-whisper (CTranslate2): тип вычислений и потоки
+    fw_compute_type: str = "int8"  # int8 / int8_float16 / float16 / float32 ...
+    fw_cpu_threads: int = 0  # 0 — дефолт CTranslate2
+
+    # ffmpeg: сколько процессов конвертации одновременно и таймаут на один вызов
+    ffmpeg_max_concurrency: int = 4
+    ffmpeg_timeout_s: float = 120.0
+
+    # VAD: обрезка тишины перед распознаванием
+    vad_enabled: bool = True
+    vad_threshold_db: float = -50.0  # абсолютный порог "тишины" (dBFS)
+    vad_max_pause_s: float = 1.0  # длинные паузы внутри сжимаются до этого
+    vad_padding_s: float = 0.2  # запас вокруг речи, чтобы не резать слова
+
+    # Длинное аудио: нарезка на чанки и параллельное распознавание
+    chunking_enabled: bool = True
+    chunk_threshold_s: float = 180.0  # длиннее — режем на чанки
+    chunk_length_s: float = 60.0
+    chunk_overlap_s: float = 1.0
+    chunk_max_parallel: int = 4  # для Deepgram; Whisper ограничен INFERENCE_WORKERS
+
+    # Стриминг: заглушка + правки с частичным текстом (по желанию).
+    # Частичный текст — по готовым чанкам длинного аудио; streaming_chunk_s > 0
+    # режет ради правок и более короткие клипы, но чанк не видит контекста
+    # соседнего (condition_on_previous_text), и точность на стыках хуже
+    streaming_replies: bool = False
+    streaming_min_duration_s: float = 30.0  # короче — сразу финальный ответ
+    streaming_chunk_s: float = 0.0  # 0 — режем только от chunk_threshold_s
+    streaming_edit_interval_s: float = 2.0  # не чаще одной правки в N секунд
+
+    # Кэш распознанных текстов (file_unique_id / sha256 содержимого)
+    cache_enabled: bool = True
+    cache_max_entries: int = 1000  # записей в памяти
+    cache_ttl_s: float = 7 * 24 * 3600.0
+    cache_db_path: Path | None = None  # SQLite-уровень, если задан
+    cache_db_max_entries: int = 100_000
+
+    # Планировщик задач: параллельные задачи и предел очереди
+    scheduler_workers: int = 2
+    scheduler_max_queue_depth: int = 50
+
+    # Webhook: быстрый ACK + фоновая обработка + дедупликация update_id
+    webhook_fast_ack: bool = True
+    webhook_max_tasks: int = 200
+    webhook_dedup_window: int = 10_000
+    webhook_drain_timeout_s: float = 30.0
+
+    # Метрики Prometheus: /metrics в webapp, отдельный порт для polling
+    metrics_enabled: bool = True
+    metrics_host: str = "0.0.0.0"
+    metrics_port: int = 0  # 0 — без отдельного листенера
+
+    # Трейсинг: спаны по этапам каждого сообщения -> log_dir/traces.jsonl
+    tracing_enabled: bool = True
+    tracing_min_duration_ms: float = 0.0  # писать только трейсы медленнее этого
+
+    # Хранилище выбранного языка: LRU в памяти + отложенная запись в бэкенд
+    user_store_backend: UserStoreBackend = UserStoreBackend.MEMORY
+    user_store_path: Path = Path("data/users.db")
+    user_store_redis_url: str | None = None
+    user_store_cache_size: int = 10_000
+    user_store_cache_ttl_s: float = 30.0  # задержка видимости из других процессов
+    user_store_flush_interval_s: float = 1.0
+
+    # Воркер-демон распознавания (INFERENCE_EXECUTOR=remote, worker.py)
+    worker_address: str = "127.0.0.1:8765"  # host:port или unix:/path/to.sock
+    worker_timeout_s: float = 600.0  # на один запрос, включая очередь воркера
+    worker_max_queue: int = 100  # ожидающих задач в воркере, дальше — отказ
+    worker_pcm_format: str = "s16"  # s16 (вдвое меньше трафика) или f32
+
+    # Потоковая загрузка: файл из Telegram сразу идёт в stdin ffmpeg
+    stream_download: bool = True
+    stream_chunk_size: int = 64 * 1024
+
+    # Роутер задач: правила выбора бэкенда/модели по метаданным Telegram
+    # (см. app/transcription/routing.py); пусто — всё идёт в TRANSCRIBER_BACKEND
+    routing_rules: str = ""
+
+    # Декодер аудио: pyav (libav* в процессе, без запуска ffmpeg на каждое
+    # сообщение) или ffmpeg; auto — pyav, если пакет av установлен.
+    # In-process декодируются только файлы до audio_decoder_max_bytes,
+    # большие идут потоком в ffmpeg (там запуск процесса — копейки)
+    audio_decoder: str = "auto"
+    audio_decoder_max_bytes: int = 2 * 1024 * 1024
+
+    # Подсказка языка речи Whisper/Deepgram: без неё Whisper тратит лишний
+    # проход декодера на определение языка по первому 30-с окну.
+    # transcribe_language — язык по умолчанию (None — автоопределение),
+    # для задачи его подменяет язык пользователя.
+    # language_hint: speech (по умолчанию) — только явный /speech; ui — ещё
+    # и язык интерфейса (/language), если /speech не выбран: язык меню
+    # не обязан совпадать с языком речи; off — не подсказывать
+    transcribe_language: str | None = None
+    language_hint: str = "speech"
+
+    # Повтор неудачного прогрева (webhook-режим): пауза растёт от
+    # warmup_retry_initial_s вдвое до warmup_retry_max_s, пока прогрев
+    # не пройдёт — иначе /ready остался бы 503 навсегда
+    warmup_retry_initial_s: float = 1.0
+    warmup_retry_max_s: float = 60.0
+
 
 def _str_to_bool(value: str | None, *, default: bool = False) -> bool:
     """
@@ -53,6 +213,41 @@ def _str_to_bool(value: str | None, *, default: bool = False) -> bool:
     return default
 
 
+def _env_int(name: str, default: int, *, minimum: int | None = None) -> int:
+    """
+    Читает целое число из переменной окружения.
+    Если значение не задано или кривое — возвращаем default.
+    """
+    raw = os.getenv(name)
+    if raw is None or not raw.strip():
+        return default
+
+    try:
+        value = int(raw.strip())
+    except ValueError:
+        return default
+
+    if minimum is not None and value < minimum:
+        return minimum
+    return value
+
+
+def _env_float(name: str, default: float, *, minimum: float | None = None) -> float:
+    """То же, что _env_int, но для дробных значений (таймауты и т.п.)."""
+    raw = os.getenv(name)
+    if raw is None or not raw.strip():
+        return default
+
+    try:
+        value = float(raw.strip())
+    except ValueError:
+        return default
+
+    if minimum is not None and value < minimum:
+        return minimum
+    return value
+
+
 def get_settings() -> Settings:
     # 1. Обязательный токен
     token = os.getenv("BOT_TOKEN", "")
@@ -62,7 +257,7 @@ def get_settings() -> Settings:
             "BOT_TOKEN=твой_токен_от_@BotFather"
         )
 
-    backend_raw = os.getenv("TRANSCRIBER_BACKEND", "whisper").lower()
+    backend_raw = os.getenv("TRANSCRIBER_BACKEND", "whisper").lower().replace("_", "-")
     try:
         transcriber_backend = TranscriberBackend(backend_raw)
     except ValueError:
@@ -102,9 +297,185 @@ def get_settings() -> Settings:
             "DG_API_KEY=твоя_строка_ключа_Deepgram"
         )
 
+    dg_api_url = (
+        os.getenv("DG_API_URL") or "https://api.deepgram.com/v1/listen"
+    ).strip()
+    dg_timeout_s = _env_float("DG_TIMEOUT_S", 30.0, minimum=1.0)
+    dg_connect_timeout_s = _env_float("DG_CONNECT_TIMEOUT_S", 5.0, minimum=0.5)
+    dg_max_connections = _env_int("DG_MAX_CONNECTIONS", 20, minimum=1)
+    dg_max_keepalive_connections = _env_int("DG_MAX_KEEPALIVE", 10, minimum=0)
+    dg_keepalive_expiry_s = _env_float("DG_KEEPALIVE_EXPIRY_S", 60.0, minimum=0.0)
+    dg_http2 = _str_to_bool(os.getenv("DG_HTTP2"), default=True)
+    dg_max_in_flight = _env_int("DG_MAX_IN_FLIGHT", 8, minimum=1)
+    dg_passthrough = _str_to_bool(os.getenv("DG_PASSTHROUGH"), default=True)
+    dg_breaker_failures = _env_int("DG_BREAKER_FAILURES", 5, minimum=1)
+    dg_breaker_reset_s = _env_float("DG_BREAKER_RESET_S", 30.0, minimum=1.0)
+    dg_hedge_enabled = _str_to_bool(os.getenv("DG_HEDGE"), default=False)
+    dg_hedge_percentile = min(
+        _env_float("DG_HEDGE_PERCENTILE", 95.0, minimum=50.0), 99.9
+    )
+    dg_hedge_min_samples = _env_int("DG_HEDGE_MIN_SAMPLES", 20, minimum=1)
+    dg_hedge_max_audio_s = _env_float("DG_HEDGE_MAX_AUDIO_S", 60.0, minimum=0.0)
+
     # 6. Optional webhook secret
     webhook_secret = os.getenv("WEBHOOK_SECRET")
 
+    # 7. Inference executor (thread/process pool для Whisper)
+    executor_raw = os.getenv("INFERENCE_EXECUTOR", "thread").strip().lower()
+    try:
+        inference_executor = InferenceExecutorKind(executor_raw)
+    except ValueError:
+        inference_executor = InferenceExecutorKind.THREAD
+
+    inference_workers = _env_int("INFERENCE_WORKERS", 1, minimum=1)
+
+    # 8. Whisper
+    whisper_model = os.getenv("WHISPER_MODEL", "small").strip() or "small"
+    whisper_device = (os.getenv("WHISPER_DEVICE") or "").strip() or None
+    whisper_download_root_env = os.getenv("WHISPER_DOWNLOAD_ROOT")
+    whisper_download_root = (
+        Path(whisper_download_root_env).expanduser().resolve()
+        if whisper_download_root_env
+        else None
+    )
+    load_policy_raw = os.getenv("WHISPER_LOAD_POLICY", "eager").strip().lower()
+    try:
+        whisper_load_policy = ModelLoadPolicy(load_policy_raw)
+    except ValueError:
+        whisper_load_policy = ModelLoadPolicy.EAGER
+    torch_num_threads = _env_int("TORCH_NUM_THREADS", 0, minimum=0)
+    torch_interop_threads = _env_int("TORCH_INTEROP_THREADS", 0, minimum=0)
+    whisper_fp16 = _str_to_bool(os.getenv("WHISPER_FP16"), default=False)
+    whisper_beam_size = _env_int("WHISPER_BEAM_SIZE", 5, minimum=1)
+    whisper_temperature = _env_float("WHISPER_TEMPERATURE", 0.0, minimum=0.0)
+    whisper_batching = _str_to_bool(os.getenv("WHISPER_BATCHING"), default=False)
+    whisper_batch_window_ms = _env_float("WHISPER_BATCH_WINDOW_MS", 30.0, minimum=1.0)
+    whisper_batch_max_size = _env_int("WHISPER_BATCH_MAX_SIZE", 8, minimum=1)
+    fw_compute_type = (os.getenv("FW_COMPUTE_TYPE") or "int8").strip().lower()
+    fw_cpu_threads = _env_int("FW_CPU_THREADS", 0, minimum=0)
+
+    # 9. Лимиты ffmpeg
+    ffmpeg_max_concurrency = _env_int("FFMPEG_MAX_CONCURRENCY", 4, minimum=1)
+    ffmpeg_timeout_s = _env_float("FFMPEG_TIMEOUT_S", 120.0, minimum=1.0)
+
+    # 10. VAD
+    vad_enabled = _str_to_bool(os.getenv("VAD_ENABLED"), default=True)
+    vad_threshold_db = _env_float("VAD_THRESHOLD_DB", -50.0)
+    vad_max_pause_s = _env_float("VAD_MAX_PAUSE_S", 1.0, minimum=0.1)
+    vad_padding_s = _env_float("VAD_PADDING_S", 0.2, minimum=0.0)
+
+    # 11. Чанкинг длинного аудио
+    chunking_enabled = _str_to_bool(os.getenv("CHUNKING_ENABLED"), default=True)
+    chunk_threshold_s = _env_float("CHUNK_THRESHOLD_S", 180.0, minimum=1.0)
+    chunk_length_s = _env_float("CHUNK_LENGTH_S", 60.0, minimum=5.0)
+    chunk_overlap_s = _env_float("CHUNK_OVERLAP_S", 1.0, minimum=0.0)
+    chunk_max_parallel = _env_int("CHUNK_MAX_PARALLEL", 4, minimum=1)
+
+    # 12. Стриминг частичных результатов
+    streaming_replies = _str_to_bool(os.getenv("STREAMING_REPLIES"), default=False)
+    streaming_min_duration_s = _env_float("STREAMING_MIN_DURATION_S", 30.0, minimum=0.0)
+    streaming_chunk_s = _env_float("STREAMING_CHUNK_S", 0.0, minimum=0.0)
+    if 0 < streaming_chunk_s < 5.0:
+        streaming_chunk_s = 5.0
+    streaming_edit_interval_s = _env_float(
+        "STREAMING_EDIT_INTERVAL_S", 2.0, minimum=0.5
+    )
+
+    # 13. Кэш транскрипций
+    cache_enabled = _str_to_bool(os.getenv("CACHE_ENABLED"), default=True)
+    cache_max_entries = _env_int("CACHE_MAX_ENTRIES", 1000, minimum=1)
+    cache_ttl_s = _env_float("CACHE_TTL_S", 7 * 24 * 3600.0, minimum=1.0)
+    cache_db_path_env = os.getenv("CACHE_DB_PATH")
+    cache_db_path = (
+        Path(cache_db_path_env).expanduser().resolve() if cache_db_path_env else None
+    )
+    cache_db_max_entries = _env_int("CACHE_DB_MAX_ENTRIES", 100_000, minimum=1)
+
+    # 14. Планировщик задач распознавания
+    scheduler_workers = _env_int("SCHEDULER_WORKERS", 2, minimum=1)
+    scheduler_max_queue_depth = _env_int("SCHEDULER_MAX_QUEUE_DEPTH", 50, minimum=1)
+
+    # 15. Webhook: фоновая обработка апдейтов
+    webhook_fast_ack = _str_to_bool(os.getenv("WEBHOOK_FAST_ACK"), default=True)
+    webhook_max_tasks = _env_int("WEBHOOK_MAX_TASKS", 200, minimum=1)
+    webhook_dedup_window = _env_int("WEBHOOK_DEDUP_WINDOW", 10_000, minimum=1)
+    webhook_drain_timeout_s = _env_float("WEBHOOK_DRAIN_TIMEOUT_S", 30.0, minimum=0.0)
+
+    # 16. Метрики
+    metrics_enabled = _str_to_bool(os.getenv("METRICS_ENABLED"), default=True)
+    metrics_host = os.getenv("METRICS_HOST") or "0.0.0.0"
+    metrics_port = _env_int("METRICS_PORT", 0, minimum=0)
+
+    # 17. Трейсинг
+    tracing_enabled = _str_to_bool(os.getenv("TRACING_ENABLED"), default=True)
+    tracing_min_duration_ms = _env_float("TRACING_MIN_DURATION_MS", 0.0, minimum=0.0)
+
+    # 18. Логирование: формат, ротация, сэмплирование
+    log_format = (os.getenv("LOG_FORMAT") or "text").strip().lower()
+    if log_format not in ("text", "json"):
+        log_format = "text"
+    log_max_bytes = _env_int("LOG_MAX_BYTES", 10 * 1024 * 1024, minimum=0)
+    log_backup_count = _env_int("LOG_BACKUP_COUNT", 5, minimum=0)
+    log_rotate_when = (os.getenv("LOG_ROTATE_WHEN") or "").strip() or None
+    log_debug_sample_rate = min(
+        1.0, _env_float("LOG_DEBUG_SAMPLE_RATE", 1.0, minimum=0.0)
+    )
+    log_queue_size = _env_int("LOG_QUEUE_SIZE", 10_000, minimum=0)
+
+    # 19. Хранилище языка пользователей
+    # по умолчанию — память: файл базы создаётся только по явному выбору
+    user_store_raw = os.getenv("USER_STORE_BACKEND", "memory").strip().lower()
+    try:
+        user_store_backend = UserStoreBackend(user_store_raw)
+    except ValueError:
+        user_store_backend = UserStoreBackend.MEMORY
+    user_store_path = (
+        Path(os.getenv("USER_STORE_PATH") or "data/users.db").expanduser().resolve()
+    )
+    user_store_redis_url = os.getenv("USER_STORE_REDIS_URL") or None
+    user_store_cache_size = _env_int("USER_STORE_CACHE_SIZE", 10_000, minimum=1)
+    user_store_cache_ttl_s = _env_float("USER_STORE_CACHE_TTL_S", 30.0, minimum=0.0)
+    user_store_flush_interval_s = _env_float(
+        "USER_STORE_FLUSH_INTERVAL_S", 1.0, minimum=0.05
+    )
+
+    # 20. Воркер-демон распознавания
+    worker_address = (os.getenv("WORKER_ADDRESS") or "127.0.0.1:8765").strip()
+    worker_timeout_s = _env_float("WORKER_TIMEOUT_S", 600.0, minimum=1.0)
+    worker_max_queue = _env_int("WORKER_MAX_QUEUE", 100, minimum=0)
+    worker_pcm_format = (os.getenv("WORKER_PCM_FORMAT") or "s16").strip().lower()
+    if worker_pcm_format not in ("s16", "f32"):
+        worker_pcm_format = "s16"
+
+    # 21. Потоковая загрузка
+    stream_download = _str_to_bool(os.getenv("STREAM_DOWNLOAD"), default=True)
+    stream_chunk_size = _env_int("STREAM_CHUNK_SIZE", 64 * 1024, minimum=4096)
+
+    # 22. Роутер задач
+    routing_rules = (os.getenv("ROUTING_RULES") or "").strip()
+
+    # 23. Декодер аудио
+    audio_decoder = (os.getenv("AUDIO_DECODER") or "auto").strip().lower()
+    if audio_decoder not in ("auto", "pyav", "ffmpeg"):
+        audio_decoder = "auto"
+    audio_decoder_max_bytes = _env_int(
+        "AUDIO_DECODER_MAX_BYTES", 2 * 1024 * 1024, minimum=0
+    )
+
+    # 24. Подсказка языка речи
+    transcribe_language = (os.getenv("TRANSCRIBE_LANGUAGE") or "").strip().lower()
+    if transcribe_language == "auto":
+        transcribe_language = ""
+    language_hint = (os.getenv("LANGUAGE_HINT") or "speech").strip().lower()
+    if language_hint not in ("ui", "speech", "off"):
+        language_hint = "speech"
+
+    # 25. Повтор прогрева
+    warmup_retry_initial_s = _env_float("WARMUP_RETRY_INITIAL_S", 1.0, minimum=0.1)
+    warmup_retry_max_s = _env_float(
+        "WARMUP_RETRY_MAX_S", 60.0, minimum=warmup_retry_initial_s
+    )
+
     return Settings(
         bot_token=token,
         transcriber_backend=transcriber_backend,
@@ -113,5 +484,92 @@ def get_settings() -> Settings:
         ffmpeg_path=ffmpeg_path,
         log_level=log_level,
         dg_api_key=dg_api_key,
+        dg_api_url=dg_api_url,
+        dg_timeout_s=dg_timeout_s,
+        dg_connect_timeout_s=dg_connect_timeout_s,
+        dg_max_connections=dg_max_connections,
+        dg_max_keepalive_connections=dg_max_keepalive_connections,
+        dg_keepalive_expiry_s=dg_keepalive_expiry_s,
+        dg_http2=dg_http2,
+        dg_max_in_flight=dg_max_in_flight,
+        dg_passthrough=dg_passthrough,
+        dg_breaker_failures=dg_breaker_failures,
+        dg_breaker_reset_s=dg_breaker_reset_s,
+        dg_hedge_enabled=dg_hedge_enabled,
+        dg_hedge_percentile=dg_hedge_percentile,
+        dg_hedge_min_samples=dg_hedge_min_samples,
+        dg_hedge_max_audio_s=dg_hedge_max_audio_s,
         webhook_secret=webhook_secret,
+        inference_executor=inference_executor,
+        inference_workers=inference_workers,
+        whisper_model=whisper_model,
+        whisper_device=whisper_device,
+        whisper_download_root=whisper_download_root,
+        whisper_load_policy=whisper_load_policy,
+        torch_num_threads=torch_num_threads,
+        torch_interop_threads=torch_interop_threads,
+        whisper_fp16=whisper_fp16,
+        whisper_beam_size=whisper_beam_size,
+        whisper_temperature=whisper_temperature,
+        whisper_batching=whisper_batching,
+        whisper_batch_window_ms=whisper_batch_window_ms,
+        whisper_batch_max_size=whisper_batch_max_size,
+        fw_compute_type=fw_compute_type,
+        fw_cpu_threads=fw_cpu_threads,
+        ffmpeg_max_concurrency=ffmpeg_max_concurrency,
+        ffmpeg_timeout_s=ffmpeg_timeout_s,
+        vad_enabled=vad_enabled,
+        vad_threshold_db=vad_threshold_db,
+        vad_max_pause_s=vad_max_pause_s,
+        vad_padding_s=vad_padding_s,
+        chunking_enabled=chunking_enabled,
+        chunk_threshold_s=chunk_threshold_s,
+        chunk_length_s=chunk_length_s,
+        chunk_overlap_s=chunk_overlap_s,
+        chunk_max_parallel=chunk_max_parallel,
+        streaming_replies=streaming_replies,
+        streaming_min_duration_s=streaming_min_duration_s,
+        streaming_chunk_s=streaming_chunk_s,
+        streaming_edit_interval_s=streaming_edit_interval_s,
+        cache_enabled=cache_enabled,
+        cache_max_entries=cache_max_entries,
+        cache_ttl_s=cache_ttl_s,
+        cache_db_path=cache_db_path,
+        cache_db_max_entries=cache_db_max_entries,
+        scheduler_workers=scheduler_workers,
+        scheduler_max_queue_depth=scheduler_max_queue_depth,
+        webhook_fast_ack=webhook_fast_ack,
+        webhook_max_tasks=webhook_max_tasks,
+        webhook_dedup_window=webhook_dedup_window,
+        webhook_drain_timeout_s=webhook_drain_timeout_s,
+        metrics_enabled=metrics_enabled,
+        metrics_host=metrics_host,
+        metrics_port=metrics_port,
+        tracing_enabled=tracing_enabled,
+        tracing_min_duration_ms=tracing_min_duration_ms,
+        log_format=log_format,
+        log_max_bytes=log_max_bytes,
+        log_backup_count=log_backup_count,
+        log_rotate_when=log_rotate_when,
+        log_debug_sample_rate=log_debug_sample_rate,
+        log_queue_size=log_queue_size,
+        user_store_backend=user_store_backend,
+        user_store_path=user_store_path,
+        user_store_redis_url=user_store_redis_url,
+        user_store_cache_size=user_store_cache_size,
+        user_store_cache_ttl_s=user_store_cache_ttl_s,
+        user_store_flush_interval_s=user_store_flush_interval_s,
+        worker_address=worker_address,
+        worker_timeout_s=worker_timeout_s,
+        worker_max_queue=worker_max_queue,
+        worker_pcm_format=worker_pcm_format,
+        stream_download=stream_download,
+        stream_chunk_size=stream_chunk_size,
+        routing_rules=routing_rules,
+        audio_decoder=audio_decoder,
+        audio_decoder_max_bytes=audio_decoder_max_bytes,
+        transcribe_language=transcribe_language or None,
+        language_hint=language_hint,
+        warmup_retry_initial_s=warmup_retry_initial_s,
+        warmup_retry_max_s=warmup_retry_max_s,
     )
@@ -0,0 +1,142 @@
+# app/handlers/streaming.py
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+from aiogram.types import Message
+
+logger = logging.getLogger(__name__)
+
+# Лимит Telegram на длину текста сообщения
+MAX_MESSAGE_LEN = 4096
+
+
+def _fit(text: str) -> str:
+    if len(text) <= MAX_MESSAGE_LEN:
+        return text
+    # для промежуточных правок показываем конец — он только что распознан
+    return "…" + text[-(MAX_MESSAGE_LEN - 1) :]
+
+
+def _split(text: str) -> list[str]:
+    """Финальный текст целиком: части до MAX_MESSAGE_LEN, по пробелу/переносу."""
+    parts: list[str] = []
+    while len(text) > MAX_MESSAGE_LEN:
+        cut = max(
+            text.rfind("\n", 0, MAX_MESSAGE_LEN), text.rfind(" ", 0, MAX_MESSAGE_LEN)
+        )
+        if cut <= 0:
+            cut = MAX_MESSAGE_LEN
+        parts.append(text[:cut])
+        text = text[cut:].lstrip()
+    if text or not parts:
+        parts.append(text)
+    return parts
+
+
+class ProgressiveReply:
+    """
+    Ответ-заглушка, который обновляется через edit_text по мере распознавания.
+
+    Правки склеиваются: не чаще одной в min_interval_s, в сообщение уходит
+    только самый свежий текст (Telegram ограничивает частоту edit'ов).
+    """
+
+    def __init__(self, message: Message, *, min_interval_s: float) -> None:
+        self._message = message
+        self._min_interval_s = min_interval_s
+        self._shown: str | None = message.text
+        self._pending: str | None = None
+        self._last_edit = time.monotonic()
+        self._flush_task: asyncio.Task | None = None
+        self._finalized = False
+
+    @classmethod
+    async def send(
+        cls,
+        reply_to: Message,
+        text: str,
+        *,
+        min_interval_s: float,
+    ) -> ProgressiveReply:
+        placeholder = await reply_to.reply(text)
+        return cls(placeholder, min_interval_s=min_interval_s)
+
+    async def update(self, text: str) -> None:
+        """Частичный текст. Ошибки Telegram не пробрасываются — это лишь прогресс."""
+        if self._finalized:
+            return
+
+        self._pending = _fit(text)
+        if self._flush_task is not None:
+            # правка уже запланирована — она возьмёт свежий _pending
+            return
+
+        delay = self._min_interval_s - (time.monotonic() - self._last_edit)
+        if delay <= 0:
+            await self._flush_pending()
+        else:
+            self._flush_task = asyncio.create_task(self._flush_later(delay))
+
+    async def _flush_later(self, delay: float) -> None:
+        try:
+            while True:
+                await asyncio.sleep(delay)
+                await self._flush_pending()
+                if self._pending is None:
+                    return
+                # пока шла правка, пришёл ещё текст
+                delay = self._min_interval_s
+        finally:
+            self._flush_task = None
+
+    async def _flush_pending(self) -> None:
+        text, self._pending = self._pending, None
+        if text is None or text == self._shown:
+            return
+
+        # отмечаем до await, чтобы параллельный update() не отправил вторую правку
+        self._last_edit = time.monotonic()
+        try:
+            await self._message.edit_text(text)
+            self._shown = text
+        except TelegramRetryAfter as e:
+            # промежуточную правку просто пропускаем, следующая догонит
+            logger.debug("Partial edit rate-limited, retry_after=%s", e.retry_after)
+        except TelegramBadRequest as e:
+            logger.debug("Partial edit rejected: %s", e)
+
+    async def finalize(self, text: str, **kwargs) -> None:
+        """
+        Финальный текст. Отменяет запланированные правки; при rate limit
+        ждёт и повторяет, при иной ошибке — отправляет текст ответом
+        на заглушку. Текст длиннее лимита Telegram уходит несколькими
+        сообщениями: первое — правкой заглушки, остальные — ответами на неё.
+        """
+        self._finalized = True
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+
+        first, *rest = _split(text)
+        if not await self._edit_final(first, **kwargs):
+            rest.insert(0, first)
+        for part in rest:
+            await self._message.reply(part, **kwargs)
+
+    async def _edit_final(self, text: str, **kwargs) -> bool:
+        for _ in range(2):
+            try:
+                await self._message.edit_text(text, **kwargs)
+                return True
+            except TelegramRetryAfter as e:
+                await asyncio.sleep(e.retry_after)
+            except TelegramBadRequest as e:
+                if "message is not modified" in str(e):
+                    return True
+                logger.warning("Final edit failed, sending a new reply: %s", e)
+                break
+        return False
@@ -1,71 +1,359 @@
+import dataclasses
+import hashlib
 import logging
+import time
+from collections.abc import AsyncIterator
 from datetime import datetime
 from io import BytesIO
 from pathlib import Path
 
-from aiogram import Dispatcher, F
+import aiofiles
+import numpy as np
+from aiogram import Bot, Dispatcher, F
 from aiogram.types import Message
 
-from app.utils.audio import convert_audio_bytes
-from app.transcription import transcribe
-from app.config import get_settings
-from app.i18n import t
+from app.utils.audio import (
+    SAMPLE_RATE,
+    convert_audio_stream_to_pcm_async,
+    convert_audio_to_pcm_async,
+    set_ffmpeg_concurrency,
+)
+from app.utils.av_decode import pyav_available
+from app.handlers.streaming import ProgressiveReply
+from app.transcription import cache_tag, transcribe_encoded, uses_passthrough
+from app.transcription.chunking import PartialCallback
+from app.transcription.routing import JobInfo, get_job_router
+from app.transcription.worker_client import WorkerBusyError
+from app.transcription.cache import (
+    content_cache_key,
+    content_digest_cache_key,
+    file_cache_key,
+    get_transcript_cache,
+)
+from app.utils.vad import trim_silence
+from app.config import Settings, get_settings
+from app.scheduler import QueueFullError, get_job_scheduler
+from app.metrics import DOWNLOAD_SECONDS, ERRORS_TOTAL, REPLY_SECONDS, record_audio
+from app.tracing import bind, set_attribute, span, trace
+from app.i18n import (
+    SPEECH_AUTO,
+    get_stored_user_language,
+    get_user_language,
+    get_user_speech_language,
+    t,
+)
 
 logger = logging.getLogger(__name__)
 
 settings = get_settings()
 
 
-async def transcribe_bytes(
+class TranscriptionFailed(Exception):
+    """
+    Ошибка пайплайна распознавания.
+
+    Хранит ключ i18n-сообщения и параметры, а не готовый текст:
+    один и тот же результат (например, из склеенной задачи кэша)
+    может уйти разным пользователям на разных языках.
+    """
+
+    def __init__(self, message_key: str, **params) -> None:
+        super().__init__(message_key)
+        self.message_key = message_key
+        self.params = params
+
+    def localized(self, user_id: int | None) -> str:
+        return t(user_id, self.message_key, **self.params)
+
+
+def _with_language_hint(job_settings: Settings, user_id: int | None) -> Settings:
+    """
+    Настройки задачи с языком речи пользователя (LANGUAGE_HINT): выбор
+    в /speech, иначе (LANGUAGE_HINT=ui) язык интерфейса, иначе
+    TRANSCRIBE_LANGUAGE. "/speech -> авто" — всегда автоопределение.
+    """
+    if settings.language_hint == "off":
+        return job_settings
+
+    speech = get_user_speech_language(user_id)
+    if speech == SPEECH_AUTO:
+        language = None
+    elif speech is not None:
+        language = speech
+    elif settings.language_hint == "ui":
+        language = (
+            get_stored_user_language(user_id) or job_settings.transcribe_language
+        )
+    else:
+        return job_settings
+
+    if language == job_settings.transcribe_language:
+        return job_settings
+    return dataclasses.replace(job_settings, transcribe_language=language)
+
+
+def _decode_in_process(size: int | None) -> bool:
+    """
+    Декодировать ли файл PyAV'ом в процессе (AUDIO_DECODER): только
+    небольшие файлы известного размера — для них запуск ffmpeg заметен,
+    а большие выгоднее качать потоком прямо в ffmpeg.
+    """
+    if settings.audio_decoder == "ffmpeg" or not pyav_available():
+        return False
+    return size is not None and 0 < size <= settings.audio_decoder_max_bytes
+
+
+async def _transcribe_raw(
     data: bytes,
     *,
     mime_type: str | None = None,
     filename: str | None = None,
     ffmpeg_path: str | Path | None = None,
     user_id: int | None = None,
+    on_partial: PartialCallback | None = None,
+    decoded: np.ndarray | None = None,
+    job_settings: Settings | None = None,
+    duration_s: float | None = None,
 ) -> str:
-    if not data:
-        return t(user_id, "empty_audio")
+    """
+    Конвертация + распознавание. Возвращает "сырой" текст (может быть пустым),
+    ошибки — через TranscriptionFailed.
 
-    logger.info(
-        "Starting audio processing: filename=%s, mime_type=%s, size=%d bytes",
-        filename,
-        mime_type,
-        len(data),
-    )
+    Локальная конвертация ленивая: Deepgram в passthrough-режиме получает
+    исходные байты, ffmpeg запускается только если нужен Whisper.
+
+    decoded — PCM, уже декодированный во время скачивания (потоковая загрузка);
+    тогда data не нужен и ffmpeg второй раз не запускается.
+
+    job_settings — настройки с бэкендом и моделью, выбранными роутером,
+    и языком речи пользователя для этой задачи (по умолчанию — глобальные).
+
+    duration_s — длительность из метаданных Telegram (порог хеджа Deepgram
+    в passthrough-режиме, где файл локально не декодируется).
+    """
+    job_settings = job_settings or settings
+
+    if not data and decoded is None:
+        raise TranscriptionFailed("empty_audio")
+
+    if decoded is None:
+        logger.info(
+            "Starting audio processing: filename=%s, mime_type=%s, size=%d bytes",
+            filename,
+            mime_type,
+            len(data),
+        )
+
+    async def decode() -> np.ndarray:
+        with span("decode", input_size=len(data)) as decode_span:
+            try:
+                pcm = await convert_audio_to_pcm_async(
+                    data,
+                    ffmpeg_path=ffmpeg_path,
+                    timeout_s=settings.ffmpeg_timeout_s,
+                    mime_type=mime_type,
+                    in_process=_decode_in_process(len(data)),
+                )
+            except Exception as e:
+                logger.exception("Error converting audio using ffmpeg")
+                raise TranscriptionFailed("ffmpeg_convert_error", error=e) from e
+            decode_span.set_attribute("audio_s", round(pcm.size / SAMPLE_RATE, 3))
+
+        logger.info(
+            "Audio decoded to PCM: filename=%s, duration=%.2fs",
+            filename,
+            pcm.size / SAMPLE_RATE,
+        )
+        return pcm
+
+    async def load_pcm() -> np.ndarray | None:
+        """ffmpeg + VAD. Нужна только Whisper'у (в т.ч. как fallback Deepgram)."""
+        pcm = decoded if decoded is not None else await decode()
+
+        if not settings.vad_enabled:
+            return pcm
+
+        with span("vad") as vad_span:
+            pcm, vad_stats = trim_silence(
+                pcm,
+                threshold_db=settings.vad_threshold_db,
+                max_pause_s=settings.vad_max_pause_s,
+                padding_s=settings.vad_padding_s,
+            )
+            vad_span.set_attribute("original_s", round(vad_stats.original_s, 3))
+            vad_span.set_attribute("kept_s", round(vad_stats.kept_s, 3))
+        logger.info(
+            "VAD: filename=%s, original=%.2fs, kept=%.2fs, removed=%.2fs "
+            "(leading=%.2fs, trailing=%.2fs, pauses=%.2fs)",
+            filename,
+            vad_stats.original_s,
+            vad_stats.kept_s,
+            vad_stats.removed_s,
+            vad_stats.leading_s,
+            vad_stats.trailing_s,
+            vad_stats.pauses_s,
+        )
+
+        if vad_stats.all_silent:
+            # чистая тишина — сразу "текст не распознан", без инференса
+            return None
+        return pcm
 
     try:
-        wav_bytes = convert_audio_bytes(data, ffmpeg_path=ffmpeg_path)
+        with span(
+            "transcribe",
+            backend=job_settings.transcriber_backend.value,
+            passthrough=uses_passthrough(job_settings),
+        ) as transcribe_span:
+            text = await transcribe_encoded(
+                data,
+                mime_type=mime_type or "application/octet-stream",
+                load_pcm=load_pcm,
+                settings=job_settings,
+                user_id=user_id,
+                on_partial=on_partial,
+                duration_s=duration_s,
+            )
+            transcribe_span.set_attribute("text_len", len(text or ""))
+    except TranscriptionFailed:
+        raise
+    except WorkerBusyError as e:
+        # воркер-демон перегружен — для пользователя это та же занятость
+        raise QueueFullError(str(e)) from e
     except Exception as e:
-        logger.exception("Error converting audio using ffmpeg")
-        return t(user_id, "ffmpeg_convert_error", error=e)
+        logger.exception("Error during Whisper transcription")
+        raise TranscriptionFailed("whisper_transcription_error") from e
 
     logger.info(
-        "Audio converted to WAV: filename=%s, wav_size=%d bytes",
+        "Transcription completed: filename=%s, text_len=%d",
         filename,
-        len(wav_bytes),
+        len(text) if text else 0,
     )
 
-    try:
-        text = await transcribe(
-            wav_bytes,
-            settings=settings,
-            user_id=user_id,
-        )
-    except Exception:
-        logger.exception("Error during Whisper transcription")
-        return t(user_id, "whisper_transcription_error")
+    return text or ""
+
+
+async def _iter_telegram_file(
+    bot: Bot,
+    file_id: str,
+    *,
+    chunk_size: int,
+    timeout: int = 30,
+) -> AsyncIterator[bytes]:
+    """
+    Файл из Telegram кусками по мере скачивания — как bot.download, только
+    без промежуточного BytesIO. С локальным Bot API сервером файл уже на диске.
+    """
+    file = await bot.get_file(file_id)
+    api = bot.session.api
+
+    if api.is_local:
+        path = api.wrap_local_file.to_local(file.file_path)
+        async with aiofiles.open(path, "rb") as f:
+            while chunk := await f.read(chunk_size):
+                yield chunk
+        return
+
+    async for chunk in bot.session.stream_content(
+        url=api.file_url(bot.token, file.file_path),
+        timeout=timeout,
+        chunk_size=chunk_size,
+        raise_for_status=True,
+    ):
+        yield chunk
+
+
+async def _download_and_decode(
+    bot: Bot,
+    file_id: str,
+    *,
+    filename: str,
+    ffmpeg_path: str | Path | None = None,
+) -> tuple[np.ndarray, str]:
+    """
+    Потоковая загрузка: куски из Telegram сразу уходят в stdin ffmpeg,
+    так что декодирование идёт параллельно со скачиванием, а в памяти
+    вместо копий файла — только текущий кусок.
+
+    Возвращает PCM и sha256 файла (для ключа кэша по содержимому).
+    Ошибки скачивания пробрасываются как есть, ошибки декодирования —
+    через TranscriptionFailed, как в _transcribe_raw.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    started = time.perf_counter()
+    download_s: float | None = None
+
+    async def chunks() -> AsyncIterator[bytes]:
+        nonlocal size, download_s
+        async for chunk in _iter_telegram_file(
+            bot, file_id, chunk_size=settings.stream_chunk_size
+        ):
+            digest.update(chunk)
+            size += len(chunk)
+            yield chunk
+        download_s = time.perf_counter() - started
+        DOWNLOAD_SECONDS.observe(download_s)
+
+    with span("download_decode") as current:
+        try:
+            pcm = await convert_audio_stream_to_pcm_async(
+                chunks(),
+                ffmpeg_path=ffmpeg_path,
+                timeout_s=settings.ffmpeg_timeout_s,
+            )
+        except ValueError as e:
+            raise TranscriptionFailed("empty_audio") from e
+        except RuntimeError as e:
+            logger.exception("Error converting audio using ffmpeg")
+            raise TranscriptionFailed("ffmpeg_convert_error", error=e) from e
+        finally:
+            current.set_attribute("size", size)
+            if download_s is not None:
+                current.set_attribute("download_ms", round(download_s * 1000, 3))
+        current.set_attribute("audio_s", round(pcm.size / SAMPLE_RATE, 3))
 
     logger.info(
-        "Transcription completed: filename=%s, text_len=%d",
+        "Audio streamed and decoded: filename=%s, size=%d bytes, duration=%.2fs, "
+        "download=%.2fs, total=%.2fs",
         filename,
-        len(text) if text else 0,
+        size,
+        pcm.size / SAMPLE_RATE,
+        download_s or 0.0,
+        time.perf_counter() - started,
     )
+    return pcm, digest.hexdigest()
+
 
-    if not text.strip():
+def _reply_text(user_id: int | None, raw_text: str) -> str:
+    if not raw_text.strip():
         return t(user_id, "no_text_recognized")
+    return raw_text
+
+
+async def transcribe_bytes(
+    data: bytes,
+    *,
+    mime_type: str | None = None,
+    filename: str | None = None,
+    ffmpeg_path: str | Path | None = None,
+    user_id: int | None = None,
+) -> str:
+    try:
+        with trace("transcribe_bytes", filename=filename, input_size=len(data)):
+            raw_text = await _transcribe_raw(
+                data,
+                mime_type=mime_type,
+                filename=filename,
+                ffmpeg_path=ffmpeg_path,
+                user_id=user_id,
+                job_settings=_with_language_hint(settings, user_id),
+            )
+    except TranscriptionFailed as e:
+        ERRORS_TOTAL.inc(type=e.message_key)
+        return e.localized(user_id)
 
-    return text
+    return _reply_text(user_id, raw_text)
 
 
 def register_voice_handlers(
@@ -73,6 +361,8 @@ def register_voice_handlers(
     *,
     ffmpeg_path: str | Path | None = None,
 ) -> None:
+    set_ffmpeg_concurrency(settings.ffmpeg_max_concurrency)
+
     @dp.message(F.voice | F.audio | F.video_note)
     async def on_voice(message: Message):
         user = message.from_user
@@ -88,14 +378,16 @@ def register_voice_handlers(
             message.message_id,
         )
 
+        # mime_type из Telegram уходит в Deepgram и в декодер: аудиофайлом
+        # может прийти не только mp3, но и m4a, flac, wav
         if message.voice:
             ext = ".ogg"
             file_obj = message.voice
-            mime_type = "audio/ogg"
+            mime_type = message.voice.mime_type or "audio/ogg"
         elif message.audio:
-            ext = ".mp3"
+            ext = Path(message.audio.file_name or "").suffix or ".mp3"
             file_obj = message.audio
-            mime_type = "audio/mpeg"
+            mime_type = message.audio.mime_type or "audio/mpeg"
         else:
             ext = ".mp4"
             file_obj = message.video_note
@@ -104,43 +396,201 @@ def register_voice_handlers(
         ts = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"{kind}_{message.chat.id}_{message.message_id}_{ts}{ext}"
 
-        try:
-            buffer = BytesIO()
-            await message.bot.download(file_obj, destination=buffer)
-            buffer.seek(0)
-            audio_bytes = buffer.getvalue()
-
-            logger.debug(
-                "Downloaded file %s: size=%d bytes, mime_type=%s",
-                filename,
-                len(audio_bytes),
-                mime_type,
-            )
+        # duration есть у voice/audio/video_note в метаданных Telegram
+        duration_s = getattr(file_obj, "duration", None)
+
+        file_size = getattr(file_obj, "file_size", None)
+
+        # Бэкенд и модель для этой задачи — по метаданным, ещё до скачивания
+        job_settings = get_job_router(settings).route(
+            settings,
+            JobInfo(
+                kind=kind,
+                duration_s=duration_s,
+                file_size=file_size,
+                language=get_user_language(user_id),
+            ),
+        )
+        # Язык речи: Whisper/Deepgram пропускают автоопределение
+        job_settings = _with_language_hint(job_settings, user_id)
+
+        cache = get_transcript_cache(settings)
+        tag = cache_tag(job_settings)
+        scheduler = get_job_scheduler(settings)
+
+        # Стриминг: заглушка + правки с частичным текстом (для длинных аудио).
+        # В passthrough-режиме Deepgram частичного текста нет — сразу финал.
+        streaming = (
+            settings.streaming_replies
+            and not uses_passthrough(job_settings)
+            and (duration_s or 0) >= settings.streaming_min_duration_s
+        )
+        progress: ProgressiveReply | None = None
+
+        # Потоковая загрузка прямо в ffmpeg — если исходный файл целиком
+        # не нужен (его нужен Deepgram passthrough и in-process декодер)
+        stream_ingest = (
+            settings.stream_download
+            and not uses_passthrough(job_settings)
+            and not _decode_in_process(file_size)
+        )
+
+        async def run_pipeline(
+            audio_bytes: bytes,
+            decoded: np.ndarray | None = None,
+        ) -> str:
+            nonlocal progress
+
+            async def on_partial(text: str) -> None:
+                if progress is not None:
+                    await progress.update(t(user_id, "voice_partial", text=text))
+
+            if streaming:
+                progress = await ProgressiveReply.send(
+                    message,
+                    t(user_id, "transcribing_placeholder"),
+                    min_interval_s=settings.streaming_edit_interval_s,
+                )
 
-            text = await transcribe_bytes(
+            return await _transcribe_raw(
                 audio_bytes,
                 mime_type=mime_type,
                 filename=filename,
                 ffmpeg_path=ffmpeg_path,
                 user_id=user_id,
+                on_partial=on_partial if streaming else None,
+                decoded=decoded,
+                job_settings=job_settings,
+                duration_s=duration_s,
             )
 
-            logger.info(
-                "Transcription success: user_id=%s message_id=%s text_len=%s",
-                user.id if user else None,
-                message.message_id,
-                len(text),
+        async def download_and_transcribe() -> str:
+            # текущий спан здесь — "scheduled" (см. bind в scheduled_job)
+            set_attribute(
+                "queue_wait_ms", round((time.perf_counter() - enqueued_at) * 1000, 3)
             )
 
-            await message.reply(
-                t(user_id, "voice_received", filename=filename, text=text),
-                parse_mode="Markdown",
-            )
-        except Exception:
-            logger.exception(
-                "Error while handling voice message: user_id=%s chat_id=%s message_id=%s",
-                user.id if user else None,
-                message.chat.id,
-                message.message_id,
-            )
-            await message.reply(t(user_id, "error_general"))
+            if stream_ingest:
+                # исходные байты не нужны: Deepgram passthrough выключен
+                audio_bytes = b""
+                decoded, sha256_hex = await _download_and_decode(
+                    message.bot,
+                    file_obj.file_id,
+                    filename=filename,
+                    ffmpeg_path=ffmpeg_path,
+                )
+            else:
+                buffer = BytesIO()
+                with DOWNLOAD_SECONDS.time(), span("download") as download_span:
+                    await message.bot.download(file_obj, destination=buffer)
+                    audio_bytes = buffer.getvalue()
+                    download_span.set_attribute("size", len(audio_bytes))
+
+                logger.debug(
+                    "Downloaded file %s: size=%d bytes, mime_type=%s",
+                    filename,
+                    len(audio_bytes),
+                    mime_type,
+                )
+                decoded = sha256_hex = None
+
+            if cache is None:
+                return await run_pipeline(audio_bytes, decoded)
+
+            # тот же звук мог прийти под другим file_unique_id (перезалив);
+            # при потоковой загрузке проверка после декодирования, но до инференса
+            if sha256_hex is not None:
+                content_key = content_digest_cache_key(tag, sha256_hex)
+            else:
+                content_key = content_cache_key(tag, audio_bytes)
+            cached = await cache.get(content_key)
+            if cached is not None:
+                root.set_attribute("cache", "content_hit")
+                return cached
+
+            raw = await run_pipeline(audio_bytes, decoded)
+            await cache.put(content_key, raw)
+            return raw
+
+        enqueued_at = 0.0
+
+        async def scheduled_job() -> str:
+            nonlocal enqueued_at
+            root.set_attribute("cache", "miss")
+            with span("scheduled"):
+                enqueued_at = time.perf_counter()
+                # задачу выполнит воркер планировщика — привязываем её к трейсу
+                return await scheduler.run(
+                    user_id, duration_s, bind(download_and_transcribe)
+                )
+
+        with trace(
+            "voice_message",
+            kind=kind,
+            user_id=user_id,
+            chat_id=message.chat.id,
+            message_id=message.message_id,
+            duration_s=duration_s,
+            backend=job_settings.transcriber_backend.value,
+            model=job_settings.whisper_model,
+            language_hint=job_settings.transcribe_language,
+            # перезапишут scheduled_job / download_and_transcribe
+            cache="disabled" if cache is None else "file_hit",
+        ) as root:
+            try:
+                try:
+                    if cache is None:
+                        raw_text = await scheduled_job()
+                    else:
+                        # хит по file_unique_id — без очереди, скачивания,
+                        # ffmpeg и инференса
+                        raw_text = await cache.get_or_compute(
+                            file_cache_key(tag, file_obj.file_unique_id),
+                            scheduled_job,
+                        )
+                        if logger.isEnabledFor(logging.DEBUG):
+                            logger.debug("Transcript cache stats: %s", cache.stats())
+                except QueueFullError:
+                    ERRORS_TOTAL.inc(type="queue_full")
+                    root.set_attribute("error", "queue_full")
+                    # занятость воркера-демона всплывает уже после заглушки
+                    if progress is not None:
+                        await progress.finalize(t(user_id, "busy_try_later"))
+                    else:
+                        await message.reply(t(user_id, "busy_try_later"))
+                    return
+                except TranscriptionFailed as e:
+                    ERRORS_TOTAL.inc(type=e.message_key)
+                    root.set_attribute("error", e.message_key)
+                    text = e.localized(user_id)
+                else:
+                    text = _reply_text(user_id, raw_text)
+                    if duration_s:
+                        record_audio(duration_s)
+
+                logger.info(
+                    "Transcription success: user_id=%s message_id=%s text_len=%s",
+                    user.id if user else None,
+                    message.message_id,
+                    len(text),
+                )
+
+                reply_text = t(user_id, "voice_received", filename=filename, text=text)
+                with REPLY_SECONDS.time(), span("reply"):
+                    if progress is not None:
+                        await progress.finalize(reply_text, parse_mode="Markdown")
+                    else:
+                        await message.reply(reply_text, parse_mode="Markdown")
+            except Exception as e:
+                ERRORS_TOTAL.inc(type=type(e).__name__)
+                root.set_attribute("error", type(e).__name__)
+                logger.exception(
+                    "Error while handling voice message: user_id=%s chat_id=%s message_id=%s",
+                    user.id if user else None,
+                    message.chat.id,
+                    message.message_id,
+                )
+                if progress is not None:
+                    await progress.finalize(t(user_id, "error_general"))
+                else:
+                    await message.reply(t(user_id, "error_general"))
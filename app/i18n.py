@@ -1,29 +1,60 @@
 # app/i18n.py
 from __future__ import annotations
 
-from typing import Dict, Literal
+from typing import Literal, cast
+
+from app.user_store import SPEECH_LANGUAGE, get_user_store
 
 LangCode = Literal["en", "ru", "uk"]
 
 SUPPORTED_LANGS: tuple[LangCode, ...] = ("en", "ru", "uk")
 DEFAULT_LANG: LangCode = "en"
 
-# Temporary in-memory storage: user_id -> language code
-_user_language: Dict[int, LangCode] = {}
+# /speech: язык, на котором пользователь говорит (подсказка распознаванию),
+# отдельно от языка интерфейса. "auto" — явный выбор автоопределения.
+SPEECH_AUTO = "auto"
 
 
 def set_user_language(user_id: int, lang: LangCode) -> None:
-    """Set user's preferred language."""
+    """Set user's preferred language (persisted by app.user_store)."""
     if lang not in SUPPORTED_LANGS:
         lang = DEFAULT_LANG
-    _user_language[user_id] = lang
+    get_user_store().set(user_id, lang)
+
+
+def get_stored_user_language(user_id: int | None) -> LangCode | None:
+    """User's explicitly chosen language, or None if they never picked one."""
+    if user_id is None:
+        return None
+    lang = get_user_store().get(user_id)
+    if lang not in SUPPORTED_LANGS:
+        return None
+    return cast(LangCode, lang)
 
 
 def get_user_language(user_id: int | None) -> LangCode:
     """Get user's preferred language. Defaults to English."""
+    return get_stored_user_language(user_id) or DEFAULT_LANG
+
+
+def set_user_speech_language(user_id: int, lang: str) -> None:
+    """Set the language user speaks in (SUPPORTED_LANGS or SPEECH_AUTO)."""
+    if lang not in SUPPORTED_LANGS:
+        lang = SPEECH_AUTO
+    get_user_store(SPEECH_LANGUAGE).set(user_id, lang)
+
+
+def get_user_speech_language(user_id: int | None) -> str | None:
+    """
+    User's speech language: a code from SUPPORTED_LANGS, SPEECH_AUTO,
+    or None if they never used /speech.
+    """
     if user_id is None:
-        return DEFAULT_LANG
-    return _user_language.get(user_id, DEFAULT_LANG)
+        return None
+    lang = get_user_store(SPEECH_LANGUAGE).get(user_id)
+    if lang != SPEECH_AUTO and lang not in SUPPORTED_LANGS:
+        return None
+    return lang
 
 
 MESSAGES: dict[str, dict[LangCode, str]] = {
@@ -43,6 +74,26 @@ MESSAGES: dict[str, dict[LangCode, str]] = {
         "ru": "✅ Язык переключён на русский.",
         "uk": "✅ Мову змінено на українську.",
     },
+    "choose_speech_language": {
+        "en": "Which language do you speak in your voice messages?\nA known language makes transcription faster.",
+        "ru": "На каком языке ты говоришь в голосовых?\nЕсли язык известен заранее, распознавание быстрее.",
+        "uk": "Якою мовою ти говориш у голосових?\nЯкщо мова відома заздалегідь, розпізнавання швидше.",
+    },
+    "speech_language_set": {
+        "en": "✅ Language of your voice messages: {language}.",
+        "ru": "✅ Язык твоих голосовых: {language}.",
+        "uk": "✅ Мова твоїх голосових: {language}.",
+    },
+    "speech_language_auto": {
+        "en": "✅ I'll detect the language of each voice message automatically.",
+        "ru": "✅ Буду определять язык каждого голосового автоматически.",
+        "uk": "✅ Визначатиму мову кожного голосового автоматично.",
+    },
+    "speech_language_auto_button": {
+        "en": "Auto-detect 🌐",
+        "ru": "Автоопределение 🌐",
+        "uk": "Автовизначення 🌐",
+    },
     "echo_reply": {
         "en": "You wrote: {text}",
         "ru": "Ты написал(а): {text}",
@@ -69,11 +120,26 @@ MESSAGES: dict[str, dict[LangCode, str]] = {
         "ru": "Аудио удалось сконвертировать в WAV, но при распознавании произошла ошибка 😔",
         "uk": "Аудіо вдалося сконвертувати у WAV, але під час розпізнавання сталася помилка 😔",
     },
+    "busy_try_later": {
+        "en": "I'm overloaded right now 🫠 Please send this audio again in a few minutes.",
+        "ru": "Сейчас я перегружена 🫠 Пожалуйста, отправь это аудио ещё раз через пару минут.",
+        "uk": "Зараз я перевантажена 🫠 Будь ласка, надішли це аудіо ще раз за кілька хвилин.",
+    },
     "no_text_recognized": {
         "en": "I couldn’t recognize any text in this audio 😔",
         "ru": "Я не смогла распознать текст в этом аудио 😔",
         "uk": "Я не змогла розпізнати текст у цьому аудіо 😔",
     },
+    "transcribing_placeholder": {
+        "en": "Transcribing 🎧 …",
+        "ru": "Распознаю 🎧 …",
+        "uk": "Розпізнаю 🎧 …",
+    },
+    "voice_partial": {
+        "en": "Transcribing 🎧 …\n\n{text}",
+        "ru": "Распознаю 🎧 …\n\n{text}",
+        "uk": "Розпізнаю 🎧 …\n\n{text}",
+    },
     "voice_received": {
         "en": "Voice message received 🎧\nFile: `{filename}`\n\n{text}",
         "ru": "Голосовое получено 🎧\nФайл: `{filename}`\n\n{text}",
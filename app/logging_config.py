@@ -1,11 +1,28 @@
 # app/logging_config.py
 from __future__ import annotations
 
+import atexit
+import itertools
+import json
 import logging
+import logging.handlers
+import queue
+import sys
 from logging import Logger
 from pathlib import Path
 
 from app.config import Settings
+from app.tracing import JobIdFilter
+
+TEXT_FORMAT = "%(asctime)s [%(levelname)s] [%(name)s] [job=%(job_id)s] %(message)s"
+
+# Фоновые писатели (bot.log, traces.jsonl) — останавливаются в close_logging
+_listeners: list[
+    tuple[logging.handlers.QueueListener, _NonBlockingQueueHandler]
+] = []
+
+# Сколько разных мест в коде помнит DebugSampler (защита от f-строк в logger.debug)
+_MAX_SAMPLER_KEYS = 10_000
 
 
 def _get_log_level(level_name: str) -> int:
@@ -21,12 +38,163 @@ def _get_log_level(level_name: str) -> int:
     return logging.INFO
 
 
+class JsonFormatter(logging.Formatter):
+    """Одна запись — одна строка JSON (LOG_FORMAT=json)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": f"{self.formatTime(record, '%Y-%m-%dT%H:%M:%S')}"
+            f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "job_id": getattr(record, "job_id", "-"),
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        if record.stack_info:
+            data["stack"] = record.stack_info
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class DebugSampler(logging.Filter):
+    """
+    Пропускает каждую N-ю DEBUG-запись (N = 1 / rate) для каждого места в коде.
+
+    Счётчик ведётся по (логгер, шаблон сообщения): частые события прореживаются,
+    а редкие — первая запись из каждого места проходит всегда.
+    """
+
+    def __init__(self, rate: float) -> None:
+        super().__init__()
+        self.every = max(1, round(1 / rate)) if rate > 0 else 0
+        self._counters: dict[tuple[str, object], itertools.count] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.every == 1:
+            return True
+        if self.every == 0:
+            return False
+
+        key = (record.name, record.msg)
+        counter = self._counters.get(key)
+        if counter is None:
+            if len(self._counters) >= _MAX_SAMPLER_KEYS:
+                self._counters.clear()
+            counter = self._counters.setdefault(key, itertools.count())
+        return next(counter) % self.every == 0
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler, который никогда не ждёт: при переполненной очереди запись
+    отбрасывается (и считается), а не блокирует event loop.
+    """
+
+    def __init__(self, log_queue: queue.Queue) -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Форматирование остаётся фоновому писателю; здесь только то, что
+        # нельзя отложить: подстановка аргументов (они могут измениться)
+        # и текст исключения (traceback держит фреймы живыми).
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def queued_handler(
+    *handlers: logging.Handler,
+    maxsize: int = 0,
+) -> logging.handlers.QueueHandler:
+    """
+    Оборачивает handlers в очередь с фоновым потоком-писателем.
+    Логирующий код только кладёт запись в очередь — файловый и консольный
+    I/O уходят из event loop.
+    """
+    log_queue: queue.Queue = queue.Queue(maxsize)
+    listener = logging.handlers.QueueListener(
+        log_queue, *handlers, respect_handler_level=True
+    )
+    listener.start()
+    handler = _NonBlockingQueueHandler(log_queue)
+    _listeners.append((listener, handler))
+    return handler
+
+
+def _stop_listener(
+    listener: logging.handlers.QueueListener,
+    queue_handler: _NonBlockingQueueHandler,
+) -> None:
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+    if queue_handler.dropped:
+        # писатель уже остановлен — только stderr
+        print(
+            f"logging: {queue_handler.dropped} record(s) dropped "
+            "because the log queue was full",
+            file=sys.stderr,
+        )
+
+
+def close_queued_handler(handler: logging.Handler) -> None:
+    """
+    Дописывает очередь и останавливает писатель одного queued_handler.
+    Для других хендлеров ничего не делает.
+    """
+    for i, (listener, queue_handler) in enumerate(_listeners):
+        if queue_handler is handler:
+            del _listeners[i]
+            _stop_listener(listener, queue_handler)
+            return
+
+
+def close_logging() -> None:
+    """Дописывает очереди и останавливает все фоновые писатели."""
+    while _listeners:
+        _stop_listener(*_listeners.pop())
+
+
+atexit.register(close_logging)
+
+
+def _file_handler(settings: Settings, log_file: Path) -> logging.Handler:
+    if settings.log_rotate_when:
+        return logging.handlers.TimedRotatingFileHandler(
+            log_file,
+            when=settings.log_rotate_when,
+            backupCount=settings.log_backup_count,
+            encoding="utf-8",
+        )
+    if settings.log_max_bytes:
+        return logging.handlers.RotatingFileHandler(
+            log_file,
+            maxBytes=settings.log_max_bytes,
+            backupCount=settings.log_backup_count,
+            encoding="utf-8",
+        )
+    return logging.FileHandler(log_file, encoding="utf-8")
+
+
 def setup_logging(settings: Settings) -> Logger:
     """
     Централизованная настройка логирования:
     - создаёт папку для логов
     - настраивает root-логгер
-    - добавляет хендлер в файл + в консоль
+    - файл (с ротацией) + консоль пишет фоновый поток через очередь
     Возвращает логгер текущего модуля (по желанию).
     """
     log_dir = Path(settings.log_dir)
@@ -35,33 +203,48 @@ def setup_logging(settings: Settings) -> Logger:
     log_file = log_dir / "bot.log"
     log_level = _get_log_level(settings.log_level)
 
-    # Общий формат для всех сообщений
-    formatter = logging.Formatter(
-        "%(asctime)s [%(levelname)s] [%(name)s] " "%(message)s"
-    )
+    # Общий формат для всех сообщений; job_id связывает строки одного
+    # голосового между собой и с трейсом в traces.jsonl ("-" вне трейса)
+    if settings.log_format == "json":
+        formatter: logging.Formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(TEXT_FORMAT)
 
     # Берём root-логгер и чистим старые хендлеры,
-    # чтобы не дублировались сообщения.
+    # чтобы не дублировались сообщения. Останавливаем только свои писатели:
+    # traces.jsonl (setup_tracing) пишет отдельный, его не трогаем.
     root_logger = logging.getLogger()
     root_logger.setLevel(log_level)
-    root_logger.handlers.clear()
+    for old_handler in root_logger.handlers[:]:
+        root_logger.removeHandler(old_handler)
+        close_queued_handler(old_handler)
 
     # Логи в файл
-    file_handler = logging.FileHandler(log_file, encoding="utf-8")
+    file_handler = _file_handler(settings, log_file)
     file_handler.setFormatter(formatter)
-    root_logger.addHandler(file_handler)
 
     # Логи в консоль
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(formatter)
-    root_logger.addHandler(console_handler)
+
+    handler = queued_handler(
+        file_handler, console_handler, maxsize=settings.log_queue_size
+    )
+    # Фильтры работают до очереди, в логирующем потоке: сэмплер — чтобы
+    # не копить лишнее, job_id — потому что он в contextvar этого потока
+    if settings.log_debug_sample_rate < 1.0:
+        handler.addFilter(DebugSampler(settings.log_debug_sample_rate))
+    handler.addFilter(JobIdFilter())
+    root_logger.addHandler(handler)
 
     # Можно вернуть логгер для модуля logging_config,
     # но обычно нам важен сам факт настройки.
     logger = logging.getLogger(__name__)
     logger.debug(
-        "Logging initialized. level=%s, log_file=%s",
+        "Logging initialized. level=%s, format=%s, log_file=%s, rotation=%s",
         settings.log_level,
+        settings.log_format,
         log_file,
+        settings.log_rotate_when or f"{settings.log_max_bytes} bytes",
     )
     return logger
@@ -0,0 +1,383 @@
+# app/metrics.py
+from __future__ import annotations
+
+import asyncio
+import bisect
+import logging
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Длительности этапов: от десятков миллисекунд (скачивание) до минут (часовой файл)
+DURATION_BUCKETS = (
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0
+)
+
+LabelValues = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(
+    names: tuple[str, ...],
+    values: LabelValues,
+    extra: str = "",
+) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    """
+    Метрика в текстовом формате Prometheus.
+
+    Своя маленькая реализация вместо prometheus_client: нужно всего три
+    типа, а обновления идут и из event loop, и из потоков (лок на метрику).
+    """
+
+    kind = ""
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: tuple[str, ...] = (),
+    ) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _key(self, labels: dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name}: expected labels {self.labelnames}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} {self.kind}",
+            *self._samples(),
+        ]
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Gauge(_Metric):
+    """Значение задаётся через set() или считается при рендере (set_function)."""
+
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._values: dict[LabelValues, float] = {}
+        self._function: Callable[[], float] | None = None
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, fn: Callable[[], float]) -> None:
+        self._function = fn
+
+    def _samples(self) -> list[str]:
+        if self._function is not None:
+            try:
+                return [f"{self.name} {_format_value(self._function())}"]
+            except Exception:
+                logger.exception("Failed to compute gauge %s", self.name)
+                return []
+
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: tuple[str, ...] = (),
+        *,
+        buckets: tuple[float, ...] = DURATION_BUCKETS,
+    ) -> None:
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> (счётчики по бакетам, сумма, количество)
+        self._values: dict[LabelValues, tuple[list[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total, count = self._values.get(
+                key, ([0] * len(self.buckets), 0.0, 0)
+            )
+            if index < len(counts):
+                counts[index] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Замер блока кода; длительность записывается и при исключении."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(
+                (key, (list(counts), total, count))
+                for key, (counts, total, count) in self._values.items()
+            )
+
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = _format_labels(
+                    self.labelnames, key, f'le="{_format_value(bound)}"'
+                )
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            le = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {count}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: list[_Metric] = []
+
+    def register(self, metric: _Metric) -> None:
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+class AudioThroughput:
+    """Секунд аудио, распознанных за секунду, по скользящему окну."""
+
+    def __init__(self, *, window_s: float = 60.0) -> None:
+        self.window_s = window_s
+        self._events: deque[tuple[float, float]] = deque()
+        self._lock = threading.Lock()
+
+    def _trim(self, now: float) -> None:
+        while self._events and now - self._events[0][0] > self.window_s:
+            self._events.popleft()
+
+    def record(self, audio_s: float) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._events.append((now, audio_s))
+            self._trim(now)
+
+    def rate(self) -> float:
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            return sum(audio_s for _, audio_s in self._events) / self.window_s
+
+
+# --- метрики приложения -------------------------------------------------------
+
+DOWNLOAD_SECONDS = Histogram(
+    "voice2text_download_seconds",
+    "Time to download the voice file from Telegram.",
+)
+FFMPEG_SECONDS = Histogram(
+    "voice2text_ffmpeg_seconds",
+    "Time spent decoding audio (ffmpeg subprocess or in-process PyAV).",
+    ("caller",),
+)
+INFERENCE_SECONDS = Histogram(
+    "voice2text_inference_seconds",
+    "Time spent in a transcription backend call.",
+    ("backend",),
+)
+REPLY_SECONDS = Histogram(
+    "voice2text_reply_seconds",
+    "Time to send the final reply to Telegram.",
+)
+
+TRANSCRIPTIONS_TOTAL = Counter(
+    "voice2text_transcriptions_total",
+    "Backend calls by backend and outcome.",
+    ("backend", "outcome"),
+)
+FALLBACKS_TOTAL = Counter(
+    "voice2text_fallbacks_total",
+    "Switches from the configured backend to a fallback.",
+    ("source", "target", "reason"),
+)
+ERRORS_TOTAL = Counter(
+    "voice2text_errors_total",
+    "Errors reported to users, by type.",
+    ("type",),
+)
+ROUTES_TOTAL = Counter(
+    "voice2text_routes_total",
+    "Routing decisions by target backend/model and matched rule.",
+    ("target", "rule"),
+)
+CACHE_LOOKUPS_TOTAL = Counter(
+    "voice2text_cache_lookups_total",
+    "Transcript cache lookups by result.",
+    ("result",),
+)
+AUDIO_SECONDS_TOTAL = Counter(
+    "voice2text_audio_seconds_total",
+    "Seconds of audio sent to a transcription backend.",
+)
+
+QUEUE_DEPTH = Gauge(
+    "voice2text_queue_depth",
+    "Jobs waiting in the scheduler queue.",
+)
+IN_FLIGHT = Gauge(
+    "voice2text_in_flight_jobs",
+    "Jobs currently being processed.",
+)
+
+audio_throughput = AudioThroughput()
+AUDIO_THROUGHPUT = Gauge(
+    "voice2text_audio_throughput_seconds_per_second",
+    "Seconds of audio transcribed per wall-clock second over the last minute.",
+)
+AUDIO_THROUGHPUT.set_function(audio_throughput.rate)
+
+
+def record_audio(audio_s: float) -> None:
+    AUDIO_SECONDS_TOTAL.inc(audio_s)
+    audio_throughput.record(audio_s)
+
+
+@contextmanager
+def observe_backend(backend: str) -> Iterator[None]:
+    """Время и исход вызова бэкенда (INFERENCE_SECONDS + TRANSCRIPTIONS_TOTAL)."""
+    started = time.perf_counter()
+    try:
+        yield
+    except asyncio.CancelledError:
+        TRANSCRIPTIONS_TOTAL.inc(backend=backend, outcome="cancelled")
+        raise
+    except Exception:
+        TRANSCRIPTIONS_TOTAL.inc(backend=backend, outcome="error")
+        raise
+    else:
+        TRANSCRIPTIONS_TOTAL.inc(backend=backend, outcome="success")
+    finally:
+        INFERENCE_SECONDS.observe(time.perf_counter() - started, backend=backend)
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
+
+
+async def _handle_metrics_request(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+) -> None:
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), timeout=5.0)
+        # заголовки не нужны, но их надо дочитать
+        while (await asyncio.wait_for(reader.readline(), timeout=5.0)) not in (
+            b"\r\n",
+            b"\n",
+            b"",
+        ):
+            pass
+
+        parts = request_line.decode("latin-1").split()
+        path = parts[1].split("?")[0] if len(parts) >= 2 else ""
+        if parts and parts[0] == "GET" and path == "/metrics":
+            status, content_type, body = "200 OK", CONTENT_TYPE, render_metrics()
+        else:
+            status, content_type, body = "404 Not Found", "text/plain", "not found\n"
+
+        payload = body.encode("utf-8")
+        writer.write(
+            (
+                f"HTTP/1.1 {status}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                "Connection: close\r\n\r\n"
+            ).encode("latin-1")
+            + payload
+        )
+        await writer.drain()
+    except (TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(host: str, port: int) -> asyncio.base_events.Server:
+    """
+    Отдельный HTTP-листенер для /metrics (режим polling, где нет FastAPI).
+    В webapp.py метрики отдаёт сам FastAPI.
+    """
+    server = await asyncio.start_server(_handle_metrics_request, host, port)
+    logger.info("Metrics listener started on http://%s:%d/metrics", host, port)
+    return server
@@ -0,0 +1,217 @@
+# app/scheduler.py
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any, TypeVar
+
+from app.config import Settings
+from app.metrics import IN_FLIGHT, QUEUE_DEPTH
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class QueueFullError(Exception):
+    """Очередь переполнена — задачу не приняли, пользователю надо ответить "занято"."""
+
+
+@dataclass
+class _Job:
+    user_key: int | None
+    duration_s: float
+    factory: Callable[[], Awaitable[Any]]
+    future: asyncio.Future = field(repr=False)
+
+
+class JobScheduler:
+    """
+    Планировщик задач распознавания перед transcribe_bytes.
+
+    - Очередь ограничена: при max_queue_depth новые задачи отклоняются сразу
+      (QueueFullError), а не копятся бесконечно.
+    - Внутри одного пользователя — сначала короткие (shortest-job-first
+      по duration из метаданных Telegram).
+    - Между пользователями — round-robin: за один "раунд" каждый активный
+      пользователь получает не больше одного слота, среди них первым идёт
+      тот, у кого короче следующая задача. Двадцать часовых файлов от одного
+      человека не блокируют чужие голосовые.
+    """
+
+    def __init__(
+        self,
+        *,
+        workers: int,
+        max_queue_depth: int,
+        default_duration_s: float = 60.0,
+    ) -> None:
+        self.workers = max(1, workers)
+        self.max_queue_depth = max(1, max_queue_depth)
+        self.default_duration_s = default_duration_s
+
+        # user_key -> heap[(duration, seq, job)]
+        self._queues: dict[int | None, list[tuple[float, int, _Job]]] = {}
+        self._served_this_round: set[int | None] = set()
+        self._seq = itertools.count()
+        self._depth = 0
+        self._in_flight = 0
+
+        self._wakeup: asyncio.Semaphore | None = None
+        self._worker_tasks: list[asyncio.Task] = []
+
+    @property
+    def depth(self) -> int:
+        """Сколько задач ждут в очереди (без уже выполняющихся)."""
+        return self._depth
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _ensure_workers(self) -> None:
+        if self._worker_tasks:
+            return
+
+        self._wakeup = asyncio.Semaphore(0)
+        self._worker_tasks = [
+            asyncio.create_task(self._worker(i), name=f"job-scheduler-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(
+            "Job scheduler started: workers=%d max_queue_depth=%d",
+            self.workers,
+            self.max_queue_depth,
+        )
+
+    async def run(
+        self,
+        user_id: int | None,
+        duration_s: float | None,
+        factory: Callable[[], Awaitable[T]],
+    ) -> T:
+        """
+        Ставит задачу в очередь и ждёт её результат.
+        Бросает QueueFullError, если очередь уже заполнена.
+        """
+        self._ensure_workers()
+
+        if self._depth >= self.max_queue_depth:
+            logger.warning(
+                "Job queue is full, rejecting job: user_id=%s depth=%d",
+                user_id,
+                self._depth,
+            )
+            raise QueueFullError(f"queue depth {self._depth} reached")
+
+        duration = duration_s if duration_s and duration_s > 0 else None
+        job = _Job(
+            user_key=user_id,
+            duration_s=duration or self.default_duration_s,
+            factory=factory,
+            future=asyncio.get_running_loop().create_future(),
+        )
+        heapq.heappush(
+            self._queues.setdefault(user_id, []),
+            (job.duration_s, next(self._seq), job),
+        )
+        self._depth += 1
+
+        logger.debug(
+            "Job queued: user_id=%s duration=%.1fs depth=%d",
+            user_id,
+            job.duration_s,
+            self._depth,
+        )
+
+        assert self._wakeup is not None
+        self._wakeup.release()
+        return await job.future
+
+    def _pick_next(self) -> _Job:
+        candidates = [
+            key for key in self._queues if key not in self._served_this_round
+        ]
+        if not candidates:
+            # все активные пользователи получили по слоту — новый раунд
+            self._served_this_round.clear()
+            candidates = list(self._queues)
+
+        user_key = min(candidates, key=lambda key: self._queues[key][0][:2])
+        queue = self._queues[user_key]
+        _, _, job = heapq.heappop(queue)
+        if not queue:
+            del self._queues[user_key]
+
+        self._served_this_round.add(user_key)
+        self._depth -= 1
+        return job
+
+    async def _worker(self, index: int) -> None:
+        assert self._wakeup is not None
+        while True:
+            await self._wakeup.acquire()
+            job = self._pick_next()
+
+            if job.future.cancelled():
+                # тот, кто ждал, уже ушёл — не тратим на задачу ресурсы
+                continue
+
+            self._in_flight += 1
+            try:
+                result = await job.factory()
+            except asyncio.CancelledError:
+                if not job.future.done():
+                    job.future.cancel()
+                raise
+            except Exception as e:  # noqa: BLE001 — ошибка уходит в future
+                if not job.future.done():
+                    job.future.set_exception(e)
+            else:
+                if not job.future.done():
+                    job.future.set_result(result)
+            finally:
+                self._in_flight -= 1
+
+    async def stop(self) -> None:
+        """Останавливает воркеров; ожидающие задачи получают отмену."""
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+        for queue in self._queues.values():
+            for _, _, job in queue:
+                if not job.future.done():
+                    job.future.cancel()
+        self._queues.clear()
+        self._served_this_round.clear()
+        self._depth = 0
+
+
+_scheduler: JobScheduler | None = None
+
+
+def get_job_scheduler(settings: Settings) -> JobScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = JobScheduler(
+            workers=settings.scheduler_workers,
+            max_queue_depth=settings.scheduler_max_queue_depth,
+        )
+        scheduler = _scheduler
+        QUEUE_DEPTH.set_function(lambda: scheduler.depth)
+        IN_FLIGHT.set_function(lambda: scheduler.in_flight)
+    return _scheduler
+
+
+async def stop_job_scheduler() -> None:
+    global _scheduler
+    if _scheduler is None:
+        return
+    await _scheduler.stop()
+    _scheduler = None
@@ -0,0 +1,256 @@
+# app/tracing.py
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import json
+import logging
+import logging.handlers
+import secrets
+import threading
+import time
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, TypeVar
+
+from app.config import Settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+TRACE_FILE_NAME = "traces.jsonl"
+
+# Отдельный логгер для экспорта: строка JSON на трейс, без общего формата
+_trace_logger = logging.getLogger("app.traces")
+_trace_logger.propagate = False
+
+_min_duration_ms = 0.0
+_enabled = False
+
+
+@dataclass
+class Span:
+    """Один этап обработки: время начала/конца и атрибуты."""
+
+    trace: Trace = field(repr=False)
+    name: str
+    span_id: str
+    parent_id: str | None
+    started_at: float  # unix time, для чтения людьми
+    _started: float = field(repr=False)  # perf_counter, для длительности
+    duration_ms: float | None = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+    status: str = "ok"
+    error: str | None = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": round(self.started_at, 6),
+            "duration_ms": (
+                round(self.duration_ms, 3) if self.duration_ms is not None else None
+            ),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class Trace:
+    """Все спаны одного сообщения; job_id попадает и в логи (JobIdFilter)."""
+
+    def __init__(self) -> None:
+        self.job_id = secrets.token_hex(8)
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span) -> None:
+        # спаны могут закрываться из потоков inference executor'а
+        with self._lock:
+            self.spans.append(span)
+
+
+class _NoopSpan:
+    """Заглушка вне трейса: атрибуты просто выбрасываются."""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        return None
+
+
+_NOOP_SPAN = _NoopSpan()
+
+_current_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+
+def current_span() -> Span | None:
+    return _current_span.get()
+
+
+def current_job_id() -> str | None:
+    span = _current_span.get()
+    return span.trace.job_id if span is not None else None
+
+
+def set_attribute(key: str, value: Any) -> None:
+    """Атрибут текущего спана (например, причина fallback'а)."""
+    span = _current_span.get()
+    if span is not None:
+        span.set_attribute(key, value)
+
+
+@contextmanager
+def _run_span(trace: Trace, name: str, parent: Span | None, attributes: dict):
+    span = Span(
+        trace=trace,
+        name=name,
+        span_id=secrets.token_hex(4),
+        parent_id=parent.span_id if parent is not None else None,
+        started_at=time.time(),
+        _started=time.perf_counter(),
+        attributes=dict(attributes),
+    )
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.status = (
+            "cancelled" if isinstance(e, asyncio.CancelledError) else "error"
+        )
+        span.error = f"{type(e).__name__}: {e}"[:500]
+        raise
+    finally:
+        span.duration_ms = (time.perf_counter() - span._started) * 1000
+        _current_span.reset(token)
+        trace.add(span)
+        if parent is None:
+            _export(trace, span)
+
+
+@contextmanager
+def trace(name: str, **attributes: Any) -> Iterator[Span | _NoopSpan]:
+    """
+    Корневой спан сообщения: новый job_id. Если трейс уже идёт (например,
+    transcribe_bytes вызван из on_voice) — это просто вложенный спан.
+    """
+    if not _enabled:
+        yield _NOOP_SPAN
+        return
+
+    parent = _current_span.get()
+    owner = parent.trace if parent is not None else Trace()
+    with _run_span(owner, name, parent, attributes) as span:
+        yield span
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span | _NoopSpan]:
+    """Вложенный спан; вне трейса ничего не делает."""
+    parent = _current_span.get()
+    if parent is None:
+        yield _NOOP_SPAN
+        return
+
+    with _run_span(parent.trace, name, parent, attributes) as child:
+        yield child
+
+
+def bind(factory: Callable[[], Awaitable[T]]) -> Callable[[], Awaitable[T]]:
+    """
+    Привязывает factory к текущему спану.
+
+    Нужно там, где корутину запускает чужая задача (воркер JobScheduler'а):
+    контекст задачи скопирован при её создании, а не при постановке job'а.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return factory
+
+    @functools.wraps(factory)
+    async def run() -> T:
+        token = _current_span.set(parent)
+        try:
+            return await factory()
+        finally:
+            _current_span.reset(token)
+
+    return run
+
+
+def _export(trace: Trace, root: Span) -> None:
+    if root.duration_ms is not None and root.duration_ms < _min_duration_ms:
+        return
+
+    spans = sorted(trace.spans, key=lambda s: s.started_at)
+    record = {
+        "job_id": trace.job_id,
+        "name": root.name,
+        "start": round(root.started_at, 6),
+        "duration_ms": round(root.duration_ms or 0.0, 3),
+        "status": root.status,
+        "spans": [s.to_dict() for s in spans],
+    }
+    try:
+        _trace_logger.info(json.dumps(record, ensure_ascii=False, default=str))
+    except Exception:
+        logger.exception("Failed to export trace %s", trace.job_id)
+
+
+class JobIdFilter(logging.Filter):
+    """Подставляет job_id текущего трейса в записи логов (%(job_id)s)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "job_id"):
+            record.job_id = current_job_id() or "-"
+        return True
+
+
+def setup_tracing(settings: Settings) -> None:
+    """
+    Включает трейсинг и экспорт готовых трейсов в log_dir/traces.jsonl
+    (по строке JSON на сообщение). Вызывается после setup_logging.
+    """
+    global _enabled, _min_duration_ms
+
+    # здесь, а не наверху: logging_config сам импортирует JobIdFilter отсюда
+    from app.logging_config import close_queued_handler, queued_handler
+
+    _enabled = settings.tracing_enabled
+    _min_duration_ms = settings.tracing_min_duration_ms
+    for old_handler in _trace_logger.handlers[:]:
+        _trace_logger.removeHandler(old_handler)
+        close_queued_handler(old_handler)
+
+    if not _enabled:
+        return
+
+    path = Path(settings.log_dir) / TRACE_FILE_NAME
+    if settings.log_max_bytes:
+        file_handler: logging.Handler = logging.handlers.RotatingFileHandler(
+            path,
+            maxBytes=settings.log_max_bytes,
+            backupCount=settings.log_backup_count,
+            encoding="utf-8",
+        )
+    else:
+        file_handler = logging.FileHandler(path, encoding="utf-8")
+    file_handler.setFormatter(logging.Formatter("%(message)s"))
+    # запись файла — в фоновом потоке, как и у bot.log
+    _trace_logger.addHandler(
+        queued_handler(file_handler, maxsize=settings.log_queue_size)
+    )
+    _trace_logger.setLevel(logging.INFO)
+
+    logger.debug(
+        "Tracing enabled: file=%s, min_duration_ms=%s", path, _min_duration_ms
+    )
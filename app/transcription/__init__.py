@@ -1,64 +1,388 @@
+import functools
+import importlib.util
 import logging
+from collections.abc import Awaitable, Callable
 
-from app.config import Settings, TranscriberBackend
-from app.transcription.whisper_backend import transcribe_wav_bytes
+import numpy as np
+
+from app.config import InferenceExecutorKind, Settings, TranscriberBackend
+from app.metrics import FALLBACKS_TOTAL, observe_backend
 from app.transcription.deepgram_backend import (
     transcribe as deepgram_transcribe,
-    DeepgramError,
+    DEFAULT_MODEL as DEEPGRAM_MODEL,
 )
+from app.transcription.batching import MicroBatcher
+from app.transcription.chunking import PartialCallback, transcribe_chunked
+from app.transcription.executor import get_inference_executor
+from app.transcription.health import get_deepgram_health
+from app.transcription.worker_client import get_worker_client
+from app.tracing import set_attribute, span
+from app.utils.audio import SAMPLE_RATE, pcm_to_wav_bytes
 
 logger = logging.getLogger(__name__)
 
+# Ленивая локальная декодировка (ffmpeg + VAD) для Whisper.
+# None — в аудио нет речи, распознавать нечего.
+PcmLoader = Callable[[], Awaitable[np.ndarray | None]]
+
+
+def cache_tag(settings: Settings) -> str:
+    """
+    Часть ключа кэша, зависящая от бэкенда и модели:
+    текст от другой модели — это другой результат.
+    """
+    if settings.transcriber_backend == TranscriberBackend.DEEPGRAM:
+        tag = f"deepgram:{DEEPGRAM_MODEL}"
+    elif uses_faster_whisper(settings):
+        tag = f"faster-whisper:{settings.whisper_model}:{settings.fw_compute_type}"
+    else:
+        tag = f"whisper:{settings.whisper_model}"
+    # с подсказкой языка текст может отличаться от автоопределения
+    if settings.transcribe_language:
+        tag += f":{settings.transcribe_language}"
+    return tag
+
+
+@functools.lru_cache(maxsize=1)
+def faster_whisper_available() -> bool:
+    return importlib.util.find_spec("faster_whisper") is not None
+
+
+# Модели, которые есть у openai-whisper (whisper.available_models()).
+# distil-*, репозитории Hugging Face и каталоги CTranslate2 — только у
+# faster-whisper: подставить их в fallback на обычный Whisper нельзя.
+WHISPER_MODEL_NAMES = frozenset(
+    {
+        "tiny.en",
+        "tiny",
+        "base.en",
+        "base",
+        "small.en",
+        "small",
+        "medium.en",
+        "medium",
+        "large-v1",
+        "large-v2",
+        "large-v3",
+        "large",
+        "large-v3-turbo",
+        "turbo",
+    }
+)
+
+
+def whisper_can_replace_faster_whisper(settings: Settings) -> bool:
+    """Есть ли у обычного Whisper модель с тем же именем, что у faster-whisper."""
+    return settings.whisper_model in WHISPER_MODEL_NAMES
+
+
+def uses_faster_whisper(settings: Settings) -> bool:
+    """
+    Локальный движок — faster-whisper (CTranslate2)?
+    Если пакет не установлен, работает обычный Whisper.
+
+    INFERENCE_EXECUTOR=remote: движок крутится в воркере, пакет в процессе
+    бота не нужен — решает настройка, а не то, что установлено здесь.
+    """
+    if settings.transcriber_backend != TranscriberBackend.FASTER_WHISPER:
+        return False
+    return (
+        settings.inference_executor == InferenceExecutorKind.REMOTE
+        or faster_whisper_available()
+    )
+
+
+def _whisper_transcribe_pcm(
+    pcm: np.ndarray,
+    settings: Settings,
+    model: str | None = None,
+    language: str | None = None,
+) -> str:
+    """
+    Выполняется внутри воркера executor'а.
+
+    whisper_backend импортируется здесь, а не на уровне модуля:
+    модель должна жить в воркере, а не в каждом процессе,
+    который импортирует app.transcription. settings — те, с которыми
+    пришла задача (после роутера), а не перечитанное окружение.
+    """
+    from app.transcription.whisper_backend import transcribe_pcm
+
+    return transcribe_pcm(pcm, model, language, settings=settings)
+
+
+def _faster_whisper_transcribe_pcm(
+    pcm: np.ndarray,
+    settings: Settings,
+    model: str | None = None,
+    language: str | None = None,
+) -> str:
+    """То же, что _whisper_transcribe_pcm, но на faster-whisper."""
+    from app.transcription.faster_whisper_backend import transcribe_pcm
+
+    return transcribe_pcm(pcm, model, language, settings=settings)
+
+
+def _whisper_transcribe_batch(
+    pcms: list[np.ndarray],
+    settings: Settings,
+    model: str | None = None,
+    language: str | None = None,
+) -> list[str]:
+    """Пакетный вариант _whisper_transcribe_pcm (тоже внутри воркера)."""
+    from app.transcription.whisper_backend import transcribe_pcm_batch
+
+    return transcribe_pcm_batch(pcms, model, language, settings=settings)
+
+
+# Батчер на каждую пару (модель, язык): язык в whisper.decode один на пакет
+_batchers: dict[tuple[str, str | None], MicroBatcher] = {}
+
+
+def reset_batchers() -> None:
+    """
+    Закрывает батчеры: они держат ссылку на executor, и после его остановки
+    (shutdown_inference_executor) слали бы задачи в закрытый пул.
+    """
+    batchers = list(_batchers.values())
+    _batchers.clear()
+    for batcher in batchers:
+        batcher.close()
+
+
+def _get_batcher(settings: Settings) -> MicroBatcher:
+    model = settings.whisper_model
+    language = settings.transcribe_language
+    batcher = _batchers.get((model, language))
+    if batcher is None:
+        executor = get_inference_executor(settings)
+        batcher = _batchers[(model, language)] = MicroBatcher(
+            lambda pcms: executor.submit(
+                _whisper_transcribe_batch, pcms, settings, model, language
+            ),
+            lambda pcm: executor.submit(
+                _whisper_transcribe_pcm, pcm, settings, model, language
+            ),
+            window_s=settings.whisper_batch_window_ms / 1000,
+            max_batch=settings.whisper_batch_max_size,
+        )
+    return batcher
+
+
+async def _run_whisper(
+    pcm: np.ndarray,
+    settings: Settings,
+    *,
+    faster: bool = False,
+) -> str:
+    audio_s = round(pcm.size / SAMPLE_RATE, 3)
+    # модель может отличаться от WHISPER_MODEL, если задачу перенаправил роутер,
+    # язык — подсказка пользователя (None — автоопределение)
+    model = settings.whisper_model
+    language = settings.transcribe_language
+
+    if settings.inference_executor == InferenceExecutorKind.REMOTE:
+        # модель и микро-батчинг живут в воркере (worker.py): движок выбирает он
+        with observe_backend("worker"), span(
+            "inference", backend="worker", audio_s=audio_s, model=model
+        ):
+            return await get_worker_client(settings).transcribe(
+                pcm, model=model, language=language
+            )
+
+    executor = get_inference_executor(settings)
+    if faster:
+        with observe_backend("faster-whisper"), span(
+            "inference", backend="faster-whisper", audio_s=audio_s, model=model
+        ):
+            return await executor.submit(
+                _faster_whisper_transcribe_pcm, pcm, settings, model, language
+            )
+
+    with observe_backend("whisper"), span(
+        "inference", backend="whisper", audio_s=audio_s, model=model
+    ) as current:
+        # короткие клипы от одновременных сообщений склеиваются в один пакет
+        if settings.whisper_batching and MicroBatcher.accepts(pcm):
+            current.set_attribute("batched", True)
+            return await _get_batcher(settings).transcribe(pcm)
+
+        return await executor.submit(
+            _whisper_transcribe_pcm, pcm, settings, model, language
+        )
+
+
+def _chunk_length(
+    pcm: np.ndarray,
+    settings: Settings,
+    on_partial: PartialCallback | None,
+) -> float | None:
+    """
+    Длина чанка, если аудио надо резать, иначе None.
+
+    В стриминговом режиме с STREAMING_CHUNK_S > 0 режем уже от него:
+    частичный текст приходит по мере готовности каждого куска. По умолчанию
+    (0) стриминг нарезку не меняет — один вызов модели на клип короче
+    CHUNK_THRESHOLD_S, частичный текст только у длинных.
+    """
+    if not settings.chunking_enabled:
+        return None
+
+    duration_s = pcm.size / SAMPLE_RATE
+    streaming_chunk_s = settings.streaming_chunk_s if on_partial else 0.0
+    if streaming_chunk_s and duration_s > streaming_chunk_s:
+        return min(settings.streaming_chunk_s, settings.chunk_length_s)
+    if duration_s > settings.chunk_threshold_s:
+        return settings.chunk_length_s
+    return None
+
+
+async def _transcribe_local(
+    pcm: np.ndarray,
+    settings: Settings,
+    on_partial: PartialCallback | None = None,
+    *,
+    faster: bool = False,
+) -> str:
+    """
+    Whisper (faster=True — faster-whisper). Длинное аудио режется на чанки,
+    которые расходятся по воркерам executor'а (в process-режиме — реально
+    параллельно).
+    """
+    chunk_s = _chunk_length(pcm, settings, on_partial)
+    if chunk_s is None:
+        return await _run_whisper(pcm, settings, faster=faster)
+
+    return await transcribe_chunked(
+        pcm,
+        lambda chunk: _run_whisper(chunk, settings, faster=faster),
+        chunk_s=chunk_s,
+        overlap_s=settings.chunk_overlap_s,
+        max_parallel=settings.inference_workers,
+        on_partial=on_partial,
+    )
+
+
+async def _transcribe_deepgram(
+    pcm: np.ndarray,
+    settings: Settings,
+    on_partial: PartialCallback | None = None,
+) -> str:
+    """Deepgram. Длинное аудио — чанками, параллельными запросами."""
+
+    async def run(chunk: np.ndarray) -> str:
+        with observe_backend("deepgram"), span(
+            "inference",
+            backend="deepgram",
+            audio_s=round(chunk.size / SAMPLE_RATE, 3),
+        ):
+            return await deepgram_transcribe(
+                pcm_to_wav_bytes(chunk),
+                api_key=settings.dg_api_key,  # type: ignore[arg-type]
+                api_url=settings.dg_api_url,
+                language=settings.transcribe_language,
+            )
+
+    chunk_s = _chunk_length(pcm, settings, on_partial)
+    if chunk_s is None:
+        return await run(pcm)
+
+    return await transcribe_chunked(
+        pcm,
+        run,
+        chunk_s=chunk_s,
+        overlap_s=settings.chunk_overlap_s,
+        max_parallel=settings.chunk_max_parallel,
+        on_partial=on_partial,
+    )
+
 
 async def transcribe(
-    wav_bytes: bytes,
+    pcm: np.ndarray,
     *,
     settings: Settings,
     user_id: int | None = None,
+    on_partial: PartialCallback | None = None,
 ) -> str:
     """
     Общая точка входа для транскрипции.
 
+    pcm — float32 PCM 16 kHz mono (см. convert_audio_to_pcm_async).
+    on_partial — необязательный колбэк для частичного текста (стриминг).
+
     В зависимости от settings.transcriber_backend
-    выбирает Whisper или Deepgram.
+    выбирает Whisper, faster-whisper или Deepgram. Локальные модели
+    выполняются в inference executor'е, так что event loop не блокируется
+    на время распознавания.
     """
 
     if settings.transcriber_backend == TranscriberBackend.WHISPER:
         logger.debug("Using Whisper backend for transcription: user_id=%s", user_id)
-        return transcribe_wav_bytes(wav_bytes)
+        return await _transcribe_local(pcm, settings, on_partial)
 
-    if settings.transcriber_backend == TranscriberBackend.DEEPGRAM:
-        # safety: если по каким-то причинам ключа нет в settings,
-        # не валимся, а откатываемся на Whisper
-        if not getattr(settings, "dg_api_key", None):
+    if settings.transcriber_backend == TranscriberBackend.FASTER_WHISPER:
+        if not uses_faster_whisper(settings):
+            if not whisper_can_replace_faster_whisper(settings):
+                raise RuntimeError(
+                    f"faster-whisper is not installed, and Whisper has no model "
+                    f"{settings.whisper_model!r} to fall back to"
+                )
             logger.error(
-                "Deepgram backend is configured but dg_api_key is missing. "
-                "Falling back to Whisper. user_id=%s",
+                "faster-whisper backend is configured but the package is not "
+                "installed. Falling back to Whisper. user_id=%s",
                 user_id,
             )
-            return transcribe_wav_bytes(wav_bytes)
+            FALLBACKS_TOTAL.inc(
+                source="faster-whisper", target="whisper", reason="not_installed"
+            )
+            set_attribute("fallback_reason", "not_installed")
+            return await _transcribe_local(pcm, settings, on_partial)
 
         try:
             logger.debug(
-                "Using Deepgram backend for transcription: user_id=%s", user_id
+                "Using faster-whisper backend for transcription: user_id=%s", user_id
             )
-            return await deepgram_transcribe(
-                wav_bytes,
-                api_key=settings.dg_api_key,  # type: ignore[attr-defined]
-            )
-        except DeepgramError:
-            logger.exception(
-                "Deepgram transcription failed, falling back to Whisper. user_id=%s",
-                user_id,
-            )
-            return transcribe_wav_bytes(wav_bytes)
+            return await _transcribe_local(pcm, settings, on_partial, faster=True)
         except Exception:
+            if settings.inference_executor == InferenceExecutorKind.REMOTE:
+                # "fallback на Whisper" ушёл бы в тот же воркер с тем же движком
+                raise
+            if not whisper_can_replace_faster_whisper(settings):
+                # у Whisper нет такой модели (distil-*, путь к CTranslate2)
+                raise
             logger.exception(
-                "Unexpected error in Deepgram backend, falling back to Whisper. "
+                "faster-whisper transcription failed, falling back to Whisper. "
                 "user_id=%s",
                 user_id,
             )
-            return transcribe_wav_bytes(wav_bytes)
+            FALLBACKS_TOTAL.inc(
+                source="faster-whisper", target="whisper", reason="error"
+            )
+            set_attribute("fallback_reason", "error")
+            return await _transcribe_local(pcm, settings, on_partial)
+
+    if settings.transcriber_backend == TranscriberBackend.DEEPGRAM:
+        # safety: если по каким-то причинам ключа нет в settings,
+        # не валимся, а откатываемся на Whisper
+        if not getattr(settings, "dg_api_key", None):
+            logger.error(
+                "Deepgram backend is configured but dg_api_key is missing. "
+                "Falling back to Whisper. user_id=%s",
+                user_id,
+            )
+            FALLBACKS_TOTAL.inc(
+                source="deepgram", target="whisper", reason="no_api_key"
+            )
+            set_attribute("fallback_reason", "no_api_key")
+            return await _transcribe_local(pcm, settings, on_partial)
+
+        logger.debug("Using Deepgram backend for transcription: user_id=%s", user_id)
+        return await get_deepgram_health(settings).run(
+            lambda: _transcribe_deepgram(pcm, settings, on_partial),
+            lambda: _transcribe_local(pcm, settings, on_partial),
+            user_id=user_id,
+            audio_s=pcm.size / SAMPLE_RATE,
+        )
 
     # на всякий случай: если пришло что-то странное в settings.transcriber_backend
     logger.warning(
@@ -66,4 +390,79 @@ async def transcribe(
         settings.transcriber_backend,
         user_id,
     )
-    return transcribe_wav_bytes(wav_bytes)
+    return await _transcribe_local(pcm, settings, on_partial)
+
+
+def uses_passthrough(settings: Settings) -> bool:
+    """Уходит ли исходный файл в Deepgram без локальной конвертации."""
+    return bool(
+        settings.transcriber_backend == TranscriberBackend.DEEPGRAM
+        and settings.dg_passthrough
+        and settings.dg_api_key
+    )
+
+
+async def transcribe_encoded(
+    data: bytes,
+    *,
+    mime_type: str,
+    load_pcm: PcmLoader,
+    settings: Settings,
+    user_id: int | None = None,
+    on_partial: PartialCallback | None = None,
+    duration_s: float | None = None,
+) -> str:
+    """
+    Точка входа для исходного (сжатого) файла.
+
+    Deepgram с DG_PASSTHROUGH получает байты как есть с Content-Type из
+    mime_type: OGG/Opus в разы меньше WAV, и ffmpeg локально не нужен.
+    load_pcm вызывается только если нужен Whisper — как основной бэкенд,
+    как fallback (ошибка Deepgram, разомкнутый circuit breaker) или хедж.
+
+    Частичного текста в passthrough-режиме нет: файл уходит одним запросом.
+    duration_s — длительность из метаданных Telegram: файл не декодирован,
+    а порогу хеджа нужна длина аудио.
+    """
+    if not uses_passthrough(settings):
+        pcm = await load_pcm()
+        if pcm is None:
+            return ""
+        return await transcribe(
+            pcm,
+            settings=settings,
+            user_id=user_id,
+            on_partial=on_partial,
+        )
+
+    async def run_local() -> str:
+        pcm = await load_pcm()
+        if pcm is None:
+            return ""
+        return await _transcribe_local(pcm, settings, on_partial)
+
+    logger.debug(
+        "Using Deepgram passthrough: user_id=%s, mime_type=%s, size=%d bytes",
+        user_id,
+        mime_type,
+        len(data),
+    )
+
+    async def run_deepgram() -> str:
+        with observe_backend("deepgram"), span(
+            "inference", backend="deepgram", input_size=len(data)
+        ):
+            return await deepgram_transcribe(
+                data,
+                api_key=settings.dg_api_key,  # type: ignore[arg-type]
+                api_url=settings.dg_api_url,
+                content_type=mime_type,
+                language=settings.transcribe_language,
+            )
+
+    return await get_deepgram_health(settings).run(
+        run_deepgram,
+        run_local,
+        user_id=user_id,
+        audio_s=duration_s,
+    )
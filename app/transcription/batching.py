@@ -0,0 +1,161 @@
+# app/transcription/batching.py
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+
+import numpy as np
+
+from app.utils.audio import SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+# Одно окно Whisper — в пакет попадают только клипы не длиннее него
+MAX_BATCH_CLIP_S = 30
+MAX_BATCH_CLIP_SAMPLES = MAX_BATCH_CLIP_S * SAMPLE_RATE
+
+BatchRunner = Callable[[list[np.ndarray]], Awaitable[list[str]]]
+SingleRunner = Callable[[np.ndarray], Awaitable[str]]
+
+
+class MicroBatcher:
+    """
+    Собирает одновременные короткие запросы в пакеты.
+
+    Первый запрос открывает окно window_s; всё, что пришло за это время
+    (но не больше max_batch), уходит в run_batch одним вызовом, результаты
+    раздаются ожидающим. Пакет из одного клипа идёт через run_single —
+    обычный путь без потерь в качестве.
+    """
+
+    def __init__(
+        self,
+        run_batch: BatchRunner,
+        run_single: SingleRunner,
+        *,
+        window_s: float,
+        max_batch: int,
+    ) -> None:
+        self._run_batch = run_batch
+        self._run_single = run_single
+        self.window_s = window_s
+        self.max_batch = max(1, max_batch)
+
+        self._pending: list[tuple[np.ndarray, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+        self.batches = 0
+        self.batched_items = 0
+
+    def close(self) -> None:
+        """Остановка: таймер окна снимается, ожидающие получают ошибку."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        for _, future in pending:
+            if not future.done():
+                future.set_exception(RuntimeError("micro-batcher is closed"))
+        for task in self._tasks:
+            task.cancel()
+
+    @staticmethod
+    def accepts(pcm: np.ndarray) -> bool:
+        return 0 < pcm.size <= MAX_BATCH_CLIP_SAMPLES
+
+    async def transcribe(self, pcm: np.ndarray) -> str:
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future = loop.create_future()
+        self._pending.append((pcm, future))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_s, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._pending:
+            batch = self._pending[: self.max_batch]
+            del self._pending[: self.max_batch]
+
+            # ожидающий мог уже уйти (отмена) — не тратим на него инференс
+            batch = [(pcm, future) for pcm, future in batch if not future.done()]
+            if not batch:
+                continue
+
+            task = asyncio.create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list[tuple[np.ndarray, asyncio.Future]]) -> None:
+        pcms = [pcm for pcm, _ in batch]
+        try:
+            if len(pcms) == 1:
+                results = [await self._run_single(pcms[0])]
+            else:
+                self.batches += 1
+                self.batched_items += len(pcms)
+                logger.debug("Running Whisper micro-batch of %d clips", len(pcms))
+                results = await self._run_batch(pcms)
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:  # noqa: BLE001 — ошибка уходит в futures
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), text in zip(batch, results):
+            if not future.done():
+                future.set_result(text)
+
+
+if __name__ == "__main__":
+    # Пропускная способность: пакетный путь против обычного.
+    # python -m app.transcription.batching [clips.wav ...]
+    import sys
+    import time
+    from pathlib import Path
+
+    from app.transcription.whisper_backend import (
+        get_model,
+        transcribe_pcm,
+        transcribe_pcm_batch,
+    )
+    from app.utils.audio import wav_bytes_to_pcm
+    from app.warmup import synthetic_clip_wav
+
+    logging.basicConfig(level=logging.WARNING)
+
+    if len(sys.argv) > 1:
+        clips = [wav_bytes_to_pcm(Path(p).read_bytes()) for p in sys.argv[1:]]
+    else:
+        clips = [wav_bytes_to_pcm(synthetic_clip_wav(5.0)) for _ in range(8)]
+
+    get_model()
+    transcribe_pcm(clips[0])  # прогрев
+
+    started = time.perf_counter()
+    for clip in clips:
+        transcribe_pcm(clip)
+    unbatched_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    transcribe_pcm_batch(clips)
+    batched_s = time.perf_counter() - started
+
+    audio_s = sum(clip.size for clip in clips) / SAMPLE_RATE
+    print(f"clips={len(clips)} audio={audio_s:.1f}s")
+    print(f"unbatched: {unbatched_s:.2f}s ({len(clips) / unbatched_s:.2f} clips/s)")
+    print(f"batched:   {batched_s:.2f}s ({len(clips) / batched_s:.2f} clips/s)")
+    print(f"speedup:   x{unbatched_s / batched_s:.2f}")
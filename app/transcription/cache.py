@@ -0,0 +1,297 @@
+# app/transcription/cache.py
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+
+from app.config import Settings
+from app.metrics import CACHE_LOOKUPS_TOTAL
+
+logger = logging.getLogger(__name__)
+
+
+def file_cache_key(tag: str, file_unique_id: str) -> str:
+    """Ключ по Telegram file_unique_id (один и тот же файл при пересылке)."""
+    return f"{tag}:file:{file_unique_id}"
+
+
+def content_cache_key(tag: str, data: bytes) -> str:
+    """Запасной ключ по содержимому: тот же звук, загруженный заново."""
+    return content_digest_cache_key(tag, hashlib.sha256(data).hexdigest())
+
+
+def content_digest_cache_key(tag: str, sha256_hex: str) -> str:
+    """content_cache_key по готовому sha256 (хэш считался по кускам при скачивании)."""
+    return f"{tag}:sha256:{sha256_hex}"
+
+
+class _MemoryLRU:
+    """Простой LRU в памяти с TTL. Не потокобезопасен — живёт в event loop."""
+
+    def __init__(self, max_entries: int, ttl_s: float) -> None:
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._data: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+    def get(self, key: str) -> str | None:
+        item = self._data.get(key)
+        if item is None:
+            return None
+
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+
+        self._data.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: str) -> None:
+        self._data[key] = (time.monotonic() + self.ttl_s, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class _SqliteStore:
+    """
+    Дисковый уровень кэша. Переживает рестарты и общий для нескольких процессов.
+    Все методы блокирующие — вызываются через asyncio.to_thread.
+    """
+
+    def __init__(self, path: Path, max_entries: int, ttl_s: float) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS transcripts ("
+            " key TEXT PRIMARY KEY,"
+            " text TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS transcripts_accessed_at"
+            " ON transcripts (accessed_at)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text, created_at FROM transcripts WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+
+            text, created_at = row
+            if created_at + self.ttl_s < now:
+                self._conn.execute("DELETE FROM transcripts WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+
+            self._conn.execute(
+                "UPDATE transcripts SET accessed_at = ? WHERE key = ?",
+                (now, key),
+            )
+            self._conn.commit()
+            return text
+
+    def put(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO transcripts (key, text, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            # Эвикция: сначала всё протухшее, потом самые давно читанные
+            self._conn.execute(
+                "DELETE FROM transcripts WHERE created_at < ?",
+                (now - self.ttl_s,),
+            )
+            self._conn.execute(
+                "DELETE FROM transcripts WHERE key IN ("
+                " SELECT key FROM transcripts ORDER BY accessed_at DESC"
+                " LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class TranscriptCache:
+    """
+    Кэш распознанных текстов: LRU в памяти + (опционально) SQLite на диске.
+
+    Одновременные запросы на один и тот же ключ склеиваются в одну задачу:
+    второй пользователь, переславший то же голосовое, ждёт результат первого.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int,
+        ttl_s: float,
+        db_path: Path | None = None,
+        db_max_entries: int = 100_000,
+    ) -> None:
+        self._memory = _MemoryLRU(max_entries, ttl_s)
+        self._disk = (
+            _SqliteStore(db_path, db_max_entries, ttl_s) if db_path else None
+        )
+        self._inflight: dict[str, asyncio.Task[str]] = {}
+
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get(self, key: str) -> str | None:
+        value = await self._lookup(key)
+        if value is None:
+            self._count_miss()
+        return value
+
+    def _count_miss(self) -> None:
+        self.misses += 1
+        CACHE_LOOKUPS_TOTAL.inc(result="miss")
+
+    async def _lookup(self, key: str) -> str | None:
+        """Память, затем диск; считает попадания, но не промахи."""
+        value = self._memory.get(key)
+        if value is not None:
+            self.hits_memory += 1
+            CACHE_LOOKUPS_TOTAL.inc(result="hit_memory")
+            logger.debug("Transcript cache hit (memory): key=%s", key)
+            return value
+
+        if self._disk is not None:
+            value = await asyncio.to_thread(self._disk.get, key)
+            if value is not None:
+                self.hits_disk += 1
+                CACHE_LOOKUPS_TOTAL.inc(result="hit_disk")
+                self._memory.put(key, value)
+                logger.debug("Transcript cache hit (disk): key=%s", key)
+                return value
+
+        return None
+
+    async def put(self, key: str, value: str) -> None:
+        self._memory.put(key, value)
+        if self._disk is not None:
+            try:
+                await asyncio.to_thread(self._disk.put, key, value)
+            except sqlite3.Error:
+                # дисковый кэш — оптимизация, падать из-за него не будем
+                logger.exception("Failed to write transcript to disk cache")
+
+    async def get_or_compute(
+        self,
+        key: str,
+        factory: Callable[[], Awaitable[str]],
+    ) -> str:
+        """
+        Возвращает значение из кэша или вычисляет его через factory().
+
+        Если такой же ключ уже считается — ждём ту же задачу, а не запускаем
+        вторую. Исключения factory() получают все ожидающие; в кэш они не попадают.
+        """
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            CACHE_LOOKUPS_TOTAL.inc(result="coalesced")
+            logger.debug("Transcript job coalesced: key=%s", key)
+            return await asyncio.shield(inflight)
+
+        cached = await self._lookup(key)
+        if cached is not None:
+            return cached
+
+        # за время похода в SQLite кто-то мог уже запустить задачу;
+        # промах считает только тот, кто её запускает
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            CACHE_LOOKUPS_TOTAL.inc(result="coalesced")
+            return await asyncio.shield(inflight)
+        self._count_miss()
+
+        async def _run() -> str:
+            value = await factory()
+            await self.put(key, value)
+            return value
+
+        task = asyncio.create_task(_run())
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits_memory": self.hits_memory,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "memory_entries": len(self._memory),
+            "inflight": len(self._inflight),
+        }
+
+    def close(self) -> None:
+        if self._disk is not None:
+            self._disk.close()
+
+
+_cache: TranscriptCache | None = None
+
+
+def get_transcript_cache(settings: Settings) -> TranscriptCache | None:
+    """Общий кэш приложения. None, если кэш выключен (CACHE_ENABLED=false)."""
+    global _cache
+    if not settings.cache_enabled:
+        return None
+
+    if _cache is None:
+        _cache = TranscriptCache(
+            max_entries=settings.cache_max_entries,
+            ttl_s=settings.cache_ttl_s,
+            db_path=settings.cache_db_path,
+            db_max_entries=settings.cache_db_max_entries,
+        )
+        logger.info(
+            "Transcript cache enabled: max_entries=%d ttl_s=%.0f db_path=%s",
+            settings.cache_max_entries,
+            settings.cache_ttl_s,
+            settings.cache_db_path,
+        )
+    return _cache
+
+
+def close_transcript_cache() -> None:
+    global _cache
+    if _cache is None:
+        return
+    logger.info("Transcript cache stats at shutdown: %s", _cache.stats())
+    _cache.close()
+    _cache = None
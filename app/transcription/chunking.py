@@ -0,0 +1,191 @@
+# app/transcription/chunking.py
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import re
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.utils.audio import SAMPLE_RATE
+from app.utils.vad import FRAME_MS, frame_energy_db
+
+logger = logging.getLogger(__name__)
+
+PartialCallback = Callable[[str], Awaitable[None]]
+
+# сколько слов максимум ищем на стыке двух чанков
+MAX_OVERLAP_WORDS = 20
+# меньше двух слов — не повтор, а совпадение ("и", "the"): такое не режем
+MIN_OVERLAP_WORDS = 2
+# быстрая речь — ~3 слова в секунду; столько слов помещается в overlap_s
+WORDS_PER_SECOND = 3.0
+
+
+@dataclass
+class AudioChunk:
+    index: int
+    start_s: float
+    pcm: np.ndarray  # view на исходный массив, без копии
+
+    @property
+    def duration_s(self) -> float:
+        return self.pcm.size / SAMPLE_RATE
+
+
+def split_on_silence(
+    pcm: np.ndarray,
+    *,
+    chunk_s: float,
+    overlap_s: float,
+    search_s: float = 5.0,
+    sample_rate: int = SAMPLE_RATE,
+) -> list[AudioChunk]:
+    """
+    Режет длинный PCM на куски ~chunk_s.
+
+    Граница ищется в последних search_s секундах каждого куска — в самом
+    тихом кадре, чтобы не резать посреди слова. Следующий кусок начинается
+    на overlap_s раньше границы: слово на стыке попадёт в оба куска,
+    а дубль уберёт stitch_texts.
+    """
+    total = pcm.size
+    chunk_len = int(chunk_s * sample_rate)
+    if total <= chunk_len:
+        return [AudioChunk(0, 0.0, pcm)]
+
+    frame_len = sample_rate * FRAME_MS // 1000
+    energy = frame_energy_db(pcm, sample_rate=sample_rate)
+    overlap = int(overlap_s * sample_rate)
+    search = int(search_s * sample_rate)
+
+    chunks: list[AudioChunk] = []
+    start = 0
+    while start < total:
+        end = start + chunk_len
+        if end >= total:
+            end = total
+        else:
+            lo = max(start + chunk_len // 2, end - search) // frame_len
+            hi = end // frame_len
+            if hi > lo:
+                quietest = lo + int(np.argmin(energy[lo:hi]))
+                end = quietest * frame_len + frame_len // 2
+
+        chunks.append(AudioChunk(len(chunks), start / sample_rate, pcm[start:end]))
+        if end >= total:
+            break
+        start = max(end - overlap, start + 1)
+
+    return chunks
+
+
+def _normalize(word: str) -> str:
+    return re.sub(r"[^\w]", "", word.lower())
+
+
+def overlap_words(overlap_s: float) -> int:
+    """Сколько слов максимум умещается в перекрытие чанков (+1 — слово на стыке)."""
+    if overlap_s <= 0:
+        return 0
+    return math.ceil(overlap_s * WORDS_PER_SECOND) + 1
+
+
+def stitch_texts(
+    texts: list[str],
+    *,
+    max_overlap_words: int = MAX_OVERLAP_WORDS,
+    min_overlap_words: int = MIN_OVERLAP_WORDS,
+) -> str:
+    """
+    Склеивает тексты соседних чанков, убирая повтор на стыке:
+    самый длинный суффикс предыдущего текста, совпадающий с префиксом
+    следующего (сравнение без регистра и пунктуации), от min_overlap_words
+    до max_overlap_words слов.
+
+    Если длина перекрытия известна (transcribe_chunked), поиск ограничен
+    словами, которые в него помещаются, и одно совпавшее слово — уже повтор:
+    оба чанка распознавали один и тот же кусок звука.
+    """
+    words: list[str] = []
+    for text in texts:
+        new_words = text.split()
+        if not new_words:
+            continue
+
+        max_k = min(max_overlap_words, len(words), len(new_words))
+        tail = [_normalize(w) for w in words[-max_k:]] if max_k else []
+        head = [_normalize(w) for w in new_words[:max_k]]
+
+        overlap = 0
+        for k in range(max_k, max(1, min_overlap_words) - 1, -1):
+            if tail[-k:] == head[:k]:
+                overlap = k
+                break
+
+        words.extend(new_words[overlap:])
+
+    return " ".join(words)
+
+
+async def transcribe_chunked(
+    pcm: np.ndarray,
+    transcribe_one: Callable[[np.ndarray], Awaitable[str]],
+    *,
+    chunk_s: float,
+    overlap_s: float,
+    max_parallel: int,
+    on_partial: PartialCallback | None = None,
+) -> str:
+    """
+    Длинное аудио: нарезка по тишине, параллельное распознавание чанков
+    (не больше max_parallel одновременно) и склейка результата по порядку.
+
+    on_partial, если задан, вызывается со склеенным текстом всех готовых
+    чанков подряд от начала — по мере их завершения.
+    """
+    chunks = split_on_silence(pcm, chunk_s=chunk_s, overlap_s=overlap_s)
+    logger.info(
+        "Chunked transcription: duration=%.1fs, chunks=%d, max_parallel=%d",
+        pcm.size / SAMPLE_RATE,
+        len(chunks),
+        max_parallel,
+    )
+
+    def stitch(texts: list[str]) -> str:
+        return stitch_texts(
+            texts, max_overlap_words=overlap_words(overlap_s), min_overlap_words=1
+        )
+
+    semaphore = asyncio.Semaphore(max(1, max_parallel))
+    results: list[str | None] = [None] * len(chunks)
+    emitted = 0  # сколько чанков подряд от начала уже отдано в on_partial
+
+    async def run(chunk: AudioChunk) -> str:
+        nonlocal emitted
+
+        async with semaphore:
+            text = await transcribe_one(chunk.pcm)
+        logger.debug(
+            "Chunk %d done: start=%.1fs, duration=%.1fs, text_len=%d",
+            chunk.index,
+            chunk.start_s,
+            chunk.duration_s,
+            len(text),
+        )
+
+        results[chunk.index] = text
+        if on_partial is not None:
+            ready = emitted
+            while ready < len(results) and results[ready] is not None:
+                ready += 1
+            if ready > emitted:
+                emitted = ready
+                await on_partial(stitch(results[:ready]))  # type: ignore[arg-type]
+        return text
+
+    texts = await asyncio.gather(*(run(chunk) for chunk in chunks))
+    return stitch(list(texts))
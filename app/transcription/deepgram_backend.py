@@ -1,11 +1,16 @@
 # app/transcription/deepgram_backend.py
 from __future__ import annotations
 
+import asyncio
+import importlib.util
 import logging
 from typing import Any
 
 import httpx
 
+from app.config import Settings
+from app.tracing import span
+
 logger = logging.getLogger(__name__)
 
 DEEPGRAM_API_URL = "https://api.deepgram.com/v1/listen"
@@ -13,52 +18,196 @@ DEFAULT_MODEL = "nova-3-general"  # хороший дефолт для обще
 
 
 class DeepgramError(Exception):
-    """Базовое исключение для ошибок Deepgram."""
+    """
+    Базовое исключение для ошибок Deepgram.
+
+    transient — сбой самого сервиса (сеть, таймаут, 5xx, 429): его считает
+    circuit breaker. Ответ 4xx или неожиданное тело — проблема запроса,
+    цепь из-за неё не размыкается.
+    """
+
+    def __init__(
+        self,
+        message: str,
+        *,
+        status_code: int | None = None,
+        transient: bool = False,
+    ) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+        self.transient = transient
+
+
+class DeepgramClient:
+    """
+    Долгоживущий HTTP-клиент для Deepgram.
+
+    Один пул соединений на всё приложение: keep-alive (и HTTP/2, если
+    установлен h2), так что каждое сообщение не платит за новый TCP + TLS.
+    Семафор ограничивает число одновременных запросов к Deepgram.
+    """
+
+    def __init__(
+        self,
+        *,
+        api_url: str = DEEPGRAM_API_URL,
+        timeout_s: float = 30.0,
+        connect_timeout_s: float = 5.0,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry_s: float = 60.0,
+        http2: bool = True,
+        max_in_flight: int = 8,
+    ) -> None:
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning(
+                "DG_HTTP2=true, but the 'h2' package is not installed. "
+                "Falling back to HTTP/1.1 keep-alive."
+            )
+            http2 = False
+
+        self.api_url = api_url
+        self.http2 = http2
+        self._client = httpx.AsyncClient(
+            http2=http2,
+            timeout=httpx.Timeout(timeout_s, connect=connect_timeout_s),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry_s,
+            ),
+        )
+        self._semaphore = asyncio.Semaphore(max(1, max_in_flight))
+
+    async def post(
+        self,
+        *,
+        params: dict[str, str],
+        headers: dict[str, str],
+        content: bytes,
+    ) -> httpx.Response:
+        async with self._semaphore:
+            return await self._client.post(
+                self.api_url,
+                params=params,
+                headers=headers,
+                content=content,
+            )
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+_client: DeepgramClient | None = None
+
+
+def init_deepgram_client(settings: Settings) -> DeepgramClient:
+    """Создаёт общий клиент приложения (вызывается на старте)."""
+    global _client
+    if _client is None:
+        _client = DeepgramClient(
+            api_url=settings.dg_api_url,
+            timeout_s=settings.dg_timeout_s,
+            connect_timeout_s=settings.dg_connect_timeout_s,
+            max_connections=settings.dg_max_connections,
+            max_keepalive_connections=settings.dg_max_keepalive_connections,
+            keepalive_expiry_s=settings.dg_keepalive_expiry_s,
+            http2=settings.dg_http2,
+            max_in_flight=settings.dg_max_in_flight,
+        )
+        logger.info(
+            "Deepgram client initialized: url=%s http2=%s max_connections=%d "
+            "max_in_flight=%d",
+            _client.api_url,
+            _client.http2,
+            settings.dg_max_connections,
+            settings.dg_max_in_flight,
+        )
+    return _client
+
+
+def get_deepgram_client() -> DeepgramClient | None:
+    return _client
+
+
+async def close_deepgram_client() -> None:
+    """Закрывает пул соединений (вызывается на остановке)."""
+    global _client
+    if _client is None:
+        return
+    await _client.aclose()
+    _client = None
+    logger.info("Deepgram client closed")
 
 
 async def transcribe(
-    wav_bytes: bytes,
+    audio_bytes: bytes,
     *,
     api_key: str,
+    content_type: str = "audio/wav",
+    language: str | None = None,
+    api_url: str = DEEPGRAM_API_URL,
     timeout_s: float = 30.0,
+    client: DeepgramClient | None = None,
 ) -> str:
     """
-    Отправляет WAV-байты в Deepgram и возвращает текст.
+    Отправляет аудио в Deepgram и возвращает текст.
+
+    audio_bytes — либо исходный файл как есть (OGG/Opus, MP3, MP4 —
+    Deepgram декодирует сам, content_type берётся из mime_type сообщения),
+    либо WAV 16 kHz mono после pcm_to_wav_bytes.
 
-    Ожидается, что аудио уже в формате:
-    - WAV
-    - 16 kHz
-    - mono
+    language — язык речи (подсказка пользователя); None — Deepgram
+    определяет язык сам (detect_language).
 
-    Этим занимается convert_audio_bytes.
+    Запрос идёт через client или общий клиент приложения
+    (init_deepgram_client). Если ни того, ни другого нет — создаётся
+    одноразовый клиент на api_url с timeout_s (удобно для скриптов);
+    у общего клиента свой api_url (DG_API_URL).
     """
-    if not wav_bytes:
-        logger.warning("Deepgram: empty wav_bytes")
+    if not audio_bytes:
+        logger.warning("Deepgram: empty audio_bytes")
         return ""
 
     headers = {
         "Authorization": f"Token {api_key}",
-        "Content-Type": "audio/wav",
+        "Content-Type": content_type,
     }
 
-    # detect_language=true — пусть сам понимает, что там за язык
     params = {
         "model": DEFAULT_MODEL,
         "smart_format": "true",
-        "detect_language": "true",
     }
+    if language:
+        params["language"] = language
+    else:
+        # detect_language=true — пусть сам понимает, что там за язык
+        params["detect_language"] = "true"
 
-    try:
-        async with httpx.AsyncClient(timeout=timeout_s) as client:
-            response = await client.post(
-                DEEPGRAM_API_URL,
-                params=params,
-                headers=headers,
-                content=wav_bytes,
-            )
-    except httpx.RequestError as exc:
-        logger.error("Deepgram request error: %s", exc)
-        raise DeepgramError("Deepgram request failed") from exc
+    client = client or _client
+
+    with span(
+        "deepgram_request", input_size=len(audio_bytes), content_type=content_type
+    ) as request_span:
+        try:
+            if client is not None:
+                response = await client.post(
+                    params=params,
+                    headers=headers,
+                    content=audio_bytes,
+                )
+            else:
+                async with httpx.AsyncClient(timeout=timeout_s) as one_off:
+                    response = await one_off.post(
+                        api_url,
+                        params=params,
+                        headers=headers,
+                        content=audio_bytes,
+                    )
+        except httpx.RequestError as exc:
+            logger.error("Deepgram request error: %s", exc)
+            raise DeepgramError("Deepgram request failed", transient=True) from exc
+        request_span.set_attribute("status_code", response.status_code)
 
     if response.status_code >= 400:
         snippet = response.text[:500]
@@ -67,7 +216,11 @@ async def transcribe(
             response.status_code,
             snippet,
         )
-        raise DeepgramError(f"Deepgram API error, status={response.status_code}")
+        raise DeepgramError(
+            f"Deepgram API error, status={response.status_code}",
+            status_code=response.status_code,
+            transient=response.status_code == 429 or response.status_code >= 500,
+        )
 
     try:
         data: dict[str, Any] = response.json()
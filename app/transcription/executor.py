@@ -0,0 +1,228 @@
+# app/transcription/executor.py
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import logging
+import multiprocessing
+import threading
+from collections.abc import Callable
+from concurrent.futures import (
+    BrokenExecutor,
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from typing import Any, TypeVar
+
+from app.config import InferenceExecutorKind, Settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Флаг отмены текущей задачи пула. В thread-режиме submit кладёт его в копию
+# контекста, и инференс проверяет его между шагами (raise_if_cancelled)
+_cancel_event: contextvars.ContextVar[threading.Event | None] = (
+    contextvars.ContextVar("inference_cancel_event", default=None)
+)
+
+
+class InferenceCancelled(Exception):
+    """Задачу пула отменили, пока она выполнялась (например, проиграл хедж)."""
+
+
+def raise_if_cancelled() -> None:
+    """
+    Вызывается из инференса (хуки модели Whisper, цикл сегментов
+    faster-whisper): прерывает задачу, которую отменили в event loop.
+    Вне thread-режима executor'а ничего не делает.
+    """
+    event = _cancel_event.get()
+    if event is not None and event.is_set():
+        raise InferenceCancelled
+
+
+def _init_worker() -> None:
+    """
+    Инициализатор воркера пула.
+
+    Загружает модель согласно WHISPER_LOAD_POLICY. В process-режиме каждый
+    процесс держит свою копию, в thread-режиме модель одна на процесс
+    (повторная инициализация в другом потоке ничего не грузит).
+
+    Для TRANSCRIBER_BACKEND=faster-whisper грузится модель CTranslate2;
+    обычный Whisper тогда поднимется лениво, только если понадобится fallback.
+    """
+    from app.config import get_settings
+    from app.transcription import uses_faster_whisper
+
+    if uses_faster_whisper(get_settings()):
+        from app.transcription import faster_whisper_backend
+
+        faster_whisper_backend.init_model()
+        return
+
+    from app.transcription import whisper_backend
+
+    whisper_backend.init_model()
+
+
+def _noop() -> None:
+    return None
+
+
+def _is_broken(pool: Executor) -> bool:
+    # Thread/ProcessPoolExecutor выставляют _broken, когда упал инициализатор
+    # или процесс-воркер; публичного способа это узнать нет
+    return bool(getattr(pool, "_broken", False))
+
+
+class InferenceExecutor:
+    """
+    Пул, в котором выполняется синхронный инференс (Whisper / faster-whisper).
+
+    - thread: один процесс, одна модель, вызовы model.transcribe
+      сериализуются внутри whisper_backend. Event loop при этом свободен.
+    - process: N процессов, у каждого своя копия модели —
+      N сообщений реально распознаются параллельно.
+    - remote: инференс в отдельном воркере (worker.py, worker_client);
+      этот пул моделей не держит.
+    """
+
+    def __init__(self, kind: InferenceExecutorKind, workers: int = 1) -> None:
+        self.kind = kind
+        self.workers = max(1, workers)
+        self._pool: Executor | None = None
+
+    def _ensure_pool(self) -> Executor:
+        if self._pool is not None:
+            if not _is_broken(self._pool):
+                return self._pool
+            self._discard(self._pool)
+
+        if self.kind == InferenceExecutorKind.PROCESS:
+            # spawn, а не fork: форк процесса с уже загруженным torch
+            # легко ловит дедлоки во внутренних пулах потоков.
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        elif self.kind == InferenceExecutorKind.REMOTE:
+            # модель в воркере-демоне; локально не грузим ничего
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="inference",
+            )
+        else:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="inference",
+                initializer=_init_worker,
+            )
+
+        logger.info(
+            "Inference executor started: kind=%s workers=%d",
+            self.kind.value,
+            self.workers,
+        )
+        return self._pool
+
+    def _discard(self, pool: Executor) -> None:
+        """
+        Выбрасывает сломанный пул: Broken*Pool не принимает задач до конца
+        жизни процесса, а следующий вызов _ensure_pool поднимет новый.
+        """
+        if self._pool is not pool:
+            # пул уже пересоздан параллельным вызовом
+            return
+        logger.warning(
+            "Inference executor is broken, recreating the pool: kind=%s",
+            self.kind.value,
+        )
+        self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    async def start(self) -> None:
+        """
+        Поднимает пул и дожидается инициализации воркера. При
+        WHISPER_LOAD_POLICY=eager это включает загрузку модели,
+        чтобы первое сообщение не платило за холодный старт.
+
+        В remote-режиме модель грузит worker.py, здесь делать нечего.
+        """
+        if self.kind == InferenceExecutorKind.REMOTE:
+            return
+        await self.submit(_noop)
+
+    async def submit(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Выполняет fn(*args, **kwargs) в пуле и ждёт результат, не блокируя loop.
+
+        Для process-режима fn и аргументы должны быть picklable
+        (функции уровня модуля, bytes и т.п.).
+
+        Отмена ожидающей корутины в thread-режиме останавливает и саму
+        задачу (см. raise_if_cancelled); в process-режиме задача, которую
+        воркер уже начал, досчитывается.
+        """
+        pool = self._ensure_pool()
+        loop = asyncio.get_running_loop()
+        call = functools.partial(fn, *args, **kwargs)
+        cancel: threading.Event | None = None
+        if self.kind == InferenceExecutorKind.THREAD:
+            # run_in_executor не переносит contextvars: без этого спаны
+            # и job_id из воркера не привязались бы к трейсу сообщения
+            context = contextvars.copy_context()
+            cancel = threading.Event()
+            context.run(_cancel_event.set, cancel)
+            call = functools.partial(context.run, call)
+        try:
+            return await loop.run_in_executor(pool, call)
+        except asyncio.CancelledError:
+            # уже запущенную в потоке задачу отмена future не останавливает —
+            # её прервёт raise_if_cancelled на ближайшем шаге модели
+            if cancel is not None:
+                cancel.set()
+            raise
+        except BrokenExecutor:
+            # не загрузилась модель в инициализаторе или процесс-воркер
+            # убит (OOM): эта задача падает, следующая пойдёт в новый пул
+            self._discard(pool)
+            raise
+
+    def shutdown(self, *, wait: bool = True) -> None:
+        if self._pool is None:
+            return
+
+        logger.info("Shutting down inference executor: kind=%s", self.kind.value)
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+        self._pool = None
+
+
+_executor: InferenceExecutor | None = None
+
+
+def get_inference_executor(settings: Settings) -> InferenceExecutor:
+    """Возвращает общий для приложения executor (создаётся лениво)."""
+    global _executor
+    if _executor is None:
+        _executor = InferenceExecutor(
+            settings.inference_executor,
+            workers=settings.inference_workers,
+        )
+    return _executor
+
+
+def shutdown_inference_executor(*, wait: bool = True) -> None:
+    """Хук остановки: вызывается из main.py / webapp.py."""
+    from app.transcription import reset_batchers
+
+    global _executor
+    reset_batchers()
+    if _executor is None:
+        return
+    _executor.shutdown(wait=wait)
+    _executor = None
@@ -0,0 +1,171 @@
+import logging
+import threading
+
+import numpy as np
+from faster_whisper import WhisperModel
+
+from app.config import (
+    InferenceExecutorKind,
+    ModelLoadPolicy,
+    Settings,
+    get_settings,
+)
+from app.tracing import span
+from app.transcription.executor import InferenceCancelled, raise_if_cancelled
+from app.utils.audio import SAMPLE_RATE, wav_bytes_to_pcm
+
+logger = logging.getLogger(__name__)
+
+# Та же схема, что и в whisper_backend: модель грузится по WHISPER_LOAD_POLICY.
+# Лок на transcribe не нужен — CTranslate2 сам раскладывает параллельные
+# вызовы по num_workers.
+# Ключ — имя модели (см. whisper_backend._models).
+_models: dict[str, WhisperModel] = {}
+_load_lock = threading.Lock()
+
+
+def get_model(
+    name: str | None = None,
+    settings: Settings | None = None,
+) -> WhisperModel:
+    """
+    Возвращает модель CTranslate2 name (по умолчанию WHISPER_MODEL),
+    загружая её при первом обращении.
+
+    settings нужны только для загрузки; без них читается окружение.
+    """
+    if name is not None:
+        model = _models.get(name)
+        if model is not None:
+            return model
+
+    settings = settings or get_settings()
+    name = name or settings.whisper_model
+
+    model = _models.get(name)
+    if model is not None:
+        return model
+
+    with _load_lock:
+        if name not in _models:
+            # в thread-режиме все воркеры делят одну модель
+            num_workers = (
+                settings.inference_workers
+                if settings.inference_executor == InferenceExecutorKind.THREAD
+                else 1
+            )
+
+            logger.info(
+                "Loading faster-whisper model %r (device=%s, compute_type=%s, "
+                "cpu_threads=%s, num_workers=%d)...",
+                name,
+                settings.whisper_device or "auto",
+                settings.fw_compute_type,
+                settings.fw_cpu_threads or "default",
+                num_workers,
+            )
+            _models[name] = WhisperModel(
+                name,
+                device=settings.whisper_device or "auto",
+                compute_type=settings.fw_compute_type,
+                cpu_threads=settings.fw_cpu_threads,
+                num_workers=num_workers,
+                download_root=(
+                    str(settings.whisper_download_root)
+                    if settings.whisper_download_root
+                    else None
+                ),
+            )
+            logger.info("faster-whisper model %r loaded successfully", name)
+
+    return _models[name]
+
+
+def is_model_loaded(name: str | None = None) -> bool:
+    return (name or get_settings().whisper_model) in _models
+
+
+def init_model() -> None:
+    """Применяет WHISPER_LOAD_POLICY (см. whisper_backend.init_model)."""
+    policy = get_settings().whisper_load_policy
+
+    if policy == ModelLoadPolicy.EAGER:
+        get_model()
+    elif policy == ModelLoadPolicy.BACKGROUND:
+        threading.Thread(
+            target=get_model,
+            name="faster-whisper-preload",
+            daemon=True,
+        ).start()
+    else:
+        logger.info("faster-whisper model will be loaded lazily on first use")
+
+
+def transcribe_pcm(
+    pcm: np.ndarray,
+    model_name: str | None = None,
+    language: str | None = None,
+    *,
+    settings: Settings | None = None,
+) -> str:
+    """float32 PCM 16 kHz mono -> текст, как whisper_backend.transcribe_pcm."""
+    if pcm is None or pcm.size == 0:
+        logger.warning("transcribe_pcm called with empty pcm")
+        raise ValueError("pcm пустой — нечего распознавать")
+
+    settings = settings or get_settings()
+    model_name = model_name or settings.whisper_model
+    model = get_model(model_name, settings)
+
+    duration_s = pcm.size / SAMPLE_RATE
+    logger.debug("Starting faster-whisper transcription: duration=%.2fs", duration_s)
+
+    with span(
+        "whisper_decode",
+        audio_s=round(duration_s, 3),
+        model=model_name,
+        language_hint=language,
+    ) as decode_span:
+        try:
+            # segments — генератор: декодирование идёт по мере итерации
+            segments, info = model.transcribe(
+                pcm.astype(np.float32, copy=False),
+                language=language,
+                beam_size=settings.whisper_beam_size,
+                temperature=settings.whisper_temperature,
+                # тишину уже вырезал наш VAD
+                vad_filter=False,
+            )
+            parts = []
+            for segment in segments:
+                # отменённый хедж/запрос останавливается между сегментами
+                raise_if_cancelled()
+                parts.append(segment.text)
+            text = "".join(parts).strip()
+        except InferenceCancelled:
+            raise
+        except Exception:
+            logger.exception(
+                "Error during faster-whisper transcription. duration=%.2fs",
+                duration_s,
+            )
+            raise
+        decode_span.set_attribute("language", info.language)
+
+    logger.info(
+        "Transcription completed: duration=%.2fs, language=%s, text_len=%s",
+        duration_s,
+        info.language,
+        len(text),
+    )
+
+    return text
+
+
+def transcribe_wav_bytes(wav_bytes: bytes) -> str:
+    """WAV-байты (PCM 16-bit, 16 kHz) -> текст, как в whisper_backend."""
+    if not wav_bytes:
+        logger.warning("transcribe_wav_bytes called with empty wav_bytes")
+        raise ValueError("wav_bytes пустой — нечего распознавать")
+
+    return transcribe_pcm(wav_bytes_to_pcm(wav_bytes))
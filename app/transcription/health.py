@@ -0,0 +1,324 @@
+# app/transcription/health.py
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from enum import Enum
+
+from app.config import InferenceExecutorKind, Settings
+from app.metrics import FALLBACKS_TOTAL
+from app.tracing import set_attribute
+
+logger = logging.getLogger(__name__)
+
+
+def is_outage(error: BaseException) -> bool:
+    """
+    Считать ли ошибку отказом бэкенда для circuit breaker.
+
+    Ошибки бэкенда сами говорят об этом атрибутом transient (DeepgramError);
+    остальные — только сетевые сбои и таймауты.
+    """
+    return getattr(error, "transient", isinstance(error, (OSError, TimeoutError)))
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"  # всё хорошо, запросы идут
+    OPEN = "open"  # бэкенд лежит, запросы не отправляем
+    HALF_OPEN = "half_open"  # пробуем один запрос, жив ли
+
+
+class CircuitBreaker:
+    """
+    Автомат "closed -> open -> half_open" для удалённого бэкенда.
+
+    После failure_threshold ошибок подряд цепь размыкается: запросы сразу
+    уходят в fallback, без ожидания таймаута. Через reset_timeout_s пропускается
+    один пробный запрос — успех замыкает цепь, ошибка снова размыкает.
+    """
+
+    def __init__(
+        self,
+        *,
+        name: str,
+        failure_threshold: int,
+        reset_timeout_s: float,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout_s = reset_timeout_s
+
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> CircuitState:
+        if (
+            self._state == CircuitState.OPEN
+            and time.monotonic() - self._opened_at >= self.reset_timeout_s
+        ):
+            return CircuitState.HALF_OPEN
+        return self._state
+
+    def allow_request(self) -> bool:
+        state = self.state
+        if state == CircuitState.CLOSED:
+            return True
+        if state == CircuitState.OPEN or self._probe_in_flight:
+            return False
+
+        # half-open: пропускаем ровно один пробный запрос
+        self._state = CircuitState.HALF_OPEN
+        self._probe_in_flight = True
+        logger.info("Circuit %s half-open: probing backend", self.name)
+        return True
+
+    def record_success(self) -> None:
+        if self._state != CircuitState.CLOSED:
+            logger.info("Circuit %s closed: backend recovered", self.name)
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self._probe_in_flight = False
+        self._failures += 1
+        if (
+            self._state == CircuitState.HALF_OPEN
+            or self._failures >= self.failure_threshold
+        ):
+            if self._state != CircuitState.OPEN:
+                logger.warning(
+                    "Circuit %s open after %d failure(s), retry in %.0fs",
+                    self.name,
+                    self._failures,
+                    self.reset_timeout_s,
+                )
+            self._state = CircuitState.OPEN
+            self._opened_at = time.monotonic()
+
+    def record_cancelled(self) -> None:
+        """Запрос отменили (проиграл хедж) — это не ошибка, но слот пробы свободен."""
+        self._probe_in_flight = False
+
+
+class LatencyTracker:
+    """
+    Скользящее окно успешных задержек бэкенда для перцентилей — в секундах
+    на секунду аудио: абсолютная задержка минутного файла всегда больше
+    p95 голосовых, и по ней хедж срабатывал бы на каждом длинном файле.
+    """
+
+    def __init__(self, *, window: int = 200) -> None:
+        self._samples: deque[float] = deque(maxlen=max(1, window))
+
+    def record(self, latency_s: float) -> None:
+        self._samples.append(latency_s)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, p: float) -> float | None:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, round(p / 100 * (len(ordered) - 1)))
+        return ordered[index]
+
+
+class BackendHealth:
+    """Состояние удалённого бэкенда: circuit breaker + задержки для хеджирования."""
+
+    def __init__(self, settings: Settings, *, name: str, fallback: str) -> None:
+        self.fallback_name = fallback
+        self.breaker = CircuitBreaker(
+            name=name,
+            failure_threshold=settings.dg_breaker_failures,
+            reset_timeout_s=settings.dg_breaker_reset_s,
+        )
+        self.latency = LatencyTracker()
+        # проигравший хедж прерывается только в thread-режиме executor'а
+        # (raise_if_cancelled); в process/remote он досчитывал бы файл впустую
+        self.hedge_enabled = (
+            settings.dg_hedge_enabled
+            and settings.inference_executor == InferenceExecutorKind.THREAD
+        )
+        if settings.dg_hedge_enabled and not self.hedge_enabled:
+            logger.warning(
+                "DG_HEDGE is ignored with INFERENCE_EXECUTOR=%s: a losing %s run "
+                "cannot be stopped there",
+                settings.inference_executor.value,
+                fallback,
+            )
+        self.hedge_percentile = settings.dg_hedge_percentile
+        self.hedge_min_samples = settings.dg_hedge_min_samples
+        self.hedge_max_audio_s = settings.dg_hedge_max_audio_s
+
+    @staticmethod
+    def _norm_audio_s(audio_s: float) -> float:
+        # у коротких клипов задержка — в основном RTT, а не длина аудио
+        return max(audio_s, 1.0)
+
+    def hedge_delay(self, audio_s: float | None) -> float | None:
+        """
+        Через сколько секунд запускать запасной бэкенд параллельно:
+        перцентиль задержки на секунду аудио, умноженный на длину этого файла.
+
+        None — не хеджируем: выключено, мало статистики, длина неизвестна
+        или больше hedge_max_audio_s (пока Deepgram не ответил, Whisper
+        на длинном файле занимает executor).
+        """
+        if not self.hedge_enabled or len(self.latency) < self.hedge_min_samples:
+            return None
+        if audio_s is None or audio_s <= 0 or audio_s > self.hedge_max_audio_s:
+            return None
+        per_second = self.latency.percentile(self.hedge_percentile)
+        if per_second is None:
+            return None
+        return per_second * self._norm_audio_s(audio_s)
+
+    def _count_fallback(self, reason: str) -> None:
+        FALLBACKS_TOTAL.inc(
+            source=self.breaker.name.lower(),
+            target=self.fallback_name,
+            reason=reason,
+        )
+        set_attribute("fallback_reason", reason)
+
+    async def _call_remote(
+        self,
+        remote: Callable[[], Awaitable[str]],
+        audio_s: float | None,
+    ) -> str:
+        started = time.perf_counter()
+        try:
+            text = await remote()
+        except asyncio.CancelledError:
+            self.breaker.record_cancelled()
+            raise
+        except Exception as e:
+            if is_outage(e):
+                self.breaker.record_failure()
+            else:
+                # бэкенд ответил (например, 4xx на битый файл) — он жив
+                self.breaker.record_success()
+            raise
+        self.breaker.record_success()
+        if audio_s is not None and audio_s > 0:
+            self.latency.record(
+                (time.perf_counter() - started) / self._norm_audio_s(audio_s)
+            )
+        return text
+
+    async def run(
+        self,
+        remote: Callable[[], Awaitable[str]],
+        fallback: Callable[[], Awaitable[str]],
+        *,
+        user_id: int | None = None,
+        audio_s: float | None = None,
+    ) -> str:
+        """
+        remote() с защитой (audio_s — длина аудио для порога хеджа):
+        - цепь разомкнута — сразу fallback();
+        - remote() упал — fallback();
+        - remote() дольше hedge_delay() — параллельно стартует fallback(),
+          побеждает первый успешный результат, проигравший отменяется.
+        """
+        if not self.breaker.allow_request():
+            logger.info(
+                "Circuit %s is open, using fallback. user_id=%s",
+                self.breaker.name,
+                user_id,
+            )
+            self._count_fallback("circuit_open")
+            return await fallback()
+
+        remote_task = asyncio.create_task(self._call_remote(remote, audio_s))
+        delay = self.hedge_delay(audio_s)
+
+        try:
+            done, _ = await asyncio.wait({remote_task}, timeout=delay)
+        except asyncio.CancelledError:
+            remote_task.cancel()
+            raise
+
+        if done:
+            try:
+                return remote_task.result()
+            except Exception:
+                logger.exception(
+                    "%s transcription failed, falling back. user_id=%s",
+                    self.breaker.name,
+                    user_id,
+                )
+                self._count_fallback("error")
+                return await fallback()
+
+        logger.info(
+            "%s slower than p%.0f (%.2fs for %.1fs of audio), "
+            "hedging with fallback. user_id=%s",
+            self.breaker.name,
+            self.hedge_percentile,
+            delay,
+            audio_s,
+            user_id,
+        )
+        return await self._race(remote_task, fallback, user_id=user_id)
+
+    async def _race(
+        self,
+        remote_task: asyncio.Task,
+        fallback: Callable[[], Awaitable[str]],
+        *,
+        user_id: int | None,
+    ) -> str:
+        self._count_fallback("hedge")
+        fallback_task = asyncio.create_task(fallback())
+        pending = {remote_task, fallback_task}
+        error: BaseException | None = None
+
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        winner = "remote" if task is remote_task else "fallback"
+                        set_attribute("hedge_winner", winner)
+                        logger.info(
+                            "Hedged request won by %s. user_id=%s", winner, user_id
+                        )
+                        return task.result()
+                    # remote упал — ждём fallback; fallback упал — ждём remote
+                    error = task.exception()
+                    logger.warning(
+                        "Hedged %s failed: %r. user_id=%s",
+                        "remote" if task is remote_task else "fallback",
+                        error,
+                        user_id,
+                    )
+        finally:
+            for task in pending:
+                task.cancel()
+
+        assert error is not None
+        raise error
+
+
+_deepgram_health: BackendHealth | None = None
+
+
+def get_deepgram_health(settings: Settings) -> BackendHealth:
+    global _deepgram_health
+    if _deepgram_health is None:
+        _deepgram_health = BackendHealth(
+            settings, name="Deepgram", fallback="whisper"
+        )
+    return _deepgram_health
@@ -0,0 +1,248 @@
+# app/transcription/routing.py
+from __future__ import annotations
+
+import dataclasses
+import logging
+import operator
+import re
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from app.config import Settings, TranscriberBackend
+from app.metrics import ROUTES_TOTAL
+
+logger = logging.getLogger(__name__)
+
+# duration<=30, size>20MB, duration>=600 ...
+_COMPARISON_RE = re.compile(r"^(duration|size)\s*(<=|>=|<|>)\s*(\S+)$")
+# kind=voice|video_note, lang=ru|en
+_MEMBERSHIP_RE = re.compile(r"^(kind|lang)\s*=\s*(\S+)$")
+
+_OPERATORS: dict[str, Callable[[float, float], bool]] = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+_SIZE_UNITS = {"": 1, "B": 1, "KB": 1024, "MB": 1024 * 1024, "GB": 1024**3}
+
+KINDS = ("voice", "audio", "video_note")
+
+
+@dataclass(frozen=True)
+class JobInfo:
+    """Что известно о задаче до скачивания файла (метаданные Telegram)."""
+
+    kind: str  # voice / audio / video_note
+    duration_s: float | None = None
+    file_size: int | None = None
+    language: str | None = None
+
+
+Condition = Callable[[JobInfo], bool]
+
+
+@dataclass(frozen=True)
+class RoutingRule:
+    """
+    Одно правило ROUTING_RULES: условия через запятую -> бэкенд[:модель].
+    Неизвестная длительность или размер условию не соответствуют.
+    """
+
+    text: str
+    conditions: tuple[Condition, ...]
+    backend: TranscriberBackend
+    model: str | None = None
+
+    @property
+    def target(self) -> str:
+        if self.model:
+            return f"{self.backend.value}:{self.model}"
+        return self.backend.value
+
+    def matches(self, job: JobInfo) -> bool:
+        return all(condition(job) for condition in self.conditions)
+
+
+def _parse_size(raw: str) -> float:
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)\s*([KMG]?B?)", raw.upper())
+    if match is None:
+        raise ValueError(f"invalid size {raw!r} (examples: 500KB, 20MB)")
+    return float(match.group(1)) * _SIZE_UNITS[match.group(2)]
+
+
+def _parse_condition(raw: str) -> Condition:
+    if match := _COMPARISON_RE.match(raw):
+        field, op, value_raw = match.groups()
+        compare = _OPERATORS[op]
+
+        if field == "duration":
+            try:
+                limit = float(value_raw.rstrip("s"))
+            except ValueError as e:
+                raise ValueError(f"invalid duration {value_raw!r}") from e
+
+            def check_duration(job: JobInfo) -> bool:
+                return job.duration_s is not None and compare(job.duration_s, limit)
+
+            return check_duration
+
+        size_limit = _parse_size(value_raw)
+
+        def check_size(job: JobInfo) -> bool:
+            return job.file_size is not None and compare(job.file_size, size_limit)
+
+        return check_size
+
+    if match := _MEMBERSHIP_RE.match(raw):
+        field, values_raw = match.groups()
+        values = frozenset(v.strip().lower() for v in values_raw.split("|"))
+        if field == "kind":
+            unknown = values - set(KINDS)
+            if unknown:
+                raise ValueError(
+                    f"unknown kind {', '.join(sorted(unknown))} "
+                    f"(expected {' / '.join(KINDS)})"
+                )
+            return lambda job: job.kind in values
+        return lambda job: (job.language or "").lower() in values
+
+    raise ValueError(
+        f"invalid condition {raw!r} (expected duration<N, size>N, kind=..., lang=...)"
+    )
+
+
+def _parse_target(raw: str) -> tuple[TranscriberBackend, str | None]:
+    backend_raw, _, model = raw.strip().partition(":")
+    try:
+        backend = TranscriberBackend(backend_raw.strip().lower().replace("_", "-"))
+    except ValueError as e:
+        raise ValueError(
+            f"unknown backend {backend_raw!r} "
+            f"(expected {' / '.join(b.value for b in TranscriberBackend)})"
+        ) from e
+    return backend, model.strip() or None
+
+
+def parse_rules(text: str) -> list[RoutingRule]:
+    """
+    Разбирает ROUTING_RULES: правила через ";", в каждом
+    "условие, условие -> бэкенд[:модель]". Пустые условия (или "*") —
+    правило срабатывает всегда. Кривое правило — ValueError с его текстом.
+
+        kind=voice, duration<=30 -> whisper:base;
+        duration<=600 -> whisper:small;
+        duration>600 -> deepgram
+    """
+    rules = []
+    for rule_text in (part.strip() for part in text.split(";")):
+        if not rule_text:
+            continue
+
+        conditions_raw, arrow, target_raw = rule_text.partition("->")
+        if not arrow:
+            raise ValueError(f"routing rule {rule_text!r} has no '->'")
+
+        try:
+            conditions = tuple(
+                _parse_condition(raw)
+                for raw in (c.strip() for c in conditions_raw.split(","))
+                if raw and raw != "*"
+            )
+            backend, model = _parse_target(target_raw)
+        except ValueError as e:
+            raise ValueError(f"routing rule {rule_text!r}: {e}") from e
+
+        if backend == TranscriberBackend.DEEPGRAM and model:
+            raise ValueError(
+                f"routing rule {rule_text!r}: Deepgram model is not configurable"
+            )
+        rules.append(
+            RoutingRule(
+                text=rule_text,
+                conditions=conditions,
+                backend=backend,
+                model=model,
+            )
+        )
+    return rules
+
+
+class JobRouter:
+    """
+    Выбирает бэкенд и модель для каждой задачи по правилам ROUTING_RULES.
+    Первое подходящее правило побеждает; ни одно не подошло — глобальные
+    TRANSCRIBER_BACKEND / WHISPER_MODEL.
+
+    Результат — копия Settings с подменёнными transcriber_backend и
+    whisper_model: весь пайплайн (кэш, passthrough, fallback на Whisper)
+    уже работает от переданных ему настроек.
+    """
+
+    def __init__(self, rules: list[RoutingRule]) -> None:
+        self.rules = rules
+
+    def route(self, settings: Settings, job: JobInfo) -> Settings:
+        for index, rule in enumerate(self.rules, start=1):
+            if rule.matches(job):
+                break
+        else:
+            ROUTES_TOTAL.inc(target="default", rule="default")
+            if self.rules:
+                logger.info(
+                    "Routing: kind=%s duration=%s size=%s lang=%s -> default (%s)",
+                    job.kind,
+                    job.duration_s,
+                    job.file_size,
+                    job.language,
+                    _describe(settings),
+                )
+            return settings
+
+        routed = dataclasses.replace(
+            settings,
+            transcriber_backend=rule.backend,
+            whisper_model=rule.model or settings.whisper_model,
+        )
+        ROUTES_TOTAL.inc(target=rule.target, rule=str(index))
+        logger.info(
+            "Routing: kind=%s duration=%s size=%s lang=%s -> %s (rule %d: %s)",
+            job.kind,
+            job.duration_s,
+            job.file_size,
+            job.language,
+            _describe(routed),
+            index,
+            rule.text,
+        )
+        return routed
+
+
+def _describe(settings: Settings) -> str:
+    if settings.transcriber_backend == TranscriberBackend.DEEPGRAM:
+        return settings.transcriber_backend.value
+    return f"{settings.transcriber_backend.value}:{settings.whisper_model}"
+
+
+_router: JobRouter | None = None
+
+
+def get_job_router(settings: Settings) -> JobRouter:
+    """
+    Общий роутер (создаётся лениво). Кривые ROUTING_RULES не валят бота:
+    ошибка в лог, роутинг выключен — всё идёт в TRANSCRIBER_BACKEND.
+    """
+    global _router
+    if _router is None:
+        try:
+            rules = parse_rules(settings.routing_rules)
+        except ValueError:
+            logger.exception("Invalid ROUTING_RULES, routing is disabled")
+            rules = []
+        if rules:
+            logger.info(
+                "Job routing enabled: %s", "; ".join(rule.text for rule in rules)
+            )
+        _router = JobRouter(rules)
+    return _router
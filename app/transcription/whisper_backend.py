@@ -1,71 +1,374 @@
-import os
-import tempfile
-import whisper
+import threading
+import warnings
 import logging
 
+import numpy as np
+import torch
+import whisper
+
+from app.config import ModelLoadPolicy, Settings, get_settings
+from app.tracing import span
+from app.transcription.executor import InferenceCancelled, raise_if_cancelled
+from app.utils.audio import SAMPLE_RATE, wav_bytes_to_pcm
+
 logger = logging.getLogger(__name__)
 
-# Загружаем модель один раз
-logger.info("Loading Whisper model 'small'...")
-model = whisper.load_model("small")
-logger.info("Whisper model 'small' loaded successfully")
+# Модель грузится не при импорте, а по политике WHISPER_LOAD_POLICY
+# (eager / lazy / background) — см. init_model() и get_model().
+# Ключ — имя модели: роутер (ROUTING_RULES) может отправить задачу
+# не в WHISPER_MODEL, а, например, в base; такие модели грузятся лениво.
+_models: "dict[str, whisper.Whisper]" = {}
+_load_lock = threading.Lock()
 
+# model.transcribe не потокобезопасен (kv-cache хуки вешаются на саму модель),
+# поэтому в thread-режиме executor'а вызовы к одной модели идут строго по одному.
+_model_locks: dict[str, threading.Lock] = {}
 
-def transcribe_wav_bytes(wav_bytes: bytes) -> str:
+_torch_threads_configured = False
+
+
+def _configure_torch_threads(settings: Settings) -> None:
     """
-    Принимает WAV-байты, сохраняет во временный файл, передаёт Whisper'у,
-    потом удаляет файл.
+    Выставляет число потоков torch из настроек (один раз на процесс).
+    0 — оставить как решил torch (обычно = числу ядер).
     """
-    if not wav_bytes:
-        logger.warning("transcribe_wav_bytes called with empty wav_bytes")
-        raise ValueError("wav_bytes пустой — нечего распознавать")
+    global _torch_threads_configured
+    if _torch_threads_configured:
+        return
+    _torch_threads_configured = True
 
-    tmp_path: str | None = None
+    if settings.torch_num_threads:
+        torch.set_num_threads(settings.torch_num_threads)
+    if settings.torch_interop_threads:
+        try:
+            torch.set_num_interop_threads(settings.torch_interop_threads)
+        except RuntimeError:
+            # можно выставить только до первой параллельной работы torch
+            logger.warning(
+                "Could not set torch inter-op threads to %d: "
+                "parallel work has already started in this process",
+                settings.torch_interop_threads,
+            )
 
-    try:
-        # 1. создаём временный файл, НО не удаляем автоматически
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-            tmp.write(wav_bytes)
-            tmp.flush()
-            tmp_path = tmp.name  # запоминаем путь
-
-        logger.debug(
-            "Created temp wav file for transcription: path=%s size=%s",
-            tmp_path,
-            len(wav_bytes),
-        )
+    logger.debug(
+        "torch threads configured: intra_op=%s inter_op=%s",
+        settings.torch_num_threads or "default",
+        settings.torch_interop_threads or "default",
+    )
 
-        # 2. запускаем распознавание
-        logger.debug("Starting Whisper transcription: temp_path=%s", tmp_path)
-        try:
-            result = model.transcribe(
-                tmp_path,
-                fp16=False,
-                temperature=0,
-                beam_size=5,
+
+def _install_cancel_hooks(model: "whisper.Whisper") -> None:
+    """
+    Проверка отмены перед каждым проходом энкодера и шагом декодера:
+    отменённая в event loop задача (проигравший хедж) прерывается
+    за один токен, а не досчитывает файл до конца.
+    """
+
+    def check(module: torch.nn.Module, args: tuple) -> None:
+        raise_if_cancelled()
+
+    model.encoder.register_forward_pre_hook(check)
+    model.decoder.register_forward_pre_hook(check)
+
+
+def get_model(
+    name: str | None = None,
+    settings: Settings | None = None,
+) -> "whisper.Whisper":
+    """
+    Возвращает модель name (по умолчанию WHISPER_MODEL),
+    загружая её при первом обращении.
+
+    settings нужны только для загрузки; без них читается окружение.
+    """
+    if name is not None:
+        model = _models.get(name)
+        if model is not None:
+            return model
+
+    settings = settings or get_settings()
+    name = name or settings.whisper_model
+
+    model = _models.get(name)
+    if model is not None:
+        return model
+
+    with _load_lock:
+        if name not in _models:
+            _configure_torch_threads(settings)
+
+            logger.info(
+                "Loading Whisper model %r (device=%s)...",
+                name,
+                settings.whisper_device or "auto",
             )
+            _models[name] = whisper.load_model(
+                name,
+                device=settings.whisper_device,
+                download_root=(
+                    str(settings.whisper_download_root)
+                    if settings.whisper_download_root
+                    else None
+                ),
+            )
+            _model_locks[name] = threading.Lock()
+            _install_cancel_hooks(_models[name])
+            logger.info("Whisper model %r loaded successfully", name)
+
+    return _models[name]
+
+
+def is_model_loaded(name: str | None = None) -> bool:
+    return (name or get_settings().whisper_model) in _models
+
+
+def init_model() -> None:
+    """
+    Применяет WHISPER_LOAD_POLICY. Вызывается при старте воркера executor'а.
+
+    - eager: грузим сразу (вызывающий ждёт);
+    - background: грузим в отдельном потоке, старт не блокируется;
+    - lazy: ничего не делаем, модель загрузится на первом сообщении.
+    """
+    policy = get_settings().whisper_load_policy
+
+    if policy == ModelLoadPolicy.EAGER:
+        get_model()
+    elif policy == ModelLoadPolicy.BACKGROUND:
+        threading.Thread(
+            target=get_model,
+            name="whisper-preload",
+            daemon=True,
+        ).start()
+    else:
+        logger.info("Whisper model will be loaded lazily on first use")
+
+
+def _as_tensor(pcm: np.ndarray) -> torch.Tensor:
+    """
+    float32 PCM -> torch.Tensor без копирования.
+
+    Массив из np.frombuffer read-only, torch на это ругается warning'ом,
+    но Whisper буфер не модифицирует, так что копия не нужна.
+    """
+    if pcm.dtype != np.float32:
+        pcm = pcm.astype(np.float32)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        return torch.from_numpy(pcm)
+
+
+def transcribe_pcm(
+    pcm: np.ndarray,
+    model_name: str | None = None,
+    language: str | None = None,
+    *,
+    settings: Settings | None = None,
+) -> str:
+    """
+    Принимает float32 PCM 16 kHz mono и отдаёт его Whisper'у напрямую —
+    без временных файлов и без повторного ffmpeg внутри whisper.load_audio.
+
+    model_name — модель, выбранная роутером (None — WHISPER_MODEL).
+    language — язык речи; None — Whisper определяет его сам
+    (лишний проход декодера по первому окну).
+    settings — настройки задачи; None (скрипты) — прочитать окружение.
+    """
+    if pcm is None or pcm.size == 0:
+        logger.warning("transcribe_pcm called with empty pcm")
+        raise ValueError("pcm пустой — нечего распознавать")
+
+    settings = settings or get_settings()
+    model_name = model_name or settings.whisper_model
+    model = get_model(model_name, settings)
+
+    duration_s = pcm.size / SAMPLE_RATE
+    logger.debug("Starting Whisper transcription: duration=%.2fs", duration_s)
+
+    # в thread-режиме спан попадает в трейс сообщения (контекст копирует
+    # executor), в process-режиме это no-op
+    with span(
+        "whisper_decode",
+        audio_s=round(duration_s, 3),
+        model=model_name,
+        language_hint=language,
+    ) as decode_span:
+        try:
+            with _model_locks[model_name]:
+                result = model.transcribe(
+                    _as_tensor(pcm),
+                    language=language,
+                    fp16=settings.whisper_fp16,
+                    temperature=settings.whisper_temperature,
+                    beam_size=settings.whisper_beam_size,
+                )
+        except InferenceCancelled:
+            logger.debug("Whisper transcription cancelled. duration=%.2fs", duration_s)
+            raise
         except Exception:
             # Логируем с трейсбеком и пробрасываем дальше
             logger.exception(
-                "Error during Whisper transcription. temp_path=%s", tmp_path
+                "Error during Whisper transcription. duration=%.2fs", duration_s
             )
             raise
+        decode_span.set_attribute("language", result.get("language"))
+
+    text = (result.get("text") or "").strip()
+    logger.info(
+        "Transcription completed: duration=%.2fs, text_len=%s",
+        duration_s,
+        len(text),
+    )
+
+    return text
+
+
+def _decode_batch(
+    model: "whisper.Whisper",
+    mels: torch.Tensor,
+    options: "whisper.DecodingOptions",
+) -> "list[whisper.DecodingResult]":
+    """
+    whisper.decode для пакета. Beam search шире одного луча в whisper.decode
+    на пакете из нескольких клипов падает (audio features не размножаются
+    по лучам), поэтому тогда пакетом идёт только энкодер, а лучи
+    декодируются по клипу — на уже посчитанных audio features.
+    """
+    if (options.beam_size or 1) == 1:
+        return whisper.decode(model, mels, options)
+
+    with torch.no_grad():
+        features = model.encoder(mels.half() if options.fp16 else mels)
+    return [
+        whisper.decode(model, features[i : i + 1], options)[0]
+        for i in range(features.shape[0])
+    ]
+
+
+# Пороги model.transcribe (значения по умолчанию whisper.transcribe)
+COMPRESSION_RATIO_THRESHOLD = 2.4
+LOGPROB_THRESHOLD = -1.0
+NO_SPEECH_THRESHOLD = 0.6
+
+
+def _batch_verdict(result: "whisper.DecodingResult", max_tokens: int) -> str:
+    """
+    Что model.transcribe сделал бы с этим результатом декодирования:
+    "ok" — принять, "silence" — выбросить сегмент как тишину,
+    "retry" — пойти в fallback (здесь — перераспознать клип отдельно).
+    """
+    is_silence = (
+        result.no_speech_prob > NO_SPEECH_THRESHOLD
+        and result.avg_logprob < LOGPROB_THRESHOLD
+    )
+    if is_silence:
+        return "silence"
+    if (
+        result.compression_ratio > COMPRESSION_RATIO_THRESHOLD
+        or result.avg_logprob < LOGPROB_THRESHOLD
+        # без таймстемпов декодер не дойдёт до конца окна: текст обрезан
+        or len(result.tokens) >= max_tokens
+    ):
+        return "retry"
+    return "ok"
 
-        text = (result.get("text") or "").strip()
-        logger.info(
-            "Transcription completed: temp_path=%s, text_len=%s",
-            tmp_path,
-            len(text),
+
+def transcribe_pcm_batch(
+    pcms: list[np.ndarray],
+    model_name: str | None = None,
+    language: str | None = None,
+    *,
+    settings: Settings | None = None,
+) -> list[str]:
+    """
+    Пакетное распознавание коротких клипов (каждый не длиннее 30 с —
+    одно окно Whisper): log-mel считаются по отдельности, складываются
+    в один тензор, энкодер (и жадный декодер) проходят по пакету разом.
+
+    Это whisper.decode, а не model.transcribe, поэтому после пакета
+    результаты проверяются теми же порогами, что и в model.transcribe
+    (compression ratio, avg logprob, no speech). Клип, на котором
+    model.transcribe ушёл бы в fallback, или упёршийся в лимит токенов
+    перераспознаётся обычным transcribe_pcm — пакет не хуже одиночного пути.
+    """
+    if not pcms:
+        return []
+
+    settings = settings or get_settings()
+    model_name = model_name or settings.whisper_model
+    model = get_model(model_name, settings)
+
+    mels = torch.stack(
+        [
+            whisper.log_mel_spectrogram(
+                whisper.pad_or_trim(_as_tensor(pcm)),
+                n_mels=model.dims.n_mels,
+            )
+            for pcm in pcms
+        ]
+    ).to(model.device)
+
+    options = whisper.DecodingOptions(
+        task="transcribe",
+        # None — язык определяется для каждого клипа пакета отдельно
+        language=language,
+        temperature=settings.whisper_temperature,
+        # beam search, как и в model.transcribe, только при temperature=0
+        beam_size=(
+            settings.whisper_beam_size if settings.whisper_temperature == 0 else None
+        ),
+        fp16=settings.whisper_fp16,
+        without_timestamps=True,
+    )
+
+    total_s = sum(pcm.size for pcm in pcms) / SAMPLE_RATE
+    logger.debug(
+        "Starting batched Whisper transcription: batch=%d, audio=%.2fs",
+        len(pcms),
+        total_s,
+    )
+
+    try:
+        with _model_locks[model_name]:
+            results = _decode_batch(model, mels, options)
+    except InferenceCancelled:
+        raise
+    except Exception:
+        logger.exception(
+            "Error during batched Whisper transcription. batch=%d", len(pcms)
         )
+        raise
+
+    # лимит длины текста whisper.decode по умолчанию (sample_len)
+    max_tokens = model.dims.n_text_ctx // 2
+    texts: list[str] = []
+    retry: list[int] = []
+    for i, result in enumerate(results):
+        verdict = _batch_verdict(result, max_tokens)
+        if verdict == "retry":
+            retry.append(i)
+        texts.append("" if verdict == "silence" else (result.text or "").strip())
+
+    # вне блокировки модели: transcribe_pcm берёт её сам
+    for i in retry:
+        texts[i] = transcribe_pcm(pcms[i], model_name, language, settings=settings)
+
+    logger.info(
+        "Batched transcription completed: batch=%d, audio=%.2fs, retried=%d",
+        len(pcms),
+        total_s,
+        len(retry),
+    )
+    return texts
+
+
+def transcribe_wav_bytes(wav_bytes: bytes) -> str:
+    """
+    Принимает WAV-байты (PCM 16-bit, 16 kHz), разбирает их в память
+    и передаёт Whisper'у. Оставлена для совместимости со скриптами.
+    """
+    if not wav_bytes:
+        logger.warning("transcribe_wav_bytes called with empty wav_bytes")
+        raise ValueError("wav_bytes пустой — нечего распознавать")
 
-        return text
-
-    finally:
-        # 3. пробуем удалить временный файл
-        if tmp_path and os.path.exists(tmp_path):
-            try:
-                os.remove(tmp_path)
-                logger.debug("Temp wav file removed: %s", tmp_path)
-            except OSError:
-                # если не получилось удалить
-                logger.warning("Failed to remove temp wav file: %s", tmp_path)
+    return transcribe_pcm(wav_bytes_to_pcm(wav_bytes))
@@ -0,0 +1,222 @@
+# app/transcription/worker_client.py
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import logging
+
+import numpy as np
+
+from app.config import Settings
+from app.transcription.worker_protocol import (
+    ERROR_BUSY,
+    Frame,
+    Op,
+    ProtocolError,
+    encode_transcribe,
+    pack_frame,
+    parse_address,
+    read_frame,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerError(RuntimeError):
+    """Воркер ответил ошибкой или недоступен."""
+
+
+class WorkerBusyError(WorkerError):
+    """Очередь воркера полна (WORKER_MAX_QUEUE)."""
+
+
+class WorkerUnavailableError(WorkerError):
+    """Нет соединения с воркером или оно оборвалось посреди запроса."""
+
+
+class _Connection:
+    """Одно соединение с воркером и запросы, отправленные именно по нему."""
+
+    def __init__(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.pending: dict[int, asyncio.Future[Frame]] = {}
+        self.read_task: asyncio.Task | None = None
+
+    @property
+    def alive(self) -> bool:
+        return not self.writer.is_closing()
+
+    def fail(self, error: Exception) -> None:
+        self.writer.close()
+        pending, self.pending = self.pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+
+class WorkerClient:
+    """
+    Клиент воркера распознавания (worker.py).
+
+    Одно долгоживущее соединение на процесс: запросы мультиплексируются по
+    request_id, так что параллельные сообщения (и чанки одного сообщения)
+    не ждут друг друга на уровне сокета. Оборвалось соединение — ожидающие
+    на нём запросы получают WorkerUnavailableError, следующий запрос
+    переподключается. Состояние у каждого соединения своё: цикл чтения
+    старого соединения не трогает уже открытое новое.
+    """
+
+    def __init__(
+        self,
+        address: str,
+        *,
+        timeout_s: float,
+        pcm_format: str = "s16",
+    ) -> None:
+        self.address = address
+        self.timeout_s = timeout_s
+        self.pcm_format = pcm_format
+        # проверяем адрес сразу, а не на первом сообщении
+        parse_address(address)
+
+        self._conn: _Connection | None = None
+        self._connect_lock = asyncio.Lock()
+        self._ids = itertools.count(1)
+
+        self.last_error: str | None = None
+
+    @property
+    def connected(self) -> bool:
+        return self._conn is not None and self._conn.alive
+
+    async def _connect(self) -> _Connection:
+        async with self._connect_lock:
+            if self._conn is not None and self._conn.alive:
+                return self._conn
+
+            kind, host, port = parse_address(self.address)
+            try:
+                if kind == "unix":
+                    reader, writer = await asyncio.open_unix_connection(host)
+                else:
+                    reader, writer = await asyncio.open_connection(host, port)
+            except OSError as e:
+                self.last_error = f"connect failed: {e}"
+                raise WorkerUnavailableError(
+                    f"Transcription worker at {self.address} is unavailable: {e}"
+                ) from e
+
+            conn = self._conn = _Connection(reader, writer)
+            conn.read_task = asyncio.create_task(self._read_loop(conn))
+            self.last_error = None
+            logger.info("Connected to transcription worker at %s", self.address)
+            return conn
+
+    async def _read_loop(self, conn: _Connection) -> None:
+        error: Exception = WorkerUnavailableError("connection to worker closed")
+        try:
+            while (frame := await read_frame(conn.reader)) is not None:
+                future = conn.pending.pop(frame.request_id, None)
+                if future is not None and not future.done():
+                    future.set_result(frame)
+        except (ProtocolError, OSError, asyncio.IncompleteReadError) as e:
+            logger.error("Transcription worker connection failed: %s", e)
+            error = WorkerUnavailableError(f"connection to worker failed: {e}")
+        finally:
+            conn.fail(error)
+            # пока этот цикл дочитывал, клиент мог уже переподключиться
+            if self._conn is conn:
+                self._conn = None
+                self.last_error = str(error)
+
+    async def _request(
+        self,
+        op: Op,
+        payload: bytes = b"",
+        flags: int = 0,
+    ) -> Frame:
+        conn = await self._connect()
+        request_id = next(self._ids) & 0xFFFFFFFF
+        future: asyncio.Future[Frame] = asyncio.get_running_loop().create_future()
+        conn.pending[request_id] = future
+
+        try:
+            # кадр пишется одним write — кадры разных запросов не перемешаются
+            conn.writer.write(pack_frame(Frame(op, request_id, payload, flags)))
+            await conn.writer.drain()
+            return await asyncio.wait_for(future, timeout=self.timeout_s)
+        except OSError as e:
+            raise WorkerUnavailableError(f"failed to send to worker: {e}") from e
+        except TimeoutError as e:
+            raise WorkerError(
+                f"Transcription worker did not answer in {self.timeout_s:.0f}s"
+            ) from e
+        finally:
+            conn.pending.pop(request_id, None)
+
+    async def transcribe(
+        self,
+        pcm: np.ndarray,
+        *,
+        model: str | None = None,
+        language: str | None = None,
+    ) -> str:
+        payload, flags = encode_transcribe(pcm, self.pcm_format, model, language)
+        frame = await self._request(Op.TRANSCRIBE, payload, flags)
+
+        text = frame.payload.decode("utf-8")
+        if frame.op == Op.RESULT:
+            return text
+
+        code, _, message = text.partition(":")
+        if code == ERROR_BUSY:
+            raise WorkerBusyError(f"Transcription worker is busy: {message}")
+        raise WorkerError(f"Transcription worker error ({code}): {message}")
+
+    async def health(self) -> dict:
+        frame = await self._request(Op.HEALTH)
+        if frame.op != Op.HEALTH_RESULT:
+            text = frame.payload.decode("utf-8", errors="replace")
+            raise WorkerError(f"Unexpected health reply {frame.op.name}: {text}")
+        try:
+            return json.loads(frame.payload)
+        except ValueError as e:
+            raise WorkerError(f"Invalid health reply from worker: {e}") from e
+
+    async def close(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        conn.fail(WorkerUnavailableError("worker client closed"))
+        if conn.read_task is not None:
+            conn.read_task.cancel()
+            await asyncio.gather(conn.read_task, return_exceptions=True)
+
+
+_client: WorkerClient | None = None
+
+
+def get_worker_client(settings: Settings) -> WorkerClient:
+    """Общий клиент процесса (INFERENCE_EXECUTOR=remote), создаётся лениво."""
+    global _client
+    if _client is None:
+        _client = WorkerClient(
+            settings.worker_address,
+            timeout_s=settings.worker_timeout_s,
+            pcm_format=settings.worker_pcm_format,
+        )
+    return _client
+
+
+async def close_worker_client() -> None:
+    global _client
+    if _client is None:
+        return
+    await _client.close()
+    _client = None
@@ -0,0 +1,176 @@
+# app/transcription/worker_protocol.py
+from __future__ import annotations
+
+import asyncio
+import struct
+from dataclasses import dataclass
+from enum import IntEnum
+
+import numpy as np
+
+# Кадр: заголовок 12 байт + payload.
+#   version  u8   — версия протокола
+#   op       u8   — Op
+#   flags    u16  — для TRANSCRIBE: формат PCM
+#   req_id   u32  — id запроса; ответы по одному соединению идут не по порядку
+#   length   u32  — длина payload
+# PCM едет как есть (s16le или f32le, 16 kHz mono), без base64/JSON:
+# минута аудио — 1.9 МБ в s16 против ~5 МБ в JSON-е с float'ами.
+PROTOCOL_VERSION = 1
+HEADER = struct.Struct("!BBHII")
+
+# Час аудио в f32 — 230 МБ; больше клиент не пришлёт (длинное режется на чанки)
+MAX_PAYLOAD_BYTES = 256 * 1024 * 1024
+
+FLAG_PCM_S16 = 0x0001  # payload — int16, иначе float32
+# перед PCM: u8 длина + имя модели (ASCII) — модель выбрал роутер;
+# без флага воркер берёт свою WHISPER_MODEL
+FLAG_MODEL = 0x0002
+# так же (после имени модели): язык речи; без флага — автоопределение
+FLAG_LANGUAGE = 0x0004
+
+
+class Op(IntEnum):
+    TRANSCRIBE = 0x01  # payload: PCM
+    HEALTH = 0x02  # payload пустой
+    RESULT = 0x81  # payload: текст (UTF-8)
+    ERROR = 0x82  # payload: "код:сообщение" (UTF-8)
+    HEALTH_RESULT = 0x83  # payload: JSON
+
+
+# Коды ошибок в ERROR
+ERROR_BUSY = "busy"  # очередь воркера полна
+ERROR_FAILED = "failed"  # инференс упал
+ERROR_BAD_REQUEST = "bad_request"
+
+
+class ProtocolError(Exception):
+    """Поток байт не похож на наш протокол — соединение надо закрыть."""
+
+
+@dataclass(frozen=True)
+class Frame:
+    op: Op
+    request_id: int
+    payload: bytes = b""
+    flags: int = 0
+
+
+def pack_frame(frame: Frame) -> bytes:
+    return (
+        HEADER.pack(
+            PROTOCOL_VERSION,
+            frame.op,
+            frame.flags,
+            frame.request_id,
+            len(frame.payload),
+        )
+        + frame.payload
+    )
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Frame | None:
+    """Следующий кадр или None, если собеседник закрыл соединение."""
+    try:
+        header = await reader.readexactly(HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if not e.partial:
+            return None
+        raise ProtocolError("connection closed mid-header") from e
+
+    version, op, flags, request_id, length = HEADER.unpack(header)
+    if version != PROTOCOL_VERSION:
+        raise ProtocolError(f"unsupported protocol version {version}")
+    if length > MAX_PAYLOAD_BYTES:
+        raise ProtocolError(f"payload too large: {length} bytes")
+    try:
+        op = Op(op)
+    except ValueError as e:
+        raise ProtocolError(f"unknown op {op:#x}") from e
+
+    payload = await reader.readexactly(length) if length else b""
+    return Frame(op=op, request_id=request_id, payload=payload, flags=flags)
+
+
+def encode_pcm(pcm: np.ndarray, pcm_format: str) -> tuple[bytes, int]:
+    """float32 PCM -> (payload, flags). s16 вдвое компактнее и Whisper'у хватает."""
+    if pcm_format == "s16":
+        samples = np.clip(pcm, -1.0, 1.0) * 32767.0
+        return samples.astype("<i2").tobytes(), FLAG_PCM_S16
+    return pcm.astype("<f4", copy=False).tobytes(), 0
+
+
+def decode_pcm(payload: bytes | memoryview, flags: int) -> np.ndarray:
+    if flags & FLAG_PCM_S16:
+        return np.frombuffer(payload, dtype="<i2").astype(np.float32) / 32768.0
+    return np.frombuffer(payload, dtype="<f4").astype(np.float32, copy=False)
+
+
+def _pack_name(value: str, what: str) -> bytes:
+    name = value.encode("ascii")
+    if len(name) > 255:
+        raise ValueError(f"{what} too long: {value!r}")
+    return bytes([len(name)]) + name
+
+
+def _unpack_name(view: memoryview, what: str) -> tuple[str, memoryview]:
+    if not view:
+        raise ValueError(f"missing {what}")
+    size = view[0]
+    if len(view) < 1 + size:
+        raise ValueError(f"truncated {what}")
+    return bytes(view[1 : 1 + size]).decode("ascii"), view[1 + size :]
+
+
+def encode_transcribe(
+    pcm: np.ndarray,
+    pcm_format: str,
+    model: str | None = None,
+    language: str | None = None,
+) -> tuple[bytes, int]:
+    """
+    Payload и flags для TRANSCRIBE: PCM и (необязательно) имя модели
+    и язык речи.
+    """
+    payload, flags = encode_pcm(pcm, pcm_format)
+    prefix = b""
+    if model:
+        prefix += _pack_name(model, "model name")
+        flags |= FLAG_MODEL
+    if language:
+        prefix += _pack_name(language, "language")
+        flags |= FLAG_LANGUAGE
+    return (prefix + payload if prefix else payload), flags
+
+
+def decode_transcribe(
+    payload: bytes,
+    flags: int,
+) -> tuple[np.ndarray, str | None, str | None]:
+    """
+    Обратное к encode_transcribe: (pcm, модель, язык).
+    Кривой payload — ValueError.
+    """
+    model = language = None
+    view = memoryview(payload)
+    if flags & FLAG_MODEL:
+        model, view = _unpack_name(view, "model name")
+    if flags & FLAG_LANGUAGE:
+        language, view = _unpack_name(view, "language")
+    return decode_pcm(view, flags), model, language
+
+
+def parse_address(address: str) -> tuple[str, str, int]:
+    """
+    "unix:/run/voice2text.sock" -> ("unix", path, 0),
+    "127.0.0.1:8765"            -> ("tcp", host, port).
+    """
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:") :], 0
+
+    host, sep, port = address.rpartition(":")
+    if not sep or not port.isdigit():
+        raise ValueError(
+            f"Invalid WORKER_ADDRESS {address!r}: expected host:port or unix:/path"
+        )
+    return "tcp", host or "127.0.0.1", int(port)
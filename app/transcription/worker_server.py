@@ -0,0 +1,235 @@
+# app/transcription/worker_server.py
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import json
+import logging
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.config import Settings
+from app.transcription.worker_protocol import (
+    ERROR_BAD_REQUEST,
+    ERROR_BUSY,
+    ERROR_FAILED,
+    Frame,
+    Op,
+    ProtocolError,
+    decode_transcribe,
+    pack_frame,
+    parse_address,
+    read_frame,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerServer:
+    """
+    Воркер-демон распознавания: одна загруженная модель на машину,
+    клиенты — процессы бота (polling, uvicorn-воркеры) через TCP или unix-сокет.
+
+    Одновременно в инференсе не больше max_in_flight задач (воркеры executor'а,
+    при WHISPER_BATCHING — с запасом на пакет: батчер склеивает запросы разных
+    клиентов). Ещё max_queue ждут своей очереди, остальным сразу уходит busy —
+    у бота для этого уже есть ответ "сервис занят".
+    """
+
+    def __init__(self, settings: Settings) -> None:
+        self.settings = settings
+        self.address = settings.worker_address
+        self.max_queue = settings.worker_max_queue
+
+        self.max_in_flight = settings.inference_workers
+        if settings.whisper_batching:
+            self.max_in_flight *= settings.whisper_batch_max_size
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+
+        self._server: asyncio.AbstractServer | None = None
+        self._connections: set[asyncio.Task] = set()
+        self._writers: set[asyncio.StreamWriter] = set()
+        self._started_at = time.monotonic()
+
+        self.queue_depth = 0
+        self.in_flight = 0
+        self.processed = 0
+        self.errors = 0
+        self.rejected = 0
+
+    async def start(self) -> None:
+        kind, host, port = parse_address(self.address)
+        if kind == "unix":
+            path = Path(host)
+            # сокет от прошлого запуска, который не успел прибраться
+            if path.is_socket():
+                path.unlink()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._server = await asyncio.start_unix_server(
+                self._handle_connection, path=str(path)
+            )
+            os.chmod(path, 0o660)
+        else:
+            self._server = await asyncio.start_server(
+                self._handle_connection, host, port
+            )
+
+        self._started_at = time.monotonic()
+        logger.info(
+            "Transcription worker listening on %s (max_in_flight=%d, max_queue=%d)",
+            self.address,
+            self.max_in_flight,
+            self.max_queue,
+        )
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+
+        # закрытый сокет завершает цикл чтения соединения, а оно само
+        # отменит свои задачи (отменять задачу соединения asyncio не любит)
+        for writer in list(self._writers):
+            writer.close()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+
+        if self._server is not None:
+            await self._server.wait_closed()
+            self._server = None
+
+        kind, host, _ = parse_address(self.address)
+        if kind == "unix":
+            Path(host).unlink(missing_ok=True)
+
+    def health(self) -> dict:
+        from app.transcription import uses_faster_whisper
+
+        settings = self.settings
+        if uses_faster_whisper(settings):
+            from app.transcription import faster_whisper_backend as backend
+        else:
+            from app.transcription import whisper_backend as backend
+
+        return {
+            "status": "ok",
+            "engine": "faster-whisper" if uses_faster_whisper(settings) else "whisper",
+            "model": settings.whisper_model,
+            "model_loaded": backend.is_model_loaded(),
+            "queue_depth": self.queue_depth,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "processed": self.processed,
+            "errors": self.errors,
+            "rejected": self.rejected,
+            "clients": len(self._connections),
+            "uptime_s": round(time.monotonic() - self._started_at, 1),
+        }
+
+    async def _handle_connection(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        connection = asyncio.current_task()
+        assert connection is not None
+        self._connections.add(connection)
+        self._writers.add(writer)
+        peer = writer.get_extra_info("peername") or "unix"
+        logger.info("Worker client connected: %s", peer)
+
+        tasks: set[asyncio.Task] = set()
+        write_lock = asyncio.Lock()
+
+        async def send(frame: Frame) -> None:
+            async with write_lock:
+                writer.write(pack_frame(frame))
+                await writer.drain()
+
+        try:
+            while (frame := await read_frame(reader)) is not None:
+                if frame.op == Op.HEALTH:
+                    await send(
+                        Frame(
+                            Op.HEALTH_RESULT,
+                            frame.request_id,
+                            json.dumps(self.health()).encode("utf-8"),
+                        )
+                    )
+                elif frame.op == Op.TRANSCRIBE:
+                    task = asyncio.create_task(self._transcribe(frame, send))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                else:
+                    await send(
+                        _error(frame.request_id, ERROR_BAD_REQUEST, f"op {frame.op}")
+                    )
+        except (ProtocolError, ConnectionError, asyncio.IncompleteReadError) as e:
+            logger.warning("Dropping worker client %s: %s", peer, e)
+        finally:
+            # клиент ушёл — его задачи никто не ждёт
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            writer.close()
+            self._writers.discard(writer)
+            self._connections.discard(connection)
+            logger.info("Worker client disconnected: %s", peer)
+
+    async def _transcribe(self, frame: Frame, send) -> None:
+        from app.transcription import _run_whisper, uses_faster_whisper
+
+        if self._slots.locked() and self.queue_depth >= self.max_queue:
+            self.rejected += 1
+            await send(_error(frame.request_id, ERROR_BUSY, "queue is full"))
+            return
+
+        try:
+            pcm, model, language = decode_transcribe(frame.payload, frame.flags)
+        except ValueError as e:
+            await send(_error(frame.request_id, ERROR_BAD_REQUEST, str(e)))
+            return
+
+        self.queue_depth += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queue_depth -= 1
+
+        self.in_flight += 1
+        try:
+            # модель выбрал роутер бота, язык — пользователь;
+            # движок — по настройкам воркера
+            settings = dataclasses.replace(
+                self.settings,
+                whisper_model=model or self.settings.whisper_model,
+                transcribe_language=language,
+            )
+            text = await _run_whisper(
+                np.ascontiguousarray(pcm),
+                settings,
+                faster=uses_faster_whisper(settings),
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.errors += 1
+            logger.exception("Worker transcription failed")
+            reply = _error(frame.request_id, ERROR_FAILED, str(e))
+        else:
+            self.processed += 1
+            reply = Frame(Op.RESULT, frame.request_id, text.encode("utf-8"))
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+        try:
+            await send(reply)
+        except ConnectionError:
+            logger.warning("Worker client went away before the result was sent")
+
+
+def _error(request_id: int, code: str, message: str) -> Frame:
+    return Frame(Op.ERROR, request_id, f"{code}:{message}".encode())
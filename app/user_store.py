@@ -0,0 +1,376 @@
+# app/user_store.py
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Protocol
+
+from app.config import Settings, UserStoreBackend
+
+logger = logging.getLogger(__name__)
+
+# Отрицательный результат тоже кэшируется: пользователь без выбора языка
+# не должен ходить в бэкенд на каждом t()
+_MISSING = ""
+
+# Язык интерфейса (/language) и язык речи (/speech) — независимые настройки:
+# у каждой своя таблица SQLite и свой hash в Redis
+UI_LANGUAGE = "ui"
+SPEECH_LANGUAGE = "speech"
+_LOCATIONS = {
+    UI_LANGUAGE: ("user_languages", "voice2text:user_lang"),
+    SPEECH_LANGUAGE: ("user_speech_languages", "voice2text:user_speech_lang"),
+}
+
+
+class LanguageBackend(Protocol):
+    """Долговременное хранилище user_id -> код языка."""
+
+    def get(self, user_id: int) -> str | None: ...
+
+    def put_many(self, items: dict[int, str]) -> None: ...
+
+    def close(self) -> None: ...
+
+
+class SqliteLanguageBackend:
+    """
+    SQLite в режиме WAL: читатели не ждут писателя, а несколько процессов
+    (воркеры uvicorn) на одной машине видят один и тот же файл.
+    """
+
+    def __init__(self, path: Path, *, table: str = "user_languages") -> None:
+        self.path = path
+        # имя таблицы — только из _LOCATIONS, не от пользователя
+        self.table = table
+        self._lock = threading.Lock()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # в WAL этого достаточно для надёжности, fsync только на чекпоинтах
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            " user_id INTEGER PRIMARY KEY,"
+            " lang TEXT NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, user_id: int) -> str | None:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT lang FROM {self.table} WHERE user_id = ?",
+                (user_id,),
+            ).fetchone()
+        return row[0] if row else None
+
+    def put_many(self, items: dict[int, str]) -> None:
+        now = time.time()
+        # одна транзакция на пачку — один fsync вместо N
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT INTO {self.table} (user_id, lang, updated_at)"
+                " VALUES (?, ?, ?)"
+                " ON CONFLICT (user_id) DO UPDATE SET"
+                " lang = excluded.lang, updated_at = excluded.updated_at",
+                [(user_id, lang, now) for user_id, lang in items.items()],
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class RedisLanguageBackend:
+    """
+    Key-value бэкенд для нескольких машин: один hash в Redis.
+    Нужен пакет redis (pip install redis).
+    """
+
+    KEY = "voice2text:user_lang"
+
+    def __init__(self, url: str, *, key: str = KEY) -> None:
+        import redis
+
+        self.key = key
+        self._client = redis.Redis.from_url(url, socket_timeout=2.0)
+
+    def get(self, user_id: int) -> str | None:
+        value = self._client.hget(self.key, str(user_id))
+        return value.decode("utf-8") if value is not None else None
+
+    def put_many(self, items: dict[int, str]) -> None:
+        self._client.hset(
+            self.key, mapping={str(user_id): lang for user_id, lang in items.items()}
+        )
+
+    def close(self) -> None:
+        self._client.close()
+
+
+class UserLanguageStore:
+    """
+    Выбранный язык пользователей: LRU в памяти перед долговременным бэкендом.
+
+    - чтение (get, из t() — на event loop): только память. Промах или
+      запись старше cache_ttl_s — отдаём что есть (устаревшее значение или
+      None), а чтение бэкенда уходит в фоновый поток. Результат кэшируется,
+      в том числе "язык не выбран";
+    - load(): то же чтение для middleware до обработки апдейта — промах
+      читается через asyncio.to_thread, так что t() в хендлере уже попадает
+      в кэш, а event loop не ждёт диска/сети;
+    - запись: сразу в LRU, в бэкенд — пачкой из фонового потока раз в
+      flush_interval_s (write-behind), так что /language не ждёт диска.
+
+    Другие процессы видят изменение после flush + не позже cache_ttl_s.
+    При аварийном завершении теряется не больше flush_interval_s записей.
+
+    backend=None — только память (как раньше: до перезапуска).
+    """
+
+    def __init__(
+        self,
+        backend: LanguageBackend | None,
+        *,
+        cache_size: int,
+        cache_ttl_s: float,
+        flush_interval_s: float,
+    ) -> None:
+        self._backend = backend
+        self.cache_size = cache_size
+        self.cache_ttl_s = cache_ttl_s
+        self.flush_interval_s = flush_interval_s
+
+        # user_id -> (время чтения из бэкенда, язык или _MISSING)
+        self._cache: OrderedDict[int, tuple[float, str]] = OrderedDict()
+        self._pending: dict[int, str] = {}
+        # user_id, которые фоновый поток перечитает из бэкенда
+        self._stale: set[int] = set()
+        self._lock = threading.Lock()
+
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._flusher: threading.Thread | None = None
+        if backend is not None:
+            self._flusher = threading.Thread(
+                target=self._flush_loop, name="user-store-flush", daemon=True
+            )
+            self._flusher.start()
+
+        self.hits = 0
+        self.misses = 0
+
+    def _remember(self, user_id: int, value: str, loaded_at: float) -> None:
+        self._cache[user_id] = (loaded_at, value)
+        self._cache.move_to_end(user_id)
+        # без бэкенда LRU — единственная копия, вытеснять нельзя
+        while self._backend is not None and len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def get(self, user_id: int) -> str | None:
+        """Язык из памяти; бэкенд здесь не читается никогда (см. load)."""
+        now = time.monotonic()
+        with self._lock:
+            pending = self._pending.get(user_id)
+            if pending is not None:
+                return pending
+
+            item = self._cache.get(user_id)
+            if item is not None:
+                self._cache.move_to_end(user_id)
+                if self._backend is None or now - item[0] < self.cache_ttl_s:
+                    self.hits += 1
+                    return item[1] or None
+
+            if self._backend is None:
+                return None
+
+            self.misses += 1
+            self._stale.add(user_id)
+        self._wake.set()
+        return (item[1] or None) if item is not None else None
+
+    async def load(self, user_id: int) -> None:
+        """
+        Подгружает язык перед обработкой апдейта. Промах — чтение бэкенда
+        в потоке (ждёт только этот апдейт), устаревшая запись остаётся
+        в силе и обновляется в фоне.
+        """
+        if self._backend is None:
+            return
+
+        with self._lock:
+            if user_id in self._pending:
+                return
+            item = self._cache.get(user_id)
+            if item is not None:
+                if time.monotonic() - item[0] >= self.cache_ttl_s:
+                    self._stale.add(user_id)
+                    self._wake.set()
+                return
+
+        await asyncio.to_thread(self._refresh, user_id)
+
+    def _refresh(self, user_id: int) -> None:
+        """Читает язык из бэкенда в кэш (фоновый поток или to_thread)."""
+        assert self._backend is not None
+        started = time.monotonic()
+        try:
+            value = self._backend.get(user_id)
+        except Exception:
+            # нет бэкенда — остаётся то, что в кэше (или язык по умолчанию)
+            logger.exception("Failed to read user language: user_id=%s", user_id)
+            return
+
+        with self._lock:
+            # пока читали, язык могли поменять в этом процессе
+            if user_id not in self._pending:
+                self._remember(user_id, value or _MISSING, started)
+
+    def set(self, user_id: int, lang: str) -> None:
+        with self._lock:
+            self._remember(user_id, lang, time.monotonic())
+            if self._backend is not None:
+                self._pending[user_id] = lang
+
+    def flush(self) -> None:
+        """Пишет накопленные изменения в бэкенд одной пачкой."""
+        if self._backend is None:
+            return
+
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return
+
+        try:
+            self._backend.put_many(batch)
+        except Exception:
+            logger.exception(
+                "Failed to persist %d user language(s), will retry", len(batch)
+            )
+            with self._lock:
+                # более свежие изменения, сделанные за время записи, важнее
+                self._pending = {**batch, **self._pending}
+            return
+
+        logger.debug("Persisted %d user language(s)", len(batch))
+
+    def _flush_loop(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval_s)
+            self._wake.clear()
+
+            with self._lock:
+                stale, self._stale = self._stale, set()
+            for user_id in stale:
+                self._refresh(user_id)
+            self.flush()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "cached": len(self._cache),
+            "pending": len(self._pending),
+        }
+
+    def close(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=self.flush_interval_s + 5)
+        self.flush()
+        if self._backend is not None:
+            self._backend.close()
+
+
+def _create_backend(settings: Settings, name: str) -> LanguageBackend | None:
+    kind = settings.user_store_backend
+    table, redis_key = _LOCATIONS[name]
+
+    if kind == UserStoreBackend.REDIS:
+        if importlib.util.find_spec("redis") is None:
+            logger.error(
+                "USER_STORE_BACKEND=redis, but the redis package is not installed. "
+                "Falling back to SQLite at %s",
+                settings.user_store_path,
+            )
+        elif not settings.user_store_redis_url:
+            logger.error(
+                "USER_STORE_BACKEND=redis, but USER_STORE_REDIS_URL is not set. "
+                "Falling back to SQLite at %s",
+                settings.user_store_path,
+            )
+        else:
+            return RedisLanguageBackend(settings.user_store_redis_url, key=redis_key)
+        kind = UserStoreBackend.SQLITE
+
+    if kind == UserStoreBackend.SQLITE:
+        return SqliteLanguageBackend(settings.user_store_path, table=table)
+
+    return None
+
+
+_stores: dict[str, UserLanguageStore] = {}
+
+
+def init_user_store(settings: Settings) -> UserLanguageStore:
+    """
+    Поднимает общие хранилища (main.py / webapp.py, до первого апдейта).
+    Возвращает хранилище языка интерфейса.
+    """
+    for name in _LOCATIONS:
+        old = _stores.pop(name, None)
+        if old is not None:
+            old.close()
+
+        _stores[name] = UserLanguageStore(
+            _create_backend(settings, name),
+            cache_size=settings.user_store_cache_size,
+            cache_ttl_s=settings.user_store_cache_ttl_s,
+            flush_interval_s=settings.user_store_flush_interval_s,
+        )
+    logger.info(
+        "User language store: backend=%s, cache_size=%d, flush_interval_s=%.2f",
+        settings.user_store_backend.value,
+        settings.user_store_cache_size,
+        settings.user_store_flush_interval_s,
+    )
+    return _stores[UI_LANGUAGE]
+
+
+def get_user_store(name: str = UI_LANGUAGE) -> UserLanguageStore:
+    """
+    Общее хранилище (UI_LANGUAGE или SPEECH_LANGUAGE). Без init_user_store
+    (скрипты, бенчмарки) — только память процесса.
+    """
+    store = _stores.get(name)
+    if store is None:
+        store = _stores[name] = UserLanguageStore(
+            None, cache_size=0, cache_ttl_s=0.0, flush_interval_s=1.0
+        )
+    return store
+
+
+async def preload_user(user_id: int) -> None:
+    """
+    Языки пользователя (интерфейса и речи) — в кэш до обработки апдейта,
+    чтобы t() и подсказка языка в хендлерах не читали бэкенд (middleware в app/bot.py).
+    """
+    await asyncio.gather(*(store.load(user_id) for store in list(_stores.values())))
+
+
+def close_user_store() -> None:
+    for name, store in list(_stores.items()):
+        logger.info("User %s language store stats at shutdown: %s", name, store.stats())
+        store.close()
+    _stores.clear()
@@ -1,13 +1,36 @@
 # app/utils/audio.py
 from __future__ import annotations
 
+import asyncio
+import contextlib
+import io
 import subprocess
+import wave
 from pathlib import Path
 import shutil
 import logging
+import time
+from collections.abc import AsyncIterable, AsyncIterator
+
+import numpy as np
+
+from app.metrics import FALLBACKS_TOTAL, FFMPEG_SECONDS
+from app.tracing import set_attribute, span
 
 logger = logging.getLogger(__name__)
 
+# Whisper (и наш PCM-пайплайн) работает с 16 kHz mono
+SAMPLE_RATE = 16000
+
+DEFAULT_FFMPEG_MAX_CONCURRENCY = 4
+
+# Общий лимит на число одновременно запущенных ffmpeg-процессов
+# (async-путь). Настраивается через set_ffmpeg_concurrency().
+_ffmpeg_semaphore = asyncio.Semaphore(DEFAULT_FFMPEG_MAX_CONCURRENCY)
+
+# Сколько читать из stdout ffmpeg за раз (размер pipe в Linux)
+_PIPE_READ_SIZE = 64 * 1024
+
 
 def get_ffmpeg_executable(ffmpeg_path: str | Path | None = None) -> str:
     """
@@ -149,27 +172,17 @@ def convert_to_wav_16k_file(
     )
 
 
-def convert_audio_bytes(
-    input_bytes: bytes, *, ffmpeg_path: str | Path | None = None
-) -> bytes:
+def set_ffmpeg_concurrency(limit: int) -> None:
     """
-    Принимает байты аудио (например, OGG/OPUS из Телеграма)
-    и возвращает байты WAV 16 kHz mono (PCM 16-bit).
-
-    - Никаких временных файлов.
-    - Вся конвертация через stdin/stdout ffmpeg.
+    Задаёт максимальное число одновременно работающих ffmpeg-процессов
+    для convert_audio_bytes_async. Вызывать до начала обработки сообщений.
     """
+    global _ffmpeg_semaphore
+    _ffmpeg_semaphore = asyncio.Semaphore(max(1, limit))
+    logger.debug("ffmpeg concurrency limit set to %d", max(1, limit))
 
-    if not input_bytes:
-        raise ValueError("input_bytes пустой — нечего конвертировать.")
-
-    logger.debug(
-        "Starting ffmpeg conversion from bytes. input_size=%d",
-        len(input_bytes),
-    )
-
-    ffmpeg_exe = get_ffmpeg_executable(ffmpeg_path)
 
+def _bytes_to_wav_cmd(ffmpeg_exe: str) -> list[str]:
     # Команда ffmpeg:
     # -i pipe:0            читать вход из stdin
     # -ac 1                моно
@@ -177,7 +190,7 @@ def convert_audio_bytes(
     # -c:a pcm_s16le       WAV PCM 16-bit
     # -f wav               формат WAV
     # pipe:1               вывод в stdout
-    cmd = [
+    return [
         ffmpeg_exe,
         "-hide_banner",
         "-loglevel",
@@ -195,40 +208,307 @@ def convert_audio_bytes(
         "pipe:1",
     ]
 
+
+def convert_audio_bytes(
+    input_bytes: bytes, *, ffmpeg_path: str | Path | None = None
+) -> bytes:
+    """
+    Принимает байты аудио (например, OGG/OPUS из Телеграма)
+    и возвращает байты WAV 16 kHz mono (PCM 16-bit).
+
+    - Никаких временных файлов.
+    - Вся конвертация через stdin/stdout ffmpeg.
+    """
+
+    if not input_bytes:
+        raise ValueError("input_bytes пустой — нечего конвертировать.")
+
+    logger.debug(
+        "Starting ffmpeg conversion from bytes. input_size=%d",
+        len(input_bytes),
+    )
+
+    ffmpeg_exe = get_ffmpeg_executable(ffmpeg_path)
+
+    cmd = _bytes_to_wav_cmd(ffmpeg_exe)
+
+    with FFMPEG_SECONDS.time(caller="convert_audio_bytes"), span(
+        "ffmpeg", caller="convert_audio_bytes", input_size=len(input_bytes)
+    ) as ffmpeg_span:
+        try:
+            process = subprocess.Popen(
+                cmd,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+        except FileNotFoundError as e:
+            logger.error(
+                "Не удалось запустить ffmpeg в convert_audio_bytes. "
+                "Похоже, ffmpeg не установлен или не добавлен в PATH.",
+            )
+            raise RuntimeError(
+                "Не удалось запустить ffmpeg: исполняемый файл не найден. "
+                "Установи ffmpeg и добавь его в PATH."
+            ) from e
+
+        wav_bytes, stderr = process.communicate(input_bytes)
+        ffmpeg_span.set_attribute("returncode", process.returncode)
+        ffmpeg_span.set_attribute("output_size", len(wav_bytes))
+
+    if process.returncode != 0:
+        error_text = stderr.decode("utf-8", errors="ignore") if stderr else ""
+        logger.error(
+            "ffmpeg failed in convert_audio_bytes: returncode=%s, stderr=%s",
+            process.returncode,
+            error_text[:500],
+        )
+        raise RuntimeError(f"Ошибка ffmpeg (код {process.returncode}):\n{error_text}")
+
+    if not wav_bytes:
+        logger.error("ffmpeg did not return any WAV data.")
+        raise RuntimeError("ffmpeg не вернул WAV данные.")
+
+    logger.debug(
+        "ffmpeg conversion success. input_size=%d, output_size=%d",
+        len(input_bytes),
+        len(wav_bytes),
+    )
+
+    return wav_bytes
+
+
+async def _kill_process(process: asyncio.subprocess.Process) -> None:
+    if process.returncode is not None:
+        return
     try:
-        process = subprocess.Popen(
-            cmd,
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
+        process.kill()
+    except ProcessLookupError:
+        return
+    await process.wait()
+
+
+@contextlib.asynccontextmanager
+async def _ffmpeg_slot(caller: str) -> AsyncIterator[None]:
+    """
+    Слот FFMPEG_MAX_CONCURRENCY и замер FFMPEG_SECONDS: время самого
+    декодирования, без ожидания слота (оно идёт в slot_wait_ms текущего спана).
+    """
+    waited = time.perf_counter()
+    async with _ffmpeg_semaphore:
+        set_attribute(
+            "slot_wait_ms", round((time.perf_counter() - waited) * 1000, 3)
+        )
+        with FFMPEG_SECONDS.time(caller=caller):
+            yield
+
+
+async def _communicate_stream(
+    process: asyncio.subprocess.Process,
+    chunks: AsyncIterable[bytes],
+    slot: contextlib.AbstractAsyncContextManager[None],
+) -> tuple[bytes, bytes, int]:
+    """
+    Аналог process.communicate для входа-потока: куски пишутся в stdin по мере
+    поступления, stdout/stderr читаются параллельно. drain() даёт обратное
+    давление — если ffmpeg не успевает, источник ждёт, а не копится в памяти.
+
+    Пока идёт скачивание, ffmpeg работает без слота: его темп задаёт сеть,
+    и медленный источник не держит слот CPU. Когда вход кончился, чтение
+    stdout встаёт до получения slot — ffmpeg упирается в полный pipe,
+    и хвост декодирования идёт уже в пределах FFMPEG_MAX_CONCURRENCY.
+
+    Возвращает (stdout, stderr, сколько байт ушло в stdin).
+    Ошибки источника (например, сети) пробрасываются как есть.
+    """
+    assert process.stdin is not None
+    assert process.stdout is not None
+    assert process.stderr is not None
+    stdin = process.stdin
+    stdout = process.stdout
+
+    # открыт, пока качаем и когда слот получен
+    reading = asyncio.Event()
+    reading.set()
+
+    async def feed() -> int:
+        fed = 0
+        try:
+            async for chunk in chunks:
+                fed += len(chunk)
+                stdin.write(chunk)
+                await stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            # ffmpeg закрыл вход сам (битый файл) — причину скажут код и stderr
+            logger.debug("ffmpeg closed stdin early after %d bytes", fed)
+        finally:
+            stdin.close()
+        return fed
+
+    async def read_stdout() -> bytes:
+        output = bytearray()
+        while True:
+            await reading.wait()
+            chunk = await stdout.read(_PIPE_READ_SIZE)
+            if not chunk:
+                return bytes(output)
+            output += chunk
+
+    readers = [
+        asyncio.create_task(read_stdout()),
+        asyncio.create_task(process.stderr.read()),
+    ]
+    try:
+        fed = await feed()
+        if not fed:
+            raise ValueError("Поток пустой — нечего конвертировать.")
+        reading.clear()
+        async with slot:
+            reading.set()
+            output, stderr = await asyncio.gather(*readers)
+            await process.wait()
+    finally:
+        for task in readers:
+            task.cancel()
+        aclose = getattr(chunks, "aclose", None)
+        if aclose is not None:
+            # недочитанный генератор (ошибка ffmpeg) отпускает соединение сразу
+            await aclose()
+    return output, stderr, fed
+
+
+async def _start_ffmpeg_async(
+    cmd: list[str],
+    *,
+    caller: str,
+) -> asyncio.subprocess.Process:
+    try:
+        return await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
         )
     except FileNotFoundError as e:
         logger.error(
-            "Не удалось запустить ffmpeg в convert_audio_bytes. "
+            "Не удалось запустить ffmpeg в %s. "
             "Похоже, ffmpeg не установлен или не добавлен в PATH.",
+            caller,
         )
         raise RuntimeError(
             "Не удалось запустить ffmpeg: исполняемый файл не найден. "
             "Установи ffmpeg и добавь его в PATH."
         ) from e
 
-    wav_bytes, stderr = process.communicate(input_bytes)
+
+async def _run_ffmpeg_async(
+    cmd: list[str],
+    source: bytes | AsyncIterable[bytes],
+    *,
+    timeout_s: float | None,
+    caller: str,
+) -> bytes:
+    """
+    Запускает ffmpeg как asyncio subprocess: stdin <- source, stdout -> результат.
+
+    source — байты целиком или поток кусков (см. _communicate_stream).
+    Общая часть для всех async-конвертаций: семафор, таймаут с kill,
+    единые RuntimeError при ошибках.
+    """
+    streaming = not isinstance(source, bytes)
+    input_size = None if streaming else len(source)
+
+    with span("ffmpeg", caller=caller, streaming=streaming) as ffmpeg_span:
+        slot = _ffmpeg_slot(caller)
+        # вход в памяти — слот на весь процесс; для потока его берёт
+        # _communicate_stream, когда скачивание закончилось
+        async with contextlib.nullcontext() if streaming else slot:
+            logger.debug(
+                "Starting async ffmpeg (%s). input_size=%s",
+                caller,
+                "stream" if streaming else input_size,
+            )
+            process = await _start_ffmpeg_async(cmd, caller=caller)
+
+            try:
+                if isinstance(source, bytes):
+                    output, stderr = await asyncio.wait_for(
+                        process.communicate(source),
+                        timeout=timeout_s,
+                    )
+                else:
+                    output, stderr, input_size = await asyncio.wait_for(
+                        _communicate_stream(process, source, slot),
+                        timeout=timeout_s,
+                    )
+            except TimeoutError as e:
+                await _kill_process(process)
+                logger.error(
+                    "ffmpeg timed out in %s after %.1fs, killed. input_size=%s",
+                    caller,
+                    timeout_s,
+                    input_size,
+                )
+                raise RuntimeError(
+                    f"ffmpeg не уложился в {timeout_s:.0f} с и был остановлен."
+                ) from e
+            except BaseException:
+                # отмена задачи, ошибка источника и т.п. — не оставляем
+                # процесс-сироту
+                await _kill_process(process)
+                raise
+        ffmpeg_span.set_attribute("input_size", input_size)
+        ffmpeg_span.set_attribute("returncode", process.returncode)
+        ffmpeg_span.set_attribute("output_size", len(output))
 
     if process.returncode != 0:
         error_text = stderr.decode("utf-8", errors="ignore") if stderr else ""
         logger.error(
-            "ffmpeg failed in convert_audio_bytes: returncode=%s, stderr=%s",
+            "ffmpeg failed in %s: returncode=%s, stderr=%s",
+            caller,
             process.returncode,
             error_text[:500],
         )
         raise RuntimeError(f"Ошибка ffmpeg (код {process.returncode}):\n{error_text}")
 
+    return output
+
+
+async def convert_audio_bytes_async(
+    input_bytes: bytes,
+    *,
+    ffmpeg_path: str | Path | None = None,
+    timeout_s: float | None = None,
+) -> bytes:
+    """
+    Async-версия convert_audio_bytes на asyncio subprocess.
+
+    - Не блокирует event loop: пока ffmpeg работает, бот обрабатывает другие апдейты.
+    - Число одновременных ffmpeg ограничено семафором (set_ffmpeg_concurrency).
+    - timeout_s — лимит на работу самого процесса (без ожидания в очереди);
+      зависший ffmpeg убивается.
+
+    Ошибки те же, что у convert_audio_bytes: ValueError на пустой вход,
+    RuntimeError на любые проблемы с ffmpeg.
+    """
+
+    if not input_bytes:
+        raise ValueError("input_bytes пустой — нечего конвертировать.")
+
+    ffmpeg_exe = get_ffmpeg_executable(ffmpeg_path)
+    wav_bytes = await _run_ffmpeg_async(
+        _bytes_to_wav_cmd(ffmpeg_exe),
+        input_bytes,
+        timeout_s=timeout_s,
+        caller="convert_audio_bytes_async",
+    )
+
     if not wav_bytes:
         logger.error("ffmpeg did not return any WAV data.")
         raise RuntimeError("ffmpeg не вернул WAV данные.")
 
     logger.debug(
-        "ffmpeg conversion success. input_size=%d, output_size=%d",
+        "async ffmpeg conversion success. input_size=%d, output_size=%d",
         len(input_bytes),
         len(wav_bytes),
     )
@@ -236,6 +516,188 @@ def convert_audio_bytes(
     return wav_bytes
 
 
+def _bytes_to_pcm_cmd(ffmpeg_exe: str) -> list[str]:
+    # То же, что _bytes_to_wav_cmd, но на выходе сырой float32 PCM без заголовка:
+    # -f f32le             raw float32 little-endian — ровно то, что ест Whisper
+    return [
+        ffmpeg_exe,
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-i",
+        "pipe:0",
+        "-ac",
+        "1",
+        "-ar",
+        str(SAMPLE_RATE),
+        "-f",
+        "f32le",
+        "pipe:1",
+    ]
+
+
+async def _decode_in_process_async(
+    input_bytes: bytes,
+    *,
+    mime_type: str | None,
+) -> np.ndarray:
+    """PyAV в потоке; слоты те же, что у ffmpeg — это тот же CPU."""
+    from app.utils.av_decode import decode_to_pcm
+
+    with span("pyav_decode", input_size=len(input_bytes)) as decode_span:
+        async with _ffmpeg_slot("pyav_decode"):
+            pcm = await asyncio.to_thread(
+                decode_to_pcm, input_bytes, mime_type=mime_type
+            )
+        decode_span.set_attribute("samples", pcm.size)
+    return pcm
+
+
+async def convert_audio_to_pcm_async(
+    input_bytes: bytes,
+    *,
+    ffmpeg_path: str | Path | None = None,
+    timeout_s: float | None = None,
+    mime_type: str | None = None,
+    in_process: bool = False,
+) -> np.ndarray:
+    """
+    Декодирует аудио (OGG/OPUS, MP3, MP4...) в float32 PCM 16 kHz mono.
+
+    Вывод ffmpeg оборачивается в массив через np.frombuffer без копирования —
+    его можно сразу отдавать в model.transcribe. Ни WAV, ни временных файлов,
+    ни повторного запуска ffmpeg внутри whisper.load_audio.
+
+    in_process=True — сначала PyAV (app/utils/av_decode.py, если пакет av
+    установлен), при любой его ошибке — ffmpeg как обычно. timeout_s
+    на in-process декодирование не действует: поток не убить, поэтому
+    вызывающий шлёт сюда только небольшие файлы.
+
+    Ошибки те же, что у convert_audio_bytes_async.
+    """
+
+    if not input_bytes:
+        raise ValueError("input_bytes пустой — нечего конвертировать.")
+
+    if in_process:
+        from app.utils.av_decode import pyav_available
+
+        if pyav_available():
+            try:
+                return await _decode_in_process_async(
+                    input_bytes, mime_type=mime_type
+                )
+            except Exception as e:  # noqa: BLE001 — дальше ffmpeg
+                logger.warning(
+                    "PyAV failed to decode %d bytes (%s), falling back to ffmpeg: %s",
+                    len(input_bytes),
+                    mime_type,
+                    e,
+                )
+                FALLBACKS_TOTAL.inc(source="pyav", target="ffmpeg", reason="error")
+
+    ffmpeg_exe = get_ffmpeg_executable(ffmpeg_path)
+    raw = await _run_ffmpeg_async(
+        _bytes_to_pcm_cmd(ffmpeg_exe),
+        input_bytes,
+        timeout_s=timeout_s,
+        caller="convert_audio_to_pcm_async",
+    )
+
+    if not raw:
+        logger.error("ffmpeg did not return any PCM data.")
+        raise RuntimeError("ffmpeg не вернул PCM данные.")
+
+    pcm = np.frombuffer(raw, dtype=np.float32)
+
+    logger.debug(
+        "async ffmpeg PCM conversion success. input_size=%d, samples=%d, duration=%.2fs",
+        len(input_bytes),
+        pcm.size,
+        pcm.size / SAMPLE_RATE,
+    )
+
+    return pcm
+
+
+async def convert_audio_stream_to_pcm_async(
+    chunks: AsyncIterable[bytes],
+    *,
+    ffmpeg_path: str | Path | None = None,
+    timeout_s: float | None = None,
+) -> np.ndarray:
+    """
+    То же, что convert_audio_to_pcm_async, но вход — поток кусков (например,
+    скачивание из Telegram): ffmpeg декодирует, пока файл ещё качается,
+    а целиком исходный файл в памяти не собирается.
+
+    timeout_s здесь покрывает и чтение источника.
+    Ошибки источника пробрасываются как есть, пустой поток — ValueError,
+    проблемы ffmpeg — RuntimeError.
+    """
+    ffmpeg_exe = get_ffmpeg_executable(ffmpeg_path)
+    raw = await _run_ffmpeg_async(
+        _bytes_to_pcm_cmd(ffmpeg_exe),
+        chunks,
+        timeout_s=timeout_s,
+        caller="convert_audio_stream_to_pcm_async",
+    )
+
+    if not raw:
+        logger.error("ffmpeg did not return any PCM data.")
+        raise RuntimeError("ffmpeg не вернул PCM данные.")
+
+    pcm = np.frombuffer(raw, dtype=np.float32)
+
+    logger.debug(
+        "async ffmpeg streaming PCM conversion success. samples=%d, duration=%.2fs",
+        pcm.size,
+        pcm.size / SAMPLE_RATE,
+    )
+
+    return pcm
+
+
+def pcm_to_wav_bytes(pcm: np.ndarray, *, sample_rate: int = SAMPLE_RATE) -> bytes:
+    """
+    Упаковывает float32 PCM в WAV (PCM 16-bit mono).
+    Нужна там, где внешний сервис (Deepgram) ждёт именно WAV.
+    """
+    samples = np.clip(pcm, -1.0, 1.0)
+    pcm16 = (samples * 32767.0).astype("<i2")
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm16.tobytes())
+    return buffer.getvalue()
+
+
+def wav_bytes_to_pcm(wav_bytes: bytes) -> np.ndarray:
+    """
+    Обратное преобразование: WAV (PCM 16-bit) -> float32 PCM.
+    Без ffmpeg — только заголовок WAV и np.frombuffer.
+    """
+    with wave.open(io.BytesIO(wav_bytes), "rb") as wav:
+        if wav.getsampwidth() != 2:
+            raise ValueError(
+                f"Ожидался PCM 16-bit WAV, получено sampwidth={wav.getsampwidth()}"
+            )
+        if wav.getframerate() != SAMPLE_RATE:
+            raise ValueError(
+                f"Ожидался WAV {SAMPLE_RATE} Hz, получено {wav.getframerate()} Hz"
+            )
+        channels = wav.getnchannels()
+        frames = wav.readframes(wav.getnframes())
+
+    pcm16 = np.frombuffer(frames, dtype="<i2")
+    if channels > 1:
+        pcm16 = pcm16.reshape(-1, channels).mean(axis=1)
+    return pcm16.astype(np.float32) / 32768.0
+
+
 if __name__ == "__main__":
     # Небольшой ручной тест, чтобы проверить, что всё работает.
     src = Path("data/audio/audio_2025-11-13_16-22-04.ogg")
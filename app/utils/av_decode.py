@@ -0,0 +1,113 @@
+# app/utils/av_decode.py
+"""
+Декодирование аудио в процессе через PyAV (те же libavformat/libavcodec/
+libswresample, что внутри ffmpeg) — без fork/exec и пайпов на каждое
+сообщение. Для коротких голосовых запуск ffmpeg — заметная доля всего
+декодирования.
+
+Пакет av необязательный: без него работает ffmpeg subprocess (app/utils/audio.py).
+"""
+from __future__ import annotations
+
+import functools
+import importlib.util
+import io
+
+import numpy as np
+
+from app.utils.audio import SAMPLE_RATE
+
+# Голосовые Telegram — всегда OGG/Opus: контейнер известен заранее,
+# пробинг формата не нужен. Остальное (audio с любым mime, кружки)
+# libavformat определяет сам.
+_OGG_MIME_TYPES = frozenset({"audio/ogg", "audio/opus"})
+
+# Opus в libavcodec декодируется только в 48 kHz (fltp). Ресэмплить его
+# по 20-мс кадрам дорого — кадры копятся в блоки по ~10 с.
+_OPUS_RATE = 48000
+_OPUS_BLOCK_SAMPLES = _OPUS_RATE * 10
+
+
+@functools.lru_cache(maxsize=1)
+def pyav_available() -> bool:
+    return importlib.util.find_spec("av") is not None
+
+
+def decode_to_pcm(data: bytes, *, mime_type: str | None = None) -> np.ndarray:
+    """
+    Декодирует аудио (OGG/OPUS, MP3, MP4...) в float32 PCM 16 kHz mono —
+    то же, что convert_audio_to_pcm_async, но в текущем потоке.
+
+    Синхронная и CPU-bound: из event loop — только через asyncio.to_thread.
+    Ошибки: ValueError на пустой вход или файл без звука,
+    исключения av (av.FFmpegError и др.) на битый файл.
+    """
+    import av
+
+    if not data:
+        raise ValueError("data пустой — нечего декодировать.")
+
+    container_format = "ogg" if mime_type in _OGG_MIME_TYPES else None
+    with av.open(io.BytesIO(data), format=container_format) as container:
+        if not container.streams.audio:
+            raise ValueError("В файле нет аудиодорожки.")
+        stream = container.streams.audio[0]
+        resampler = av.AudioResampler(format="flt", layout="mono", rate=SAMPLE_RATE)
+
+        if stream.codec_context.name == "opus":
+            chunks = _decode_opus(container, stream, resampler)
+        else:
+            chunks = [
+                _frame_samples(out)
+                for frame in container.decode(stream)
+                for out in resampler.resample(frame)
+            ]
+        # хвост, оставшийся в буфере swresample
+        chunks.extend(_frame_samples(out) for out in resampler.resample(None))
+
+    if not chunks:
+        raise ValueError("В файле нет ни одного аудиокадра.")
+    return np.concatenate(chunks)
+
+
+def _decode_opus(container, stream, resampler) -> list[np.ndarray]:
+    """
+    Кадры Opus (48 kHz fltp) сводятся в моно сами и ресэмплятся блоками:
+    один вызов swresample на 10 с вместо пятисот — результат тот же,
+    а на минутном голосовом это ~25% времени всего декодирования.
+    """
+    from av import AudioFrame
+
+    chunks: list[np.ndarray] = []
+    pending: list[np.ndarray] = []
+    pending_samples = 0
+
+    def flush() -> None:
+        nonlocal pending_samples
+        block = np.concatenate(pending).astype(np.float32, copy=False)
+        pending.clear()
+        pending_samples = 0
+        frame = AudioFrame.from_ndarray(block[None, :], format="flt", layout="mono")
+        frame.sample_rate = _OPUS_RATE
+        chunks.extend(_frame_samples(out) for out in resampler.resample(frame))
+
+    for frame in container.decode(stream):
+        if frame.format.name != "fltp" or frame.sample_rate != _OPUS_RATE:
+            raise ValueError(
+                f"unexpected Opus frame: {frame.format.name} @ {frame.sample_rate} Hz"
+            )
+        planes = frame.to_ndarray()  # (каналы, сэмплы)
+        samples = planes[0] if planes.shape[0] == 1 else planes.mean(axis=0)
+        pending.append(samples)
+        pending_samples += samples.size
+        if pending_samples >= _OPUS_BLOCK_SAMPLES:
+            flush()
+
+    if pending:
+        flush()
+    return chunks
+
+
+def _frame_samples(frame) -> np.ndarray:
+    # flt mono — packed, одна плоскость: (1, сэмплы)
+    return frame.to_ndarray()[0]
@@ -0,0 +1,184 @@
+# app/utils/vad.py
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.utils.audio import SAMPLE_RATE
+
+FRAME_MS = 30
+
+
+@dataclass
+class VadStats:
+    """Сколько аудио убрал VAD (для логов)."""
+
+    original_s: float
+    kept_s: float
+    leading_s: float
+    trailing_s: float
+    pauses_s: float
+    speech_frames: int
+    total_frames: int
+
+    @property
+    def removed_s(self) -> float:
+        return self.original_s - self.kept_s
+
+    @property
+    def all_silent(self) -> bool:
+        return self.speech_frames == 0
+
+
+def _frame(pcm: np.ndarray, frame_len: int) -> np.ndarray:
+    n_frames = pcm.size // frame_len
+    return pcm[: n_frames * frame_len].reshape(n_frames, frame_len)
+
+
+def frame_energy_db(pcm: np.ndarray, *, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """RMS-энергия по кадрам FRAME_MS в dBFS."""
+    frames = _frame(pcm, sample_rate * FRAME_MS // 1000)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+    return 20.0 * np.log10(rms + 1e-10)
+
+
+def speech_mask(
+    pcm: np.ndarray,
+    *,
+    sample_rate: int = SAMPLE_RATE,
+    threshold_db: float = -50.0,
+    margin_db: float = 10.0,
+    zcr_threshold: float = 0.25,
+    dynamic_range_db: float = 20.0,
+    padding_s: float = 0.2,
+) -> np.ndarray:
+    """
+    Маска "есть речь" по кадрам FRAME_MS (векторно, без циклов по кадрам).
+
+    Кадр считается речью, если:
+    - его энергия выше порога, или
+    - энергия чуть ниже порога (на margin_db / 2), но частота переходов через
+      ноль высокая (глухие согласные: "с", "ш", "ф" тихие, но "шумные").
+
+    Порог — шумовой пол + margin_db, но не выше пика минус dynamic_range_db
+    (иначе сплошная речь без пауз целиком уйдёт в "тишину") и не ниже
+    абсолютного threshold_db.
+
+    Маска расширяется на padding_s в обе стороны, чтобы не обрезать
+    начала и концы слов.
+    """
+    frame_len = sample_rate * FRAME_MS // 1000
+    frames = _frame(pcm, frame_len)
+    if frames.shape[0] == 0:
+        return np.zeros(0, dtype=bool)
+
+    energy_db = frame_energy_db(pcm, sample_rate=sample_rate)
+
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / frame_len
+
+    noise_floor_db = float(np.percentile(energy_db, 10))
+    peak_db = float(energy_db.max())
+    threshold = max(
+        threshold_db,
+        min(noise_floor_db + margin_db, peak_db - dynamic_range_db),
+    )
+
+    voiced = energy_db > threshold
+    unvoiced = (energy_db > threshold - margin_db / 2) & (zcr > zcr_threshold)
+    mask = voiced | unvoiced
+
+    pad_frames = round(padding_s * 1000 / FRAME_MS)
+    if pad_frames > 0 and mask.any():
+        kernel = np.ones(2 * pad_frames + 1, dtype=np.int32)
+        mask = np.convolve(mask.astype(np.int32), kernel, mode="same") > 0
+
+    return mask
+
+
+def _silent_runs(mask: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Начала и концы (не включительно) участков тишины в маске речи."""
+    silent = np.concatenate(([0], (~mask).astype(np.int8), [0]))
+    edges = np.diff(silent)
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def trim_silence(
+    pcm: np.ndarray,
+    *,
+    sample_rate: int = SAMPLE_RATE,
+    threshold_db: float = -50.0,
+    max_pause_s: float = 1.0,
+    padding_s: float = 0.2,
+) -> tuple[np.ndarray, VadStats]:
+    """
+    Обрезает тишину в начале/конце и сжимает длинные внутренние паузы
+    до max_pause_s. Если речи нет совсем — возвращает пустой массив.
+    """
+    frame_len = sample_rate * FRAME_MS // 1000
+    original_s = pcm.size / sample_rate
+
+    mask = speech_mask(
+        pcm,
+        sample_rate=sample_rate,
+        threshold_db=threshold_db,
+        padding_s=padding_s,
+    )
+    total_frames = mask.size
+    speech_frames = int(np.count_nonzero(mask))
+
+    if total_frames == 0:
+        # клип короче одного кадра — оставляем как есть
+        stats = VadStats(original_s, original_s, 0.0, 0.0, 0.0, 1, 1)
+        return pcm, stats
+
+    if speech_frames == 0:
+        stats = VadStats(original_s, 0.0, original_s, 0.0, 0.0, 0, total_frames)
+        return pcm[:0], stats
+
+    # речь и паузы до max_pause_s остаются, режутся только края и середины
+    # длинных пауз — иначе слова склеились бы без пауз
+    keep = np.ones(total_frames, dtype=bool)
+    starts, ends = _silent_runs(mask)
+    frame_s = FRAME_MS / 1000
+    max_pause_frames = max(1, round(max_pause_s / frame_s))
+
+    leading = trailing = pauses = 0
+    for start, end in zip(starts, ends):
+        length = int(end - start)
+        if start == 0:
+            leading = length
+        elif end == total_frames:
+            trailing = length
+        elif length > max_pause_frames:
+            # оставляем края паузы, середину выкидываем
+            half = max_pause_frames // 2
+            keep[start + half : end - (max_pause_frames - half)] = False
+            pauses += length - max_pause_frames
+            continue
+        else:
+            continue
+        keep[start:end] = False
+
+    frames = _frame(pcm, frame_len)
+    parts = [frames[keep].reshape(-1)]
+    if keep[-1]:
+        # хвост, не попавший в целый кадр
+        parts.append(pcm[frames.size :])
+    trimmed = np.concatenate(parts) if len(parts) > 1 else parts[0]
+
+    trailing_s = trailing * frame_s
+    if not keep[-1]:
+        trailing_s += (pcm.size - frames.size) / sample_rate
+
+    stats = VadStats(
+        original_s=original_s,
+        kept_s=trimmed.size / sample_rate,
+        leading_s=leading * frame_s,
+        trailing_s=trailing_s,
+        pauses_s=pauses * frame_s,
+        speech_frames=speech_frames,
+        total_frames=total_frames,
+    )
+    return trimmed, stats
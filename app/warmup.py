@@ -0,0 +1,175 @@
+# app/warmup.py
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, replace
+from pathlib import Path
+
+import numpy as np
+
+from app.config import InferenceExecutorKind, Settings, TranscriberBackend
+from app.scheduler import get_job_scheduler
+from app.transcription import transcribe
+from app.transcription.executor import get_inference_executor
+from app.transcription.health import get_deepgram_health
+from app.transcription.worker_client import get_worker_client
+from app.utils.audio import (
+    SAMPLE_RATE,
+    check_ffmpeg_available,
+    convert_audio_to_pcm_async,
+    pcm_to_wav_bytes,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ReadinessState:
+    """Что известно о готовности инстанса принимать трафик."""
+
+    ffmpeg_available: bool = False
+    model_loaded: bool = False
+    warmup_done: bool = False
+    warmup_error: str | None = None
+    warmup_duration_s: float | None = None
+    warmup_attempts: int = 0
+
+
+readiness = ReadinessState()
+
+
+def _needs_local_model(settings: Settings) -> bool:
+    return settings.transcriber_backend in (
+        TranscriberBackend.WHISPER,
+        TranscriberBackend.FASTER_WHISPER,
+    )
+
+
+def synthetic_clip_wav(duration_s: float = 1.0) -> bytes:
+    """
+    Короткий синтетический клип (тон + немного шума) в WAV.
+    Содержимое не важно: нужно прогнать настоящие пути ffmpeg и модели.
+    """
+    rng = np.random.default_rng(0)
+    t = np.arange(int(duration_s * SAMPLE_RATE), dtype=np.float32) / SAMPLE_RATE
+    pcm = 0.1 * np.sin(2 * np.pi * 220.0 * t) + 0.01 * rng.standard_normal(t.size)
+    return pcm_to_wav_bytes(pcm.astype(np.float32))
+
+
+async def run_warmup(
+    settings: Settings,
+    *,
+    ffmpeg_path: str | Path | None = None,
+    retry: bool = False,
+) -> None:
+    """
+    Прогревает холодные пути до первого настоящего сообщения:
+    запуск ffmpeg, загрузку/подкачку модели, первый вызов torch-ядер и mel-фильтров.
+
+    Для Whisper клип прогоняется через каждый воркер executor'а.
+    Для Deepgram удалённый вызов не делается (это реальный платный запрос) —
+    прогревается только конвертация.
+
+    Сюда же входит старт inference executor'а (загрузка модели при
+    WHISPER_LOAD_POLICY=eager): его ошибка — такой же сбой прогрева,
+    а не падение старта приложения.
+
+    retry=True — при ошибке повторять с экспоненциальной паузой
+    (WARMUP_RETRY_INITIAL_S..WARMUP_RETRY_MAX_S), пока не пройдёт:
+    /ready зависит от прогрева, и разовый сбой (воркер ещё не поднялся,
+    диск с моделью не смонтирован) не должен держать 503 до рестарта.
+    """
+    delay = settings.warmup_retry_initial_s
+    while not await _warmup_once(settings, ffmpeg_path=ffmpeg_path):
+        if not retry:
+            return
+        logger.info("Retrying warmup in %.1fs", delay)
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, settings.warmup_retry_max_s)
+
+
+async def _warmup_once(
+    settings: Settings,
+    *,
+    ffmpeg_path: str | Path | None,
+) -> bool:
+    started = time.perf_counter()
+    readiness.warmup_attempts += 1
+    readiness.ffmpeg_available = check_ffmpeg_available(ffmpeg_path)
+
+    try:
+        # сломанный прошлой попыткой пул executor пересоздаст сам
+        await get_inference_executor(settings).start()
+
+        if not readiness.ffmpeg_available:
+            raise RuntimeError("ffmpeg is not available")
+
+        pcm = await convert_audio_to_pcm_async(
+            synthetic_clip_wav(),
+            ffmpeg_path=ffmpeg_path,
+            timeout_s=settings.ffmpeg_timeout_s,
+            in_process=settings.audio_decoder != "ffmpeg",
+        )
+
+        if _needs_local_model(settings):
+            # по одному клипу на воркер, чтобы прогреть каждую копию модели;
+            # без батчинга — иначе N одновременных клипов склеятся в один
+            # пакет и прогреется один воркер
+            unbatched = replace(settings, whisper_batching=False)
+            await asyncio.gather(
+                *(
+                    transcribe(pcm, settings=unbatched)
+                    for _ in range(settings.inference_workers)
+                )
+            )
+            readiness.model_loaded = True
+    except Exception as e:
+        readiness.warmup_error = str(e)
+        logger.exception("Warmup failed (attempt %d)", readiness.warmup_attempts)
+        return False
+
+    readiness.warmup_done = True
+    readiness.warmup_error = None
+    readiness.warmup_duration_s = time.perf_counter() - started
+    logger.info("Warmup complete in %.2fs", readiness.warmup_duration_s)
+    return True
+
+
+def readiness_report(settings: Settings) -> tuple[bool, dict]:
+    """
+    Снимок готовности для /ready.
+    Готов = ffmpeg найден, прогрев прошёл и (если нужна) модель загружена.
+    """
+    scheduler = get_job_scheduler(settings)
+    model_required = _needs_local_model(settings)
+
+    ready = (
+        readiness.ffmpeg_available
+        and readiness.warmup_done
+        and (readiness.model_loaded or not model_required)
+    )
+    report = {
+        "ready": ready,
+        "ffmpeg_available": readiness.ffmpeg_available,
+        "model_required": model_required,
+        "model_loaded": readiness.model_loaded,
+        "warmup_done": readiness.warmup_done,
+        "warmup_error": readiness.warmup_error,
+        "warmup_attempts": readiness.warmup_attempts,
+        "warmup_duration_s": readiness.warmup_duration_s,
+        "queue_depth": scheduler.depth,
+        "in_flight": scheduler.in_flight,
+    }
+    if settings.transcriber_backend == TranscriberBackend.DEEPGRAM:
+        # разомкнутая цепь не делает инстанс неготовым: работает Whisper-fallback
+        report["deepgram_circuit"] = get_deepgram_health(settings).breaker.state.value
+    if settings.inference_executor == InferenceExecutorKind.REMOTE:
+        client = get_worker_client(settings)
+        report["worker"] = {
+            "address": client.address,
+            "connected": client.connected,
+            "last_error": client.last_error,
+        }
+    return ready, report
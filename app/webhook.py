@@ -0,0 +1,101 @@
+# app/webhook.py
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import deque
+from collections.abc import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateDeduplicator:
+    """
+    Скользящее окно последних update_id.
+
+    Telegram повторно присылает апдейт, если не получил 2xx вовремя.
+    Такие повторы нужно отбрасывать, иначе одно голосовое распознаётся
+    два-три раза.
+    """
+
+    def __init__(self, window_size: int) -> None:
+        self.window_size = max(1, window_size)
+        self._order: deque[int] = deque()
+        self._seen: set[int] = set()
+
+    def is_duplicate(self, update_id: int) -> bool:
+        return update_id in self._seen
+
+    def remember(self, update_id: int) -> None:
+        if update_id in self._seen:
+            return
+        self._order.append(update_id)
+        self._seen.add(update_id)
+        while len(self._order) > self.window_size:
+            self._seen.discard(self._order.popleft())
+
+
+class BackgroundUpdateProcessor:
+    """
+    Ограниченный пул фоновых задач для обработки апдейтов.
+
+    Webhook отвечает Telegram сразу, а весь пайплайн (скачивание, ffmpeg,
+    распознавание) идёт здесь. Если задач уже max_tasks — новые не
+    принимаем (webhook вернёт 503, и Telegram повторит доставку позже).
+    """
+
+    def __init__(self, max_tasks: int) -> None:
+        self.max_tasks = max(1, max_tasks)
+        self._tasks: set[asyncio.Task] = set()
+        self._closing = False
+
+    @property
+    def active(self) -> int:
+        return len(self._tasks)
+
+    def submit(self, factory: Callable[[], Awaitable[object]], *, name: str) -> bool:
+        if self._closing or len(self._tasks) >= self.max_tasks:
+            return False
+
+        task = asyncio.create_task(factory(), name=name)
+        self._tasks.add(task)
+        task.add_done_callback(self._on_done)
+        return True
+
+    def _on_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if task.cancelled():
+            return
+
+        exc = task.exception()
+        if exc is not None:
+            logger.error(
+                "Background update task %s failed",
+                task.get_name(),
+                exc_info=exc,
+            )
+
+    async def drain(self, timeout_s: float) -> None:
+        """
+        Перестаёт принимать задачи и ждёт уже запущенные (не дольше timeout_s).
+        Всё, что не успело, отменяется.
+        """
+        self._closing = True
+        if not self._tasks:
+            return
+
+        logger.info(
+            "Draining %d background update task(s), timeout=%.0fs",
+            len(self._tasks),
+            timeout_s,
+        )
+        _, pending = await asyncio.wait(set(self._tasks), timeout=timeout_s)
+
+        if pending:
+            logger.warning(
+                "Cancelling %d background update task(s) that did not finish in time",
+                len(pending),
+            )
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
@@ -0,0 +1,10 @@
+"""
+Офлайн-бенчмарки пайплайна: ffmpeg-конвертации и transcribe_bytes целиком.
+
+    python -m benchmarks --out bench.json
+    python -m benchmarks --out new.json --compare bench.json
+
+Ни Telegram, ни Deepgram, ни модель Whisper не нужны: аудио синтезируется
+ffmpeg'ом, вместо Deepgram поднимается локальная заглушка, вместо Whisper —
+детерминированный фейковый бэкенд. Нужен только ffmpeg.
+"""
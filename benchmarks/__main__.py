@@ -0,0 +1,129 @@
+# benchmarks/__main__.py
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from benchmarks.fixtures import DEFAULT_DURATIONS, FORMATS, build_fixtures
+from benchmarks.micro import run_micro
+from benchmarks.report import (
+    REGRESSION_THRESHOLD,
+    build_report,
+    compare_reports,
+    format_table,
+    load_report,
+    save_report,
+)
+
+SUITES = ("micro", "e2e")
+
+
+def _csv(value: str) -> list[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Офлайн-бенчмарки конвертации и transcribe_bytes.",
+    )
+    parser.add_argument("--suites", type=_csv, default=list(SUITES))
+    parser.add_argument("--formats", type=_csv, default=list(FORMATS))
+    parser.add_argument(
+        "--durations",
+        type=lambda v: [float(d) for d in _csv(v)],
+        default=list(DEFAULT_DURATIONS),
+        help="секунды, через запятую",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--backends", type=_csv, default=["fake", "deepgram"])
+    parser.add_argument("--fake-rtf", type=float, default=0.05)
+    parser.add_argument("--stub-latency-ms", type=float, default=50.0)
+    parser.add_argument("--ffmpeg-path", default=os.getenv("FFMPEG_PATH") or None)
+    parser.add_argument("--cache-dir", type=Path, default=None)
+    parser.add_argument("--out", type=Path, help="куда сохранить JSON-отчёт")
+    parser.add_argument("--compare", type=Path, help="отчёт для сравнения")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    return parser.parse_args()
+
+
+def _run_e2e(args: argparse.Namespace, fixtures_dir: Path, backend: str) -> list:
+    """Каждый бэкенд — в своём процессе (см. benchmarks/e2e.py)."""
+    cmd = [
+        sys.executable,
+        "-m",
+        "benchmarks.e2e",
+        "--backend",
+        backend,
+        "--fixtures-dir",
+        str(fixtures_dir),
+        "--concurrency",
+        str(args.concurrency),
+        "--repeat",
+        str(args.repeat),
+        "--fake-rtf",
+        str(args.fake_rtf),
+        "--stub-latency-ms",
+        str(args.stub_latency_ms),
+        "--only",
+        *args.fixture_names,
+    ]
+    if args.ffmpeg_path:
+        cmd += ["--ffmpeg-path", str(args.ffmpeg_path)]
+
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, check=True, text=True)
+    return json.loads(result.stdout)
+
+
+def main() -> int:
+    args = parse_args()
+    unknown = set(args.suites) - set(SUITES)
+    if unknown:
+        raise SystemExit(f"Неизвестные наборы: {sorted(unknown)}, есть: {SUITES}")
+
+    fixtures = build_fixtures(
+        args.formats,
+        args.durations,
+        cache_dir=args.cache_dir,
+        ffmpeg_path=args.ffmpeg_path,
+    )
+    args.fixture_names = [f.name for f in fixtures]
+    fixtures_dir = fixtures[0].path.parent
+
+    results = []
+    if "micro" in args.suites:
+        micro = run_micro(fixtures, repeat=args.repeat, ffmpeg_path=args.ffmpeg_path)
+        results += [r.to_dict() for r in micro]
+    if "e2e" in args.suites:
+        for backend in args.backends:
+            results += _run_e2e(args, fixtures_dir, backend)
+
+    report = build_report(
+        results,
+        repeat=args.repeat,
+        concurrency=args.concurrency,
+    )
+    print(format_table(report))
+
+    if args.out:
+        save_report(report, args.out)
+        print(f"\nReport saved to {args.out}")
+
+    if args.compare:
+        text, regressions = compare_reports(
+            report, load_report(args.compare), threshold=args.threshold
+        )
+        print("\n" + text)
+        # ненулевой код — удобно для CI
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
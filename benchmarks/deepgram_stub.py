@@ -0,0 +1,96 @@
+# benchmarks/deepgram_stub.py
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class DeepgramStub:
+    """
+    Локальная замена Deepgram /v1/listen для бенчмарков.
+
+    HTTP/1.1 с keep-alive (как настоящий API — пул соединений
+    DeepgramClient переиспользует их). Ответ детерминированный: в нём только
+    размер тела, а задержка задаётся latency_s — сеть и распознавание
+    не меряются, меряется наш путь до и после запроса.
+    """
+
+    def __init__(self, *, latency_s: float = 0.05) -> None:
+        self.latency_s = latency_s
+        self.requests = 0
+        self.connections = 0
+        self.bytes_received = 0
+        self._server: asyncio.base_events.Server | None = None
+
+    @property
+    def url(self) -> str:
+        assert self._server is not None, "stub is not started"
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}/v1/listen"
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        self._server = await asyncio.start_server(self._handle, host, port)
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        self.connections += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    return
+
+                headers: dict[str, str] = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                size = int(headers.get("content-length", "0"))
+                await reader.readexactly(size)
+                self.requests += 1
+                self.bytes_received += size
+
+                await asyncio.sleep(self.latency_s)
+                body = json.dumps(self._response(size)).encode("utf-8")
+                writer.write(
+                    (
+                        "HTTP/1.1 200 OK\r\n"
+                        "Content-Type: application/json\r\n"
+                        f"Content-Length: {len(body)}\r\n"
+                        "Connection: keep-alive\r\n\r\n"
+                    ).encode("latin-1")
+                    + body
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _response(size: int) -> dict:
+        return {
+            "results": {
+                "channels": [
+                    {
+                        "alternatives": [
+                            {
+                                "transcript": f"bench transcript {size}",
+                                "confidence": 1.0,
+                            }
+                        ]
+                    }
+                ]
+            }
+        }
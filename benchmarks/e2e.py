@@ -0,0 +1,193 @@
+# benchmarks/e2e.py
+"""
+Сквозной прогон transcribe_bytes (ffmpeg -> VAD -> бэкенд) в отдельном
+процессе — настройки бота читаются из окружения один раз при импорте,
+а RSS не смешивается между сценариями.
+
+    python -m benchmarks.e2e --backend fake --fixtures-dir DIR ...
+
+Печатает в stdout JSON-список результатов (BenchResult.to_dict()).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+from benchmarks.deepgram_stub import DeepgramStub
+from benchmarks.fixtures import MIME_TYPES, Fixture
+from benchmarks.report import BenchResult
+
+BACKENDS = ("fake", "deepgram")
+
+
+def _configure_env(backend: str, stub_url: str | None, passthrough: bool) -> None:
+    """Окружение до импорта app.*: get_settings() читает его при импорте."""
+    os.environ.setdefault("BOT_TOKEN", "bench")
+    os.environ["CACHE_ENABLED"] = "false"
+    os.environ["TRACING_ENABLED"] = "false"
+    os.environ["INFERENCE_EXECUTOR"] = "thread"
+
+    if backend == "deepgram":
+        os.environ["TRANSCRIBER_BACKEND"] = "deepgram"
+        os.environ["DG_API_KEY"] = "bench"
+        os.environ["DG_API_URL"] = stub_url or ""
+        os.environ["DG_PASSTHROUGH"] = "true" if passthrough else "false"
+    else:
+        os.environ["TRANSCRIBER_BACKEND"] = "whisper"
+
+
+def _install_fake_whisper(realtime_factor: float) -> None:
+    """
+    Детерминированная замена локальной модели: "думает" realtime_factor
+    секунд на секунду аудио и отдаёт текст, зависящий только от длины.
+    Подменяется _run_whisper — единая точка входа локального инференса,
+    так что чанкинг и fallback'и работают как обычно.
+    """
+    from app import transcription
+    from app.utils.audio import SAMPLE_RATE
+
+    async def fake_run_whisper(pcm, settings, *, faster: bool = False) -> str:
+        await asyncio.sleep(pcm.size / SAMPLE_RATE * realtime_factor)
+        return f"fake transcript {pcm.size}"
+
+    transcription._run_whisper = fake_run_whisper
+
+
+async def _run_fixture(
+    transcribe_bytes,
+    fixture: Fixture,
+    *,
+    concurrency: int,
+    repeat: int,
+    ffmpeg_path: str | None,
+) -> tuple[list[float], float]:
+    data = fixture.read()
+
+    async def one() -> float:
+        t0 = time.perf_counter()
+        text = await transcribe_bytes(
+            data,
+            mime_type=fixture.mime_type,
+            filename=fixture.path.name,
+            ffmpeg_path=ffmpeg_path,
+        )
+        if not text:
+            raise RuntimeError(f"{fixture.name}: пустой ответ")
+        return time.perf_counter() - t0
+
+    await one()  # прогрев
+
+    latencies: list[float] = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        latencies += await asyncio.gather(*(one() for _ in range(concurrency)))
+    return latencies, time.perf_counter() - started
+
+
+async def run_e2e(args: argparse.Namespace) -> list[BenchResult]:
+    stub: DeepgramStub | None = None
+    if args.backend == "deepgram":
+        stub = DeepgramStub(latency_s=args.stub_latency_ms / 1000)
+        await stub.start()
+
+    _configure_env(args.backend, stub.url if stub else None, args.passthrough)
+
+    from app.config import get_settings
+    from app.handlers.voice import transcribe_bytes
+    from app.transcription.deepgram_backend import (
+        close_deepgram_client,
+        init_deepgram_client,
+    )
+
+    settings = get_settings()
+    if args.backend == "fake":
+        _install_fake_whisper(args.fake_rtf)
+    else:
+        init_deepgram_client(settings)
+
+    params = {"backend": args.backend, "concurrency": args.concurrency}
+    if args.backend == "deepgram":
+        params["passthrough"] = args.passthrough
+    else:
+        params["fake_rtf"] = args.fake_rtf
+
+    results = []
+    try:
+        for path in sorted(Path(args.fixtures_dir).iterdir()):
+            fmt = path.suffix.lstrip(".")
+            if fmt not in MIME_TYPES:
+                continue
+            duration_s = float(path.stem.split("-")[1].rstrip("s"))
+            fixture = Fixture(fmt=fmt, duration_s=duration_s, path=path)
+            if args.only and fixture.name not in args.only:
+                continue
+
+            latencies, wall_s = await _run_fixture(
+                transcribe_bytes,
+                fixture,
+                concurrency=args.concurrency,
+                repeat=args.repeat,
+                ffmpeg_path=args.ffmpeg_path,
+            )
+            results.append(
+                BenchResult(
+                    name="transcribe_bytes",
+                    params={"fixture": fixture.name, **params},
+                    latencies_s=latencies,
+                    audio_s=fixture.duration_s * len(latencies),
+                    wall_s=wall_s,
+                )
+            )
+    finally:
+        if stub is not None:
+            await close_deepgram_client()
+            await stub.close()
+            # stdout занят JSON'ом; число соединений показывает, работает ли пул
+            print(
+                f"Deepgram stub: requests={stub.requests} "
+                f"connections={stub.connections} bytes={stub.bytes_received}",
+                file=sys.stderr,
+            )
+
+    return results
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--backend", choices=BACKENDS, required=True)
+    parser.add_argument("--fixtures-dir", required=True)
+    parser.add_argument("--only", nargs="*", help="имена фикстур, например ogg-5s")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--ffmpeg-path", default=os.getenv("FFMPEG_PATH") or None)
+    parser.add_argument(
+        "--fake-rtf",
+        type=float,
+        default=0.05,
+        help="секунд фейкового инференса на секунду аудио",
+    )
+    parser.add_argument("--stub-latency-ms", type=float, default=50.0)
+    parser.add_argument(
+        "--no-passthrough",
+        dest="passthrough",
+        action="store_false",
+        help="слать в Deepgram WAV после ffmpeg/VAD, а не исходный файл",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    logging.basicConfig(level=logging.WARNING, stream=sys.stderr)
+    args = parse_args(argv)
+    results = asyncio.run(run_e2e(args))
+    json.dump([r.to_dict() for r in results], sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
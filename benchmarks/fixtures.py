@@ -0,0 +1,110 @@
+# benchmarks/fixtures.py
+from __future__ import annotations
+
+import subprocess
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from app.utils.audio import SAMPLE_RATE, get_ffmpeg_executable, pcm_to_wav_bytes
+
+# Форматы, в которых Telegram присылает голосовые, аудио и кружки
+FORMATS: dict[str, tuple[str, list[str]]] = {
+    # имя -> (расширение, аргументы кодека ffmpeg)
+    "ogg": (".ogg", ["-c:a", "libopus", "-b:a", "32k"]),
+    "mp3": (".mp3", ["-c:a", "libmp3lame", "-b:a", "64k"]),
+    # moov в начале, как у файлов Telegram: иначе ffmpeg не прочитает mp4 из pipe
+    "mp4": (".mp4", ["-c:a", "aac", "-b:a", "64k", "-movflags", "+faststart"]),
+}
+
+MIME_TYPES = {"ogg": "audio/ogg", "mp3": "audio/mpeg", "mp4": "video/mp4"}
+
+DEFAULT_DURATIONS = (5.0, 30.0, 120.0)
+
+
+@dataclass(frozen=True)
+class Fixture:
+    fmt: str
+    duration_s: float
+    path: Path
+
+    @property
+    def name(self) -> str:
+        return f"{self.fmt}-{self.duration_s:g}s"
+
+    @property
+    def mime_type(self) -> str:
+        return MIME_TYPES[self.fmt]
+
+    def read(self) -> bytes:
+        return self.path.read_bytes()
+
+
+def default_cache_dir() -> Path:
+    return Path(tempfile.gettempdir()) / "voice2text-bench"
+
+
+def speech_like_pcm(duration_s: float, *, seed: int = 0) -> np.ndarray:
+    """
+    Детерминированный "речеподобный" сигнал: фразы по 1.5 с (тон с
+    плавающей частотой + шум) и паузы по 0.5 с — чтобы VAD было что резать.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(duration_s * SAMPLE_RATE), dtype=np.float32) / SAMPLE_RATE
+    pitch = 180.0 + 40.0 * np.sin(2 * np.pi * 0.7 * t)
+    voice = 0.2 * np.sin(2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE)
+    voice += 0.02 * rng.standard_normal(t.size)
+    talking = (t % 2.0) < 1.5
+    pcm = np.where(talking, voice, 0.001 * rng.standard_normal(t.size))
+    return pcm.astype(np.float32)
+
+
+def _encode(
+    wav_path: Path,
+    out_path: Path,
+    codec_args: list[str],
+    ffmpeg_exe: str,
+) -> None:
+    cmd = [ffmpeg_exe, "-y", "-loglevel", "error", "-i", str(wav_path)]
+    cmd += codec_args + [str(out_path)]
+    result = subprocess.run(cmd, capture_output=True, check=False)
+    if result.returncode != 0:
+        raise RuntimeError(
+            f"ffmpeg не смог закодировать {out_path.name}: "
+            f"{result.stderr.decode('utf-8', errors='ignore')[:500]}"
+        )
+
+
+def build_fixtures(
+    formats: list[str],
+    durations: list[float],
+    *,
+    cache_dir: Path | None = None,
+    ffmpeg_path: str | Path | None = None,
+) -> list[Fixture]:
+    """
+    Кодирует синтетическое аудио во все formats x durations.
+    Готовые файлы переиспользуются между запусками (cache_dir).
+    """
+    cache_dir = cache_dir or default_cache_dir()
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    ffmpeg_exe = get_ffmpeg_executable(ffmpeg_path)
+
+    fixtures = []
+    for duration_s in durations:
+        wav_path = cache_dir / f"source-{duration_s:g}s.wav"
+        if not wav_path.is_file():
+            wav_path.write_bytes(pcm_to_wav_bytes(speech_like_pcm(duration_s)))
+
+        for fmt in formats:
+            if fmt not in FORMATS:
+                raise ValueError(f"Неизвестный формат {fmt!r}, есть: {list(FORMATS)}")
+            ext, codec_args = FORMATS[fmt]
+            path = cache_dir / f"{fmt}-{duration_s:g}s{ext}"
+            if not path.is_file():
+                _encode(wav_path, path, codec_args, ffmpeg_exe)
+            fixtures.append(Fixture(fmt=fmt, duration_s=duration_s, path=path))
+
+    return fixtures
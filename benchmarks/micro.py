@@ -0,0 +1,131 @@
+# benchmarks/micro.py
+from __future__ import annotations
+
+import asyncio
+import tempfile
+import time
+from collections.abc import AsyncIterator, Callable
+from pathlib import Path
+from typing import Any
+
+from app.utils.audio import (
+    convert_audio_bytes,
+    convert_audio_stream_to_pcm_async,
+    convert_audio_to_pcm_async,
+    convert_to_wav_16k_file,
+)
+from app.utils.av_decode import decode_to_pcm, pyav_available
+from benchmarks.fixtures import Fixture
+from benchmarks.report import BenchResult
+
+# как у потоковой загрузки из Telegram (STREAM_CHUNK_SIZE)
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+async def _chunks(data: bytes) -> AsyncIterator[bytes]:
+    for offset in range(0, len(data), STREAM_CHUNK_SIZE):
+        yield data[offset : offset + STREAM_CHUNK_SIZE]
+
+
+def _measure(
+    name: str,
+    fixture: Fixture,
+    call: Callable[[], Any],
+    *,
+    repeat: int,
+) -> BenchResult:
+    call()  # прогрев: page cache, первый запуск ffmpeg
+
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - t0)
+    wall_s = time.perf_counter() - started
+
+    return BenchResult(
+        name=name,
+        params={"fixture": fixture.name},
+        latencies_s=latencies,
+        audio_s=fixture.duration_s * repeat,
+        wall_s=wall_s,
+    )
+
+
+def run_micro(
+    fixtures: list[Fixture],
+    *,
+    repeat: int,
+    ffmpeg_path: str | Path | None = None,
+) -> list[BenchResult]:
+    """
+    Отдельные конвертации ffmpeg, последовательно:
+    - convert_audio_bytes — stdin/stdout, WAV;
+    - convert_to_wav_16k_file — файл на диске -> файл;
+    - convert_audio_to_pcm_async — путь бота (f32le PCM, asyncio subprocess);
+    - convert_audio_stream_to_pcm_async — то же, вход кусками (STREAM_DOWNLOAD);
+    - pyav_decode — in-process декодирование (AUDIO_DECODER), если установлен av.
+    """
+    results = []
+    with tempfile.TemporaryDirectory(prefix="voice2text-bench-") as tmp:
+        out_path = Path(tmp) / "out.wav"
+
+        for fixture in fixtures:
+            data = fixture.read()
+
+            results.append(
+                _measure(
+                    "convert_audio_bytes",
+                    fixture,
+                    lambda data=data: convert_audio_bytes(
+                        data, ffmpeg_path=ffmpeg_path
+                    ),
+                    repeat=repeat,
+                )
+            )
+            results.append(
+                _measure(
+                    "convert_to_wav_16k_file",
+                    fixture,
+                    lambda path=fixture.path: convert_to_wav_16k_file(
+                        path, out_path, ffmpeg_path=ffmpeg_path
+                    ),
+                    repeat=repeat,
+                )
+            )
+            results.append(
+                _measure(
+                    "convert_audio_to_pcm_async",
+                    fixture,
+                    lambda data=data: asyncio.run(
+                        convert_audio_to_pcm_async(data, ffmpeg_path=ffmpeg_path)
+                    ),
+                    repeat=repeat,
+                )
+            )
+            results.append(
+                _measure(
+                    "convert_audio_stream_to_pcm_async",
+                    fixture,
+                    lambda data=data: asyncio.run(
+                        convert_audio_stream_to_pcm_async(
+                            _chunks(data), ffmpeg_path=ffmpeg_path
+                        )
+                    ),
+                    repeat=repeat,
+                )
+            )
+            if pyav_available():
+                results.append(
+                    _measure(
+                        "pyav_decode",
+                        fixture,
+                        lambda data=data, mime=fixture.mime_type: decode_to_pcm(
+                            data, mime_type=mime
+                        ),
+                        repeat=repeat,
+                    )
+                )
+
+    return results
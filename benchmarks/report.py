@@ -0,0 +1,171 @@
+# benchmarks/report.py
+from __future__ import annotations
+
+import json
+import platform
+import resource
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+# Относительное изменение, начиная с которого compare помечает регрессию
+REGRESSION_THRESHOLD = 0.10
+
+
+def rss_mb() -> float:
+    """Текущий RSS процесса (Linux: /proc), иначе — пиковый."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * resource.getpagesize() / 2**20
+    except (OSError, ValueError, IndexError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдаёт килобайты, macOS — байты
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def _percentile(ordered: list[float], p: float) -> float:
+    index = min(len(ordered) - 1, round(p / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+@dataclass
+class BenchResult:
+    """Один сценарий: задержки отдельных вызовов + итоговая пропускная способность."""
+
+    name: str
+    params: dict[str, Any]
+    latencies_s: list[float]
+    audio_s: float  # суммарно секунд аудио за прогон
+    wall_s: float  # общее время прогона (с учётом параллельности)
+    rss_mb: float = field(default_factory=rss_mb)
+    peak_rss_mb: float = field(default_factory=peak_rss_mb)
+
+    def summary(self) -> dict[str, float]:
+        ordered = sorted(self.latencies_s)
+        return {
+            "calls": len(ordered),
+            "mean_ms": 1000 * sum(ordered) / len(ordered),
+            "p50_ms": 1000 * _percentile(ordered, 50),
+            "p95_ms": 1000 * _percentile(ordered, 95),
+            "max_ms": 1000 * ordered[-1],
+            "calls_per_s": len(ordered) / self.wall_s,
+            # секунд аудио на секунду работы: >1 — быстрее реального времени
+            "audio_x_realtime": self.audio_s / self.wall_s,
+            "rss_mb": self.rss_mb,
+            "peak_rss_mb": self.peak_rss_mb,
+        }
+
+    def to_dict(self) -> dict[str, Any]:
+        data = asdict(self)
+        data["summary"] = self.summary()
+        return data
+
+
+def _git_commit() -> str | None:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            check=False,
+            text=True,
+            timeout=5,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return result.stdout.strip() or None
+
+
+def build_report(results: list[dict[str, Any]], **meta: Any) -> dict[str, Any]:
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            **meta,
+        },
+        "results": results,
+    }
+
+
+def save_report(report: dict[str, Any], path: Path) -> None:
+    path.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+def load_report(path: Path) -> dict[str, Any]:
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _key(result: dict[str, Any]) -> str:
+    params = ",".join(f"{k}={v}" for k, v in sorted(result["params"].items()))
+    return f"{result['name']}[{params}]"
+
+
+def format_table(report: dict[str, Any]) -> str:
+    width = max([len(_key(r)) for r in report["results"]] + [len("benchmark")])
+    lines = [
+        f"{'benchmark':<{width}} {'p50 ms':>9} {'p95 ms':>9} {'x RT':>8} {'RSS MB':>8}"
+    ]
+    for result in report["results"]:
+        s = result["summary"]
+        lines.append(
+            f"{_key(result):<{width}} {s['p50_ms']:>9.1f} {s['p95_ms']:>9.1f} "
+            f"{s['audio_x_realtime']:>8.1f} {s['rss_mb']:>8.1f}"
+        )
+    return "\n".join(lines)
+
+
+def compare_reports(
+    current: dict[str, Any],
+    baseline: dict[str, Any],
+    *,
+    threshold: float = REGRESSION_THRESHOLD,
+) -> tuple[str, int]:
+    """
+    Сравнение двух отчётов по одинаковым сценариям.
+    Возвращает текст и число регрессий (p50 выше или пропускная способность
+    ниже базовой больше чем на threshold).
+    """
+    base = {_key(r): r["summary"] for r in baseline["results"]}
+    width = max([len(_key(r)) for r in current["results"]] + [len("benchmark")])
+    lines = [
+        (
+            f"baseline: {baseline['meta'].get('commit')}  "
+            f"current: {current['meta'].get('commit')}"
+        ),
+        f"{'benchmark':<{width}} {'p50 ms':>17} {'x RT':>15} {'RSS MB':>15}",
+    ]
+    regressions = 0
+
+    for result in current["results"]:
+        key = _key(result)
+        if key not in base:
+            continue
+        old, new = base[key], result["summary"]
+
+        p50_delta = new["p50_ms"] / old["p50_ms"] - 1 if old["p50_ms"] else 0.0
+        rt_delta = (
+            new["audio_x_realtime"] / old["audio_x_realtime"] - 1
+            if old["audio_x_realtime"]
+            else 0.0
+        )
+        regressed = p50_delta > threshold or rt_delta < -threshold
+        regressions += regressed
+
+        lines.append(
+            f"{key:<{width}} {new['p50_ms']:>8.1f} {p50_delta:>+7.1%} "
+            f"{new['audio_x_realtime']:>7.1f} {rt_delta:>+6.1%} "
+            f"{new['rss_mb'] - old['rss_mb']:>+15.1f}"
+            + ("  <- regression" if regressed else "")
+        )
+
+    return "\n".join(lines), regressions
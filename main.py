@@ -12,8 +12,20 @@ from aiogram import Bot
 
 from app.config import get_settings
 from app.logging_config import setup_logging
+from app.tracing import setup_tracing
 from app.utils.audio import check_ffmpeg_available
 from app.bot import create_dispatcher
+from app.metrics import start_metrics_server
+from app.warmup import run_warmup
+from app.scheduler import stop_job_scheduler
+from app.transcription.cache import close_transcript_cache
+from app.user_store import close_user_store, init_user_store
+from app.transcription.deepgram_backend import (
+    close_deepgram_client,
+    init_deepgram_client,
+)
+from app.transcription.executor import shutdown_inference_executor
+from app.transcription.worker_client import close_worker_client
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +33,7 @@ logger = logging.getLogger(__name__)
 async def main() -> None:
     settings = get_settings()
     setup_logging(settings)
+    setup_tracing(settings)
 
     logger.info("Starting app. debug=%s", settings.debug)
 
@@ -29,12 +42,38 @@ async def main() -> None:
             "ffmpeg was not detected during startup. Voice message conversion may not work."
         )
 
+    init_user_store(settings)
     bot = Bot(token=settings.bot_token)
     dp = create_dispatcher(ffmpeg_path=settings.ffmpeg_path)
 
-    logger.info("Bot started. Waiting for updates...")
-    await dp.start_polling(bot)
-    logger.info("Bot polling stopped. Shutting down.")
+    # Поднимаем inference executor заранее и прогреваем ffmpeg + модель,
+    # чтобы первое голосовое не платило за холодный старт. Ошибка прогрева
+    # не валит бота: модель загрузится при первом сообщении.
+    if settings.dg_api_key:
+        init_deepgram_client(settings)
+    await run_warmup(settings, ffmpeg_path=settings.ffmpeg_path)
+
+    # В polling-режиме нет FastAPI — /metrics отдаёт отдельный листенер
+    metrics_server = None
+    if settings.metrics_enabled and settings.metrics_port:
+        metrics_server = await start_metrics_server(
+            settings.metrics_host, settings.metrics_port
+        )
+
+    try:
+        logger.info("Bot started. Waiting for updates...")
+        await dp.start_polling(bot)
+        logger.info("Bot polling stopped. Shutting down.")
+    finally:
+        await stop_job_scheduler()
+        shutdown_inference_executor()
+        await close_worker_client()
+        close_transcript_cache()
+        close_user_store()
+        await close_deepgram_client()
+        if metrics_server is not None:
+            metrics_server.close()
+            await metrics_server.wait_closed()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,150 @@
+import asyncio
+import os
+
+import numpy as np
+import pytest
+
+from app.utils import audio
+from app.utils.audio import (
+    DEFAULT_FFMPEG_MAX_CONCURRENCY,
+    SAMPLE_RATE,
+    check_ffmpeg_available,
+    convert_audio_bytes_async,
+    convert_audio_stream_to_pcm_async,
+    convert_audio_to_pcm_async,
+    set_ffmpeg_concurrency,
+)
+from app.warmup import synthetic_clip_wav
+
+FFMPEG_PATH = os.getenv("FFMPEG_PATH")
+
+pytestmark = pytest.mark.skipif(
+    not check_ffmpeg_available(FFMPEG_PATH), reason="ffmpeg is not found"
+)
+
+
+@pytest.fixture(autouse=True)
+def ffmpeg_slots():
+    yield
+    set_ffmpeg_concurrency(DEFAULT_FFMPEG_MAX_CONCURRENCY)
+
+
+async def _chunks(data: bytes, size: int = 4096):
+    for i in range(0, len(data), size):
+        yield data[i : i + size]
+        await asyncio.sleep(0)
+
+
+def test_bytes_are_decoded_to_pcm():
+    pcm = asyncio.run(
+        convert_audio_to_pcm_async(synthetic_clip_wav(1.0), ffmpeg_path=FFMPEG_PATH)
+    )
+    assert pcm.dtype == np.float32
+    assert pcm.size == SAMPLE_RATE
+
+
+def test_bytes_are_converted_to_wav():
+    wav = asyncio.run(
+        convert_audio_bytes_async(synthetic_clip_wav(0.5), ffmpeg_path=FFMPEG_PATH)
+    )
+    assert wav[:4] == b"RIFF"
+
+
+def test_stream_matches_whole_file_decoding():
+    data = synthetic_clip_wav(2.0)
+
+    async def main() -> tuple[np.ndarray, np.ndarray]:
+        whole = await convert_audio_to_pcm_async(data, ffmpeg_path=FFMPEG_PATH)
+        streamed = await convert_audio_stream_to_pcm_async(
+            _chunks(data), ffmpeg_path=FFMPEG_PATH
+        )
+        return whole, streamed
+
+    whole, streamed = asyncio.run(main())
+    np.testing.assert_array_equal(whole, streamed)
+
+
+def test_empty_stream_is_a_value_error():
+    with pytest.raises(ValueError):
+        asyncio.run(
+            convert_audio_stream_to_pcm_async(_chunks(b""), ffmpeg_path=FFMPEG_PATH)
+        )
+
+
+def test_garbage_is_a_runtime_error():
+    with pytest.raises(RuntimeError):
+        asyncio.run(
+            convert_audio_to_pcm_async(b"not audio" * 100, ffmpeg_path=FFMPEG_PATH)
+        )
+
+
+def test_source_error_is_propagated():
+    async def broken():
+        yield synthetic_clip_wav(0.5)[:1000]
+        raise ConnectionError("telegram went away")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(
+            convert_audio_stream_to_pcm_async(broken(), ffmpeg_path=FFMPEG_PATH)
+        )
+
+
+def test_stalled_stream_times_out():
+    async def stalled():
+        yield synthetic_clip_wav(0.5)[:1000]
+        await asyncio.sleep(60)
+
+    with pytest.raises(RuntimeError, match="не уложился"):
+        asyncio.run(
+            convert_audio_stream_to_pcm_async(
+                stalled(), ffmpeg_path=FFMPEG_PATH, timeout_s=0.5
+            )
+        )
+
+
+def test_slow_download_does_not_hold_an_ffmpeg_slot():
+    data = synthetic_clip_wav(1.0)
+
+    async def main() -> None:
+        set_ffmpeg_concurrency(1)
+        downloaded = asyncio.Event()
+
+        async def slow_download():
+            yield data[:1000]
+            await downloaded.wait()
+            yield data[1000:]
+
+        streamed = asyncio.create_task(
+            convert_audio_stream_to_pcm_async(
+                slow_download(), ffmpeg_path=FFMPEG_PATH
+            )
+        )
+        await asyncio.sleep(0.1)
+
+        # единственный слот свободен, пока поток ещё качается
+        whole = await asyncio.wait_for(
+            convert_audio_to_pcm_async(data, ffmpeg_path=FFMPEG_PATH), timeout=10
+        )
+        downloaded.set()
+        np.testing.assert_array_equal(await streamed, whole)
+
+    asyncio.run(main())
+
+
+def test_decode_tail_waits_for_a_slot():
+    data = synthetic_clip_wav(1.0)
+
+    async def main() -> None:
+        set_ffmpeg_concurrency(1)
+        # слот занят: поток докачивается, но декодирование ждёт его
+        async with audio._ffmpeg_semaphore:
+            streamed = asyncio.create_task(
+                convert_audio_stream_to_pcm_async(
+                    _chunks(data), ffmpeg_path=FFMPEG_PATH
+                )
+            )
+            await asyncio.sleep(0.5)
+            assert not streamed.done()
+        assert (await streamed).size == SAMPLE_RATE
+
+    asyncio.run(main())
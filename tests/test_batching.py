@@ -0,0 +1,267 @@
+import asyncio
+import importlib.util
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.config import Settings, TranscriberBackend
+from app.transcription.batching import MAX_BATCH_CLIP_SAMPLES, MicroBatcher
+
+
+def _clip(value: float) -> np.ndarray:
+    return np.full(16000, value, dtype=np.float32)
+
+
+class Runner:
+    """Фейковый инференс: текст — первый сэмпл клипа, вызовы запоминаются."""
+
+    def __init__(self, *, error: Exception | None = None) -> None:
+        self.batches: list[int] = []
+        self.singles = 0
+        self.error = error
+
+    async def run_batch(self, pcms: list[np.ndarray]) -> list[str]:
+        self.batches.append(len(pcms))
+        if self.error is not None:
+            raise self.error
+        return [str(pcm[0]) for pcm in pcms]
+
+    async def run_single(self, pcm: np.ndarray) -> str:
+        self.singles += 1
+        return str(pcm[0])
+
+
+def _batcher(runner: Runner, *, window_s: float = 0.05, max_batch: int = 8):
+    return MicroBatcher(
+        runner.run_batch,
+        runner.run_single,
+        window_s=window_s,
+        max_batch=max_batch,
+    )
+
+
+def test_concurrent_clips_share_one_batch():
+    runner = Runner()
+
+    async def main() -> list[str]:
+        batcher = _batcher(runner)
+        return await asyncio.gather(*(batcher.transcribe(_clip(i)) for i in range(3)))
+
+    assert asyncio.run(main()) == ["0.0", "1.0", "2.0"]
+    assert runner.batches == [3]
+    assert runner.singles == 0
+
+
+def test_full_batch_is_flushed_without_waiting_for_the_window():
+    runner = Runner()
+
+    async def main() -> list[str]:
+        batcher = _batcher(runner, window_s=60, max_batch=2)
+        return await asyncio.wait_for(
+            asyncio.gather(*(batcher.transcribe(_clip(i)) for i in range(2))),
+            timeout=5,
+        )
+
+    assert asyncio.run(main()) == ["0.0", "1.0"]
+    assert runner.batches == [2]
+
+
+def test_lonely_clip_takes_the_single_path():
+    runner = Runner()
+
+    async def main() -> str:
+        return await _batcher(runner).transcribe(_clip(7))
+
+    assert asyncio.run(main()) == "7.0"
+    assert runner.batches == []
+    assert runner.singles == 1
+
+
+def test_batch_error_reaches_every_waiter():
+    runner = Runner(error=RuntimeError("CUDA out of memory"))
+
+    async def main() -> list:
+        batcher = _batcher(runner)
+        return await asyncio.gather(
+            *(batcher.transcribe(_clip(i)) for i in range(2)),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_cancelled_waiter_is_dropped_from_the_batch():
+    runner = Runner()
+
+    async def main() -> list[str]:
+        batcher = _batcher(runner)
+        gone = asyncio.create_task(batcher.transcribe(_clip(0)))
+        stay = [asyncio.create_task(batcher.transcribe(_clip(i))) for i in (1, 2)]
+        await asyncio.sleep(0)
+        gone.cancel()
+        return await asyncio.gather(*stay)
+
+    assert asyncio.run(main()) == ["1.0", "2.0"]
+    assert runner.batches == [2]
+
+
+def test_close_fails_pending_clips():
+    runner = Runner()
+
+    async def main() -> None:
+        batcher = _batcher(runner, window_s=60)
+        task = asyncio.create_task(batcher.transcribe(_clip(0)))
+        await asyncio.sleep(0)
+        batcher.close()
+        with pytest.raises(RuntimeError, match="closed"):
+            await task
+
+    asyncio.run(main())
+    assert runner.batches == []
+
+
+def test_only_clips_within_one_window_are_accepted():
+    assert MicroBatcher.accepts(np.zeros(MAX_BATCH_CLIP_SAMPLES, dtype=np.float32))
+    assert not MicroBatcher.accepts(
+        np.zeros(MAX_BATCH_CLIP_SAMPLES + 1, dtype=np.float32)
+    )
+    assert not MicroBatcher.accepts(np.zeros(0, dtype=np.float32))
+
+
+# --- whisper_backend: проверки качества пакетного пути ---
+
+needs_whisper = pytest.mark.skipif(
+    importlib.util.find_spec("whisper") is None,
+    reason="openai-whisper is not installed",
+)
+
+
+def _result(**kwargs) -> SimpleNamespace:
+    fields = {
+        "text": "hello",
+        "tokens": [1, 2, 3],
+        "compression_ratio": 1.2,
+        "avg_logprob": -0.3,
+        "no_speech_prob": 0.01,
+    }
+    fields.update(kwargs)
+    return SimpleNamespace(**fields)
+
+
+@pytest.mark.parametrize(
+    "fields, verdict",
+    [
+        ({}, "ok"),
+        ({"compression_ratio": 3.0}, "retry"),
+        ({"avg_logprob": -1.5}, "retry"),
+        ({"tokens": [0] * 224}, "retry"),
+        # как в model.transcribe: тишина не ретраится, а выбрасывается
+        ({"avg_logprob": -1.5, "no_speech_prob": 0.9}, "silence"),
+        ({"no_speech_prob": 0.9}, "ok"),
+    ],
+)
+@needs_whisper
+def test_batch_verdict_mirrors_transcribe_thresholds(fields, verdict):
+    from app.transcription import whisper_backend
+
+    assert whisper_backend._batch_verdict(_result(**fields), 224) == verdict
+
+
+@pytest.fixture
+def settings() -> Settings:
+    return Settings(
+        bot_token="x",
+        transcriber_backend=TranscriberBackend.WHISPER,
+        debug=False,
+        log_dir=Path("logs"),
+        ffmpeg_path=None,
+        whisper_model="tiny-test",
+    )
+
+
+@pytest.fixture
+def tiny_model(monkeypatch):
+    """Модель со случайными весами: веса не скачиваются, нужна только форма."""
+    import torch
+    from whisper.model import ModelDimensions, Whisper
+
+    from app.transcription import whisper_backend
+
+    torch.manual_seed(0)
+    dims = ModelDimensions(
+        n_mels=80,
+        n_audio_ctx=1500,
+        n_audio_state=64,
+        n_audio_head=2,
+        n_audio_layer=1,
+        n_vocab=51865,
+        n_text_ctx=448,
+        n_text_state=64,
+        n_text_head=2,
+        n_text_layer=1,
+    )
+    model = Whisper(dims).eval()
+    monkeypatch.setattr(
+        whisper_backend, "get_model", lambda name=None, settings=None: model
+    )
+    monkeypatch.setitem(whisper_backend._model_locks, "tiny-test", threading.Lock())
+    return model
+
+
+@needs_whisper
+@pytest.mark.parametrize("beam_size", [None, 2])
+def test_batch_decode_returns_one_result_per_clip(tiny_model, beam_size):
+    import torch
+    import whisper
+
+    from app.transcription import whisper_backend
+
+    options = whisper.DecodingOptions(
+        language="en",
+        beam_size=beam_size,
+        fp16=False,
+        without_timestamps=True,
+        sample_len=4,
+    )
+    mels = torch.stack(
+        [
+            whisper.log_mel_spectrogram(whisper.pad_or_trim(torch.zeros(16000)))
+            for _ in range(3)
+        ]
+    )
+    results = whisper_backend._decode_batch(tiny_model, mels, options)
+    assert len(results) == 3
+
+
+@needs_whisper
+def test_suspicious_batch_results_are_retried_unbatched(
+    tiny_model, settings, monkeypatch
+):
+    from app.transcription import whisper_backend
+
+    verdicts = iter(["ok", "retry", "silence"])
+    monkeypatch.setattr(
+        whisper_backend, "_batch_verdict", lambda result, max_tokens: next(verdicts)
+    )
+    monkeypatch.setattr(
+        whisper_backend,
+        "_decode_batch",
+        lambda model, mels, options: [_result(text=f" t{i} ") for i in range(3)],
+    )
+    retried = []
+
+    def transcribe_pcm(pcm, model_name=None, language=None, *, settings=None):
+        retried.append(pcm)
+        return "unbatched"
+
+    monkeypatch.setattr(whisper_backend, "transcribe_pcm", transcribe_pcm)
+
+    pcms = [_clip(i) for i in range(3)]
+    texts = whisper_backend.transcribe_pcm_batch(pcms, settings=settings)
+
+    assert texts == ["t0", "unbatched", ""]
+    assert len(retried) == 1 and retried[0] is pcms[1]
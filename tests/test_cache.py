@@ -0,0 +1,89 @@
+import asyncio
+
+from app.transcription.cache import TranscriptCache
+
+
+def _cache(tmp_path=None) -> TranscriptCache:
+    db_path = tmp_path / "cache.db" if tmp_path is not None else None
+    return TranscriptCache(max_entries=10, ttl_s=60, db_path=db_path)
+
+
+def test_concurrent_requests_share_one_computation(tmp_path):
+    async def main() -> None:
+        cache = _cache(tmp_path)
+        calls = 0
+
+        async def factory() -> str:
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "text"
+
+        results = await asyncio.gather(
+            *(cache.get_or_compute("key", factory) for _ in range(5))
+        )
+        assert results == ["text"] * 5
+        assert calls == 1
+        stats = cache.stats()
+        assert stats["misses"] == 1
+        assert stats["coalesced"] == 4
+        assert stats["inflight"] == 0
+
+        # второй заход — из памяти, без factory
+        assert await cache.get_or_compute("key", factory) == "text"
+        assert calls == 1
+        assert cache.stats()["hits_memory"] == 1
+        cache.close()
+
+    asyncio.run(main())
+
+
+def test_factory_error_reaches_all_waiters_and_is_not_cached():
+    async def main() -> None:
+        cache = _cache()
+
+        async def failing() -> str:
+            await asyncio.sleep(0.01)
+            raise RuntimeError("backend down")
+
+        results = await asyncio.gather(
+            *(cache.get_or_compute("key", failing) for _ in range(3)),
+            return_exceptions=True,
+        )
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert await cache.get("key") is None
+
+        async def working() -> str:
+            return "text"
+
+        assert await cache.get_or_compute("key", working) == "text"
+
+    asyncio.run(main())
+
+
+def test_disk_layer_survives_a_new_instance(tmp_path):
+    async def main() -> None:
+        first = _cache(tmp_path)
+        await first.put("key", "text")
+        first.close()
+
+        second = _cache(tmp_path)
+        assert await second.get("key") == "text"
+        assert second.stats()["hits_disk"] == 1
+        # после диска значение поднято в память
+        assert await second.get("key") == "text"
+        assert second.stats()["hits_memory"] == 1
+        second.close()
+
+    asyncio.run(main())
+
+
+def test_expired_entries_are_misses():
+    async def main() -> None:
+        cache = TranscriptCache(max_entries=10, ttl_s=0.0)
+        await cache.put("key", "text")
+        await asyncio.sleep(0.01)
+        assert await cache.get("key") is None
+        assert cache.stats()["misses"] == 1
+
+    asyncio.run(main())
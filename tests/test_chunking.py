@@ -0,0 +1,110 @@
+import asyncio
+
+import numpy as np
+
+from app.transcription.chunking import (
+    overlap_words,
+    split_on_silence,
+    stitch_texts,
+    transcribe_chunked,
+)
+from app.utils.audio import SAMPLE_RATE
+
+
+def _tone(seconds: float, amplitude: float = 0.3) -> np.ndarray:
+    t = np.arange(int(seconds * SAMPLE_RATE), dtype=np.float32) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * 220.0 * t)).astype(np.float32)
+
+
+def test_stitch_removes_repeated_words_at_the_seam():
+    assert (
+        stitch_texts(["мы пошли домой и", "Домой, и там уснули"])
+        == "мы пошли домой и там уснули"
+    )
+
+
+def test_stitch_keeps_a_single_shared_word():
+    # одно совпавшее слово — скорее совпадение, чем повтор
+    assert stitch_texts(["я сказал да", "да конечно"]) == "я сказал да да конечно"
+
+
+def test_stitch_within_known_overlap_removes_a_single_word():
+    # оба чанка распознали одну и ту же секунду звука
+    window = overlap_words(1.0)
+    assert (
+        stitch_texts(
+            ["я сказал да", "да конечно"],
+            max_overlap_words=window,
+            min_overlap_words=1,
+        )
+        == "я сказал да конечно"
+    )
+
+
+def test_stitch_ignores_matches_longer_than_the_overlap():
+    first = "раз два три четыре пять шесть"
+    second = "раз два три четыре пять шесть семь"
+    assert stitch_texts([first, second], max_overlap_words=4, min_overlap_words=1) == (
+        f"{first} {second}"
+    )
+    assert overlap_words(0) == 0
+
+
+def test_stitch_skips_empty_texts():
+    assert stitch_texts(["", "раз два", "", "два три"]) == "раз два два три"
+    assert stitch_texts(["раз два", "", "раз два три"]) == "раз два три"
+    assert stitch_texts([]) == ""
+
+
+def test_short_audio_is_one_chunk():
+    pcm = _tone(5)
+    chunks = split_on_silence(pcm, chunk_s=10, overlap_s=1)
+    assert len(chunks) == 1
+    assert chunks[0].pcm is pcm
+
+
+def test_split_prefers_silence_and_covers_everything():
+    # 8 с тона, 0.5 с тишины, 8 с тона: граница должна попасть в тишину
+    pcm = np.concatenate([_tone(8), np.zeros(SAMPLE_RATE // 2, np.float32), _tone(8)])
+    chunks = split_on_silence(pcm, chunk_s=10, overlap_s=1, search_s=5)
+
+    assert len(chunks) == 2
+    first, second = chunks
+    boundary_s = first.duration_s
+    assert 8.0 <= boundary_s <= 8.5
+    # второй кусок начинается на overlap_s раньше конца первого
+    assert abs(second.start_s - (boundary_s - 1)) < 1e-3
+    assert second.start_s + second.duration_s == pcm.size / SAMPLE_RATE
+    # куски — view, без копий
+    assert np.shares_memory(first.pcm, pcm)
+
+
+def test_transcribe_chunked_reports_partials_in_order():
+    pcm = np.concatenate([_tone(8), np.zeros(SAMPLE_RATE // 2, np.float32), _tone(8)])
+    partials: list[str] = []
+    calls = 0
+
+    async def transcribe_one(chunk: np.ndarray) -> str:
+        nonlocal calls
+        calls += 1
+        # первый кусок отвечает позже второго
+        if calls == 1:
+            await asyncio.sleep(0.02)
+            return "раз два три"
+        return "два три четыре"
+
+    async def on_partial(text: str) -> None:
+        partials.append(text)
+
+    text = asyncio.run(
+        transcribe_chunked(
+            pcm,
+            transcribe_one,
+            chunk_s=10,
+            overlap_s=1,
+            max_parallel=2,
+            on_partial=on_partial,
+        )
+    )
+    assert text == "раз два три четыре"
+    assert partials == ["раз два три четыре"]
@@ -0,0 +1,195 @@
+import asyncio
+import contextvars
+import importlib.util
+import os
+import threading
+import time
+from concurrent.futures import BrokenExecutor
+
+import pytest
+
+from app.config import InferenceExecutorKind
+from app.transcription import executor as executor_module
+from app.transcription.executor import (
+    InferenceCancelled,
+    InferenceExecutor,
+    raise_if_cancelled,
+)
+
+_request = contextvars.ContextVar("request", default=None)
+
+
+def _ok_init() -> None:
+    return None
+
+
+def _crash() -> None:
+    # как OOM-kill: процесс-воркер умирает без исключения
+    os._exit(1)
+
+
+def _pid() -> int:
+    return os.getpid()
+
+
+@pytest.fixture
+def flaky_init(monkeypatch):
+    """Инициализатор, который падает на первом вызове (модель не загрузилась)."""
+    calls = []
+
+    def init() -> None:
+        calls.append(threading.get_ident())
+        if len(calls) == 1:
+            raise RuntimeError("model volume is not mounted")
+
+    monkeypatch.setattr(executor_module, "_init_worker", init)
+    return calls
+
+
+def test_submit_runs_off_the_loop_and_keeps_contextvars(monkeypatch):
+    monkeypatch.setattr(executor_module, "_init_worker", _ok_init)
+
+    async def main() -> None:
+        executor = InferenceExecutor(InferenceExecutorKind.THREAD, workers=2)
+        _request.set("job-1")
+        loop_thread = threading.get_ident()
+
+        def work(x: int) -> tuple[int, str | None, bool]:
+            return x * 2, _request.get(), threading.get_ident() != loop_thread
+
+        assert await executor.submit(work, 21) == (42, "job-1", True)
+        executor.shutdown()
+
+    asyncio.run(main())
+
+
+def test_thread_pool_is_recreated_after_initializer_failure(flaky_init):
+    async def main() -> None:
+        executor = InferenceExecutor(InferenceExecutorKind.THREAD)
+        with pytest.raises(BrokenExecutor):
+            await executor.start()
+
+        # следующий вызов поднимает новый пул, а не отдаёт сломанный
+        await executor.start()
+        assert await executor.submit(sum, [1, 2, 3]) == 6
+        assert len(flaky_init) == 2
+        executor.shutdown()
+
+    asyncio.run(main())
+
+
+def test_process_pool_is_recreated_after_a_worker_dies(monkeypatch):
+    monkeypatch.setattr(executor_module, "_init_worker", _ok_init)
+
+    async def main() -> None:
+        executor = InferenceExecutor(InferenceExecutorKind.PROCESS)
+        first_pid = await executor.submit(_pid)
+
+        with pytest.raises(BrokenExecutor):
+            await executor.submit(_crash)
+
+        second_pid = await executor.submit(_pid)
+        assert second_pid != first_pid
+        executor.shutdown()
+
+    asyncio.run(main())
+
+
+def test_cancelled_submit_stops_the_running_thread_job(monkeypatch):
+    monkeypatch.setattr(executor_module, "_init_worker", _ok_init)
+    started = threading.Event()
+    outcome: list[str] = []
+
+    def long_inference() -> None:
+        started.set()
+        try:
+            for _ in range(1000):
+                # как хук модели: проверка между шагами
+                raise_if_cancelled()
+                time.sleep(0.01)
+        except InferenceCancelled:
+            outcome.append("cancelled")
+            raise
+        outcome.append("finished")
+
+    async def main() -> None:
+        executor = InferenceExecutor(InferenceExecutorKind.THREAD)
+        task = asyncio.create_task(executor.submit(long_inference))
+        await asyncio.to_thread(started.wait)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        stopped = time.perf_counter()
+        executor.shutdown(wait=True)
+        assert time.perf_counter() - stopped < 1.0
+
+    asyncio.run(main())
+    assert outcome == ["cancelled"]
+
+
+def test_cancellation_flag_is_per_submit(monkeypatch):
+    monkeypatch.setattr(executor_module, "_init_worker", _ok_init)
+
+    async def main() -> None:
+        executor = InferenceExecutor(InferenceExecutorKind.THREAD)
+        # вне пула и в соседней задаче флага нет — проверка ничего не делает
+        raise_if_cancelled()
+        assert await executor.submit(lambda: raise_if_cancelled() or "ok") == "ok"
+        executor.shutdown()
+
+    asyncio.run(main())
+
+
+@pytest.mark.skipif(
+    importlib.util.find_spec("whisper") is None,
+    reason="openai-whisper is not installed",
+)
+def test_whisper_decoding_is_interrupted_by_cancel(monkeypatch):
+    import torch
+    import whisper
+    from whisper.model import ModelDimensions, Whisper
+
+    from app.transcription import whisper_backend
+
+    monkeypatch.setattr(executor_module, "_init_worker", _ok_init)
+    torch.manual_seed(0)
+    model = Whisper(
+        ModelDimensions(
+            n_mels=80,
+            n_audio_ctx=1500,
+            n_audio_state=64,
+            n_audio_head=2,
+            n_audio_layer=1,
+            n_vocab=51865,
+            n_text_ctx=448,
+            n_text_state=64,
+            n_text_head=2,
+            n_text_layer=1,
+        )
+    ).eval()
+    whisper_backend._install_cancel_hooks(model)
+    mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(torch.zeros(16000)))
+    options = whisper.DecodingOptions(language="en", fp16=False, sample_len=8)
+    started = threading.Event()
+
+    def many_decodes() -> None:
+        started.set()
+        # без хуков это несколько секунд работы после отмены
+        for _ in range(300):
+            whisper.decode(model, mel, options)
+
+    async def main() -> None:
+        executor = InferenceExecutor(InferenceExecutorKind.THREAD)
+        task = asyncio.create_task(executor.submit(many_decodes))
+        await asyncio.to_thread(started.wait)
+        await asyncio.sleep(0.2)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        stopped = time.perf_counter()
+        executor.shutdown(wait=True)
+        assert time.perf_counter() - stopped < 2.0
+
+    asyncio.run(main())
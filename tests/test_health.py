@@ -0,0 +1,177 @@
+import asyncio
+from dataclasses import replace
+from pathlib import Path
+
+import pytest
+
+from app.config import InferenceExecutorKind, Settings, TranscriberBackend
+from app.transcription import health
+from app.transcription.deepgram_backend import DeepgramError
+from app.transcription.health import (
+    BackendHealth,
+    CircuitBreaker,
+    CircuitState,
+    LatencyTracker,
+    is_outage,
+)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(health.time, "monotonic", lambda: now[0])
+    return now
+
+
+def _breaker() -> CircuitBreaker:
+    return CircuitBreaker(name="test", failure_threshold=2, reset_timeout_s=30)
+
+
+def test_opens_after_threshold_consecutive_failures(clock):
+    breaker = _breaker()
+    breaker.record_failure()
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.allow_request()
+
+    # успех сбрасывает счётчик подряд идущих ошибок
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitState.CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+    assert not breaker.allow_request()
+
+
+def test_half_open_lets_exactly_one_probe_through(clock):
+    breaker = _breaker()
+    breaker.record_failure()
+    breaker.record_failure()
+
+    clock[0] += 29
+    assert not breaker.allow_request()
+
+    clock[0] += 1
+    assert breaker.state == CircuitState.HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+
+def test_probe_success_closes_and_failure_reopens(clock):
+    breaker = _breaker()
+    breaker.record_failure()
+    breaker.record_failure()
+
+    clock[0] += 30
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+    assert not breaker.allow_request()
+
+    clock[0] += 30
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.allow_request()
+
+
+def test_cancelled_probe_frees_the_slot(clock):
+    breaker = _breaker()
+    breaker.record_failure()
+    breaker.record_failure()
+    clock[0] += 30
+
+    assert breaker.allow_request()
+    breaker.record_cancelled()
+    assert breaker.allow_request()
+
+
+def test_latency_percentile():
+    tracker = LatencyTracker(window=5)
+    assert tracker.percentile(95) is None
+    for latency in [5.0, 1.0, 2.0, 3.0, 4.0, 0.5]:
+        tracker.record(latency)
+
+    # окно — последние пять значений
+    assert len(tracker) == 5
+    assert tracker.percentile(0) == 0.5
+    assert tracker.percentile(50) == 2.0
+    assert tracker.percentile(100) == 4.0
+
+
+@pytest.fixture
+def settings() -> Settings:
+    return Settings(
+        bot_token="x",
+        transcriber_backend=TranscriberBackend.DEEPGRAM,
+        debug=False,
+        log_dir=Path("logs"),
+        ffmpeg_path=None,
+        dg_breaker_failures=2,
+        dg_hedge_enabled=True,
+    )
+
+
+@pytest.mark.parametrize(
+    "error, outage",
+    [
+        (DeepgramError("Deepgram request failed", transient=True), True),
+        (DeepgramError("status=503", status_code=503, transient=True), True),
+        (DeepgramError("status=400", status_code=400), False),
+        (DeepgramError("Deepgram returned invalid JSON"), False),
+        (TimeoutError(), True),
+        (ConnectionResetError(), True),
+        (ValueError("bug"), False),
+    ],
+)
+def test_only_outages_count_as_failures(error, outage):
+    assert is_outage(error) is outage
+
+
+def test_client_errors_do_not_open_the_circuit(settings):
+    backend = BackendHealth(settings, name="Deepgram", fallback="whisper")
+
+    async def remote() -> str:
+        raise DeepgramError("status=400", status_code=400)
+
+    async def fallback() -> str:
+        return "whisper"
+
+    async def main() -> list[str]:
+        return [await backend.run(remote, fallback) for _ in range(5)]
+
+    # каждый запрос всё равно получает текст от fallback'а
+    assert asyncio.run(main()) == ["whisper"] * 5
+    assert backend.breaker.state == CircuitState.CLOSED
+
+
+def test_outages_open_the_circuit(settings):
+    backend = BackendHealth(settings, name="Deepgram", fallback="whisper")
+
+    async def remote() -> str:
+        raise DeepgramError("status=502", status_code=502, transient=True)
+
+    async def fallback() -> str:
+        return "whisper"
+
+    async def main() -> None:
+        for _ in range(2):
+            await backend.run(remote, fallback)
+
+    asyncio.run(main())
+    assert backend.breaker.state == CircuitState.OPEN
+
+
+@pytest.mark.parametrize(
+    "kind, hedged",
+    [
+        (InferenceExecutorKind.THREAD, True),
+        # уже запущенный в процессе/воркере Whisper не остановить
+        (InferenceExecutorKind.PROCESS, False),
+        (InferenceExecutorKind.REMOTE, False),
+    ],
+)
+def test_hedging_only_onto_a_cancellable_executor(settings, kind, hedged):
+    settings = replace(settings, inference_executor=kind)
+    backend = BackendHealth(settings, name="Deepgram", fallback="whisper")
+    assert backend.hedge_enabled is hedged
@@ -0,0 +1,50 @@
+import json
+import logging
+
+import pytest
+
+from app import tracing
+from app.config import Settings, TranscriberBackend
+from app.logging_config import close_logging, setup_logging
+from app.tracing import setup_tracing
+
+
+@pytest.fixture
+def settings(tmp_path) -> Settings:
+    return Settings(
+        bot_token="x",
+        transcriber_backend=TranscriberBackend.WHISPER,
+        debug=False,
+        log_dir=tmp_path,
+        ffmpeg_path=None,
+        log_format="json",
+    )
+
+
+@pytest.fixture(autouse=True)
+def restore_logging():
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    yield
+    close_logging()
+    tracing._enabled = False
+    tracing._trace_logger.handlers.clear()
+    root.handlers[:] = handlers
+    root.setLevel(level)
+
+
+def test_reconfiguring_logging_keeps_the_trace_writer(settings):
+    setup_logging(settings)
+    setup_tracing(settings)
+    # повторная настройка логов (например, из worker.py) не трогает трейсы
+    setup_logging(settings)
+
+    with tracing.trace("voice_message", user_id=1):
+        logging.getLogger("test").info("inside the trace")
+    close_logging()
+
+    traces = (settings.log_dir / tracing.TRACE_FILE_NAME).read_text("utf-8")
+    assert json.loads(traces.splitlines()[0])["name"] == "voice_message"
+
+    line = (settings.log_dir / "bot.log").read_text("utf-8").splitlines()[-1]
+    assert json.loads(line)["message"] == "inside the trace"
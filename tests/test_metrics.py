@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+
+from app import metrics
+from app.metrics import AudioThroughput, Counter, Gauge, Histogram
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    """Тестовые метрики — в отдельном реестре, не в /metrics приложения."""
+    registry = metrics.MetricsRegistry()
+    monkeypatch.setattr(metrics, "REGISTRY", registry)
+    return registry
+
+
+def test_counter_renders_prometheus_text(registry):
+    counter = Counter("jobs_total", "Jobs.", ("backend",))
+    counter.inc(backend="whisper")
+    counter.inc(2, backend="whisper")
+    counter.inc(backend='say "hi"\n')
+
+    assert registry.render().splitlines() == [
+        "# HELP jobs_total Jobs.",
+        "# TYPE jobs_total counter",
+        'jobs_total{backend="say \\"hi\\"\\n"} 1',
+        'jobs_total{backend="whisper"} 3',
+    ]
+
+
+def test_wrong_labels_are_rejected():
+    counter = Counter("jobs_total", "Jobs.", ("backend",))
+    with pytest.raises(ValueError, match="expected labels"):
+        counter.inc(model="tiny")
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("wait_seconds", "Wait.", buckets=(1.0, 0.1))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value)
+
+    assert histogram.render()[2:] == [
+        'wait_seconds_bucket{le="0.1"} 1',
+        'wait_seconds_bucket{le="1"} 3',
+        'wait_seconds_bucket{le="+Inf"} 4',
+        "wait_seconds_sum 4.25",
+        "wait_seconds_count 4",
+    ]
+
+
+def test_histogram_timer_records_failed_blocks():
+    histogram = Histogram("step_seconds", "Step.", ("caller",))
+    with pytest.raises(RuntimeError), histogram.time(caller="bot"):
+        raise RuntimeError("ffmpeg failed")
+    assert 'step_seconds_count{caller="bot"} 1' in histogram.render()
+
+
+def test_gauge_function_is_computed_on_render():
+    gauge = Gauge("depth", "Depth.")
+    depth = [3]
+    gauge.set_function(lambda: depth[0])
+    assert gauge.render()[-1] == "depth 3"
+
+    depth[0] = 5
+    assert gauge.render()[-1] == "depth 5"
+
+
+def test_failing_gauge_function_does_not_break_the_page(registry):
+    gauge = Gauge("broken", "Broken.")
+    gauge.set_function(lambda: 1 / 0)
+    Counter("ok_total", "Ok.").inc()
+
+    page = registry.render()
+    assert "\nok_total 1\n" in page
+    assert "\nbroken " not in page
+
+
+def test_observe_backend_counts_outcomes(monkeypatch):
+    total = Counter("calls_total", "Calls.", ("backend", "outcome"))
+    seconds = Histogram("calls_seconds", "Calls.", ("backend",))
+    monkeypatch.setattr(metrics, "TRANSCRIPTIONS_TOTAL", total)
+    monkeypatch.setattr(metrics, "INFERENCE_SECONDS", seconds)
+
+    with metrics.observe_backend("whisper"):
+        pass
+    with pytest.raises(ValueError), metrics.observe_backend("whisper"):
+        raise ValueError("bad audio")
+
+    samples = total.render()
+    assert 'calls_total{backend="whisper",outcome="success"} 1' in samples
+    assert 'calls_total{backend="whisper",outcome="error"} 1' in samples
+    assert 'calls_seconds_count{backend="whisper"} 2' in seconds.render()
+
+
+def test_audio_throughput_uses_a_sliding_window(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(metrics.time, "monotonic", lambda: now[0])
+    throughput = AudioThroughput(window_s=10.0)
+
+    throughput.record(30.0)
+    now[0] += 5
+    throughput.record(20.0)
+    assert throughput.rate() == 5.0
+
+    # первая запись выпала из окна
+    now[0] += 6
+    assert throughput.rate() == 2.0
+
+
+def test_metrics_listener_serves_only_the_metrics_path(registry):
+    Counter("ok_total", "Ok.").inc()
+
+    async def get(port: int, path: str) -> bytes:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: x\r\n\r\n".encode())
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        return response
+
+    async def scenario() -> tuple[bytes, bytes]:
+        server = await metrics.start_metrics_server("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            return await get(port, "/metrics?x=1"), await get(port, "/")
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    page, missing = asyncio.run(scenario())
+    assert page.startswith(b"HTTP/1.1 200 OK")
+    assert page.endswith(b"ok_total 1\n")
+    assert missing.startswith(b"HTTP/1.1 404")
@@ -0,0 +1,97 @@
+from pathlib import Path
+
+import pytest
+
+from app.config import Settings, TranscriberBackend
+from app.transcription.routing import JobInfo, JobRouter, parse_rules
+
+RULES = """
+    kind=voice, duration<=30 -> whisper:base;
+    size>20MB -> deepgram;
+    lang=en|de -> faster_whisper:small;
+    duration<=600 -> whisper:small;
+    * -> deepgram
+"""
+
+
+def _settings() -> Settings:
+    return Settings(
+        bot_token="x",
+        transcriber_backend=TranscriberBackend.WHISPER,
+        debug=False,
+        log_dir=Path("logs"),
+        ffmpeg_path=None,
+    )
+
+
+def test_parse_rules():
+    rules = parse_rules(RULES)
+    assert [rule.target for rule in rules] == [
+        "whisper:base",
+        "deepgram",
+        "faster-whisper:small",
+        "whisper:small",
+        "deepgram",
+    ]
+    assert rules[0].text == "kind=voice, duration<=30 -> whisper:base"
+    assert rules[-1].conditions == ()
+
+
+@pytest.mark.parametrize(
+    "job, target",
+    [
+        (JobInfo("voice", duration_s=12), "whisper:base"),
+        (JobInfo("audio", duration_s=12), "whisper:small"),
+        (JobInfo("voice", duration_s=40, file_size=25 * 1024 * 1024), "deepgram"),
+        (JobInfo("audio", duration_s=900, language="EN"), "faster-whisper:small"),
+        (JobInfo("audio", duration_s=900), "deepgram"),
+        # неизвестная длительность не подходит под duration<=...
+        (JobInfo("voice"), "deepgram"),
+    ],
+)
+def test_first_matching_rule_wins(job, target):
+    matched = next(rule for rule in parse_rules(RULES) if rule.matches(job))
+    assert matched.target == target
+
+
+@pytest.mark.parametrize(
+    "text, message",
+    [
+        ("duration<=30 whisper", "no '->'"),
+        ("duration<=30 -> whisperx", "unknown backend"),
+        ("duration~30 -> whisper", "invalid condition"),
+        ("size>20XB -> whisper", "invalid size"),
+        ("duration<=abc -> whisper", "invalid duration"),
+        ("kind=sticker -> whisper", "unknown kind"),
+        ("* -> deepgram:nova", "not configurable"),
+    ],
+)
+def test_invalid_rules_name_the_rule(text, message):
+    with pytest.raises(ValueError, match=message) as exc_info:
+        parse_rules(text)
+    assert text in str(exc_info.value)
+
+
+def test_empty_rules():
+    assert parse_rules("") == []
+    assert parse_rules(" ; ;") == []
+
+
+def test_router_replaces_backend_and_model():
+    settings = _settings()
+    router = JobRouter(parse_rules(RULES))
+
+    routed = router.route(settings, JobInfo("voice", duration_s=5))
+    assert routed.transcriber_backend == TranscriberBackend.WHISPER
+    assert routed.whisper_model == "base"
+    assert settings.whisper_model != "base"
+
+    routed = router.route(settings, JobInfo("audio", duration_s=5000))
+    assert routed.transcriber_backend == TranscriberBackend.DEEPGRAM
+    assert routed.whisper_model == settings.whisper_model
+
+
+def test_router_without_match_keeps_settings():
+    settings = _settings()
+    router = JobRouter(parse_rules("kind=voice -> deepgram"))
+    assert router.route(settings, JobInfo("audio")) is settings
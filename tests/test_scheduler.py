@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from app.scheduler import JobScheduler, QueueFullError
+
+
+async def _wait_until(predicate) -> None:
+    for _ in range(100):
+        if predicate():
+            return
+        await asyncio.sleep(0)
+    raise AssertionError("condition not reached")
+
+
+def test_round_robin_between_users_and_shortest_first_within_user():
+    async def main() -> list[str]:
+        scheduler = JobScheduler(workers=1, max_queue_depth=10)
+        gate = asyncio.Event()
+        order: list[str] = []
+
+        def job(name: str):
+            async def run() -> str:
+                order.append(name)
+                return name
+
+            return run
+
+        async def blocker() -> None:
+            await gate.wait()
+
+        # единственный воркер занят — остальное копится в очереди
+        first = asyncio.create_task(scheduler.run(0, 1, blocker))
+        await _wait_until(lambda: scheduler.in_flight == 1)
+
+        tasks = [
+            asyncio.create_task(scheduler.run(user, duration, job(name)))
+            for user, duration, name in [
+                (1, 30, "a30"),
+                (1, 10, "a10"),
+                (1, 20, "a20"),
+                (2, 50, "b50"),
+            ]
+        ]
+        await _wait_until(lambda: scheduler.depth == 4)
+
+        gate.set()
+        await asyncio.gather(first, *tasks)
+        await scheduler.stop()
+        return order
+
+    assert asyncio.run(main()) == ["a10", "b50", "a20", "a30"]
+
+
+def test_queue_limit_rejects_new_jobs():
+    async def main() -> None:
+        scheduler = JobScheduler(workers=1, max_queue_depth=2)
+        gate = asyncio.Event()
+
+        async def blocker() -> None:
+            await gate.wait()
+
+        running = asyncio.create_task(scheduler.run(1, 5, blocker))
+        await _wait_until(lambda: scheduler.in_flight == 1)
+        queued = [
+            asyncio.create_task(scheduler.run(1, 5, blocker)) for _ in range(2)
+        ]
+        await _wait_until(lambda: scheduler.depth == 2)
+
+        # выполняющаяся задача в лимит не входит, ждущие — входят
+        with pytest.raises(QueueFullError):
+            await scheduler.run(2, 5, blocker)
+
+        gate.set()
+        await asyncio.gather(running, *queued)
+        assert scheduler.depth == 0
+        await scheduler.stop()
+
+    asyncio.run(main())
+
+
+def test_job_exception_reaches_caller():
+    async def main() -> None:
+        scheduler = JobScheduler(workers=2, max_queue_depth=10)
+
+        async def boom() -> None:
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError, match="boom"):
+            await scheduler.run(1, None, boom)
+        assert scheduler.in_flight == 0
+        await scheduler.stop()
+
+    asyncio.run(main())
+
+
+def test_stop_cancels_queued_jobs():
+    async def main() -> None:
+        scheduler = JobScheduler(workers=1, max_queue_depth=10)
+        gate = asyncio.Event()
+
+        async def blocker() -> None:
+            await gate.wait()
+
+        running = asyncio.create_task(scheduler.run(1, 5, blocker))
+        await _wait_until(lambda: scheduler.in_flight == 1)
+        queued = asyncio.create_task(scheduler.run(2, 5, blocker))
+        await _wait_until(lambda: scheduler.depth == 1)
+
+        await scheduler.stop()
+        results = await asyncio.gather(running, queued, return_exceptions=True)
+        assert all(isinstance(r, asyncio.CancelledError) for r in results)
+        assert scheduler.depth == 0
+
+    asyncio.run(main())
@@ -0,0 +1,152 @@
+import asyncio
+from dataclasses import replace
+from pathlib import Path
+
+import numpy as np
+import pytest
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+
+from app.config import Settings, TranscriberBackend
+from app.handlers.streaming import MAX_MESSAGE_LEN, ProgressiveReply
+from app.transcription import _chunk_length
+from app.utils.audio import SAMPLE_RATE
+
+
+class FakeMessage:
+    """Заглушка-сообщение: запоминает правки и ответы."""
+
+    def __init__(self, *, edit_errors: list[Exception] | None = None) -> None:
+        self.text = "…"
+        self.edits: list[str] = []
+        self.replies: list[str] = []
+        self._edit_errors = list(edit_errors or [])
+
+    async def edit_text(self, text: str, **kwargs) -> None:
+        if self._edit_errors:
+            raise self._edit_errors.pop(0)
+        self.edits.append(text)
+        self.text = text
+
+    async def reply(self, text: str, **kwargs) -> None:
+        self.replies.append(text)
+
+
+def _bad_request(message: str) -> TelegramBadRequest:
+    return TelegramBadRequest(method=None, message=message)
+
+
+def test_partial_edits_are_coalesced():
+    async def main() -> FakeMessage:
+        message = FakeMessage()
+        reply = ProgressiveReply(message, min_interval_s=0.05)
+        # сразу после отправки заглушки правка откладывается
+        for i in range(5):
+            await reply.update(f"part {i}")
+        await asyncio.sleep(0.1)
+        return message
+
+    # пять частичных текстов — одна правка, с самым свежим
+    assert asyncio.run(main()).edits == ["part 4"]
+
+
+def test_finalize_cancels_pending_edit():
+    async def main() -> FakeMessage:
+        message = FakeMessage()
+        reply = ProgressiveReply(message, min_interval_s=0.05)
+        await reply.update("partial")
+        await reply.finalize("final")
+        await reply.update("late partial")
+        await asyncio.sleep(0.1)
+        return message
+
+    assert asyncio.run(main()).edits == ["final"]
+
+
+def test_long_final_text_is_split_into_replies():
+    text = " ".join(["слово"] * 2000)
+
+    async def main() -> FakeMessage:
+        message = FakeMessage()
+        await ProgressiveReply(message, min_interval_s=0).finalize(text)
+        return message
+
+    message = asyncio.run(main())
+    parts = message.edits + message.replies
+    assert len(message.edits) == 1
+    assert len(parts) == 3
+    assert all(len(part) <= MAX_MESSAGE_LEN for part in parts)
+    assert " ".join(parts) == text
+
+
+def test_failed_final_edit_falls_back_to_a_reply():
+    async def main() -> FakeMessage:
+        message = FakeMessage(edit_errors=[_bad_request("message can't be edited")])
+        await ProgressiveReply(message, min_interval_s=0).finalize("final")
+        return message
+
+    message = asyncio.run(main())
+    assert message.edits == []
+    assert message.replies == ["final"]
+
+
+def test_final_edit_waits_out_rate_limit():
+    async def main() -> FakeMessage:
+        error = TelegramRetryAfter(method=None, message="slow down", retry_after=0)
+        message = FakeMessage(edit_errors=[error])
+        await ProgressiveReply(message, min_interval_s=0).finalize("final")
+        return message
+
+    message = asyncio.run(main())
+    assert message.edits == ["final"]
+    assert message.replies == []
+
+
+def test_not_modified_is_not_an_error():
+    async def main() -> FakeMessage:
+        message = FakeMessage(edit_errors=[_bad_request("message is not modified")])
+        await ProgressiveReply(message, min_interval_s=0).finalize("same")
+        return message
+
+    assert asyncio.run(main()).replies == []
+
+
+@pytest.fixture
+def settings() -> Settings:
+    return Settings(
+        bot_token="x",
+        transcriber_backend=TranscriberBackend.WHISPER,
+        debug=False,
+        log_dir=Path("logs"),
+        ffmpeg_path=None,
+        chunk_threshold_s=180,
+        chunk_length_s=60,
+    )
+
+
+async def _on_partial(text: str) -> None:
+    return None
+
+
+@pytest.mark.parametrize(
+    "seconds, streaming, expected",
+    [
+        (120, False, None),
+        # по умолчанию стриминг не режет клип короче порога
+        (120, True, None),
+        (300, False, 60),
+        (300, True, 60),
+    ],
+)
+def test_streaming_does_not_change_chunking_by_default(
+    settings, seconds, streaming, expected
+):
+    pcm = np.zeros(seconds * SAMPLE_RATE, dtype=np.float32)
+    on_partial = _on_partial if streaming else None
+    assert _chunk_length(pcm, settings, on_partial) == expected
+
+
+def test_streaming_chunk_s_opts_into_shorter_chunks(settings):
+    settings = replace(settings, streaming_chunk_s=30)
+    pcm = np.zeros(120 * SAMPLE_RATE, dtype=np.float32)
+    assert _chunk_length(pcm, settings, _on_partial) == 30
+    assert _chunk_length(pcm, settings, None) is None
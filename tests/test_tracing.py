@@ -0,0 +1,115 @@
+import asyncio
+import logging
+
+import pytest
+
+from app import tracing
+from app.config import InferenceExecutorKind
+from app.scheduler import JobScheduler
+from app.tracing import bind, current_job_id, span, trace
+from app.transcription import executor as executor_module
+from app.transcription.executor import InferenceExecutor
+
+
+@pytest.fixture
+def exported(monkeypatch):
+    """Включает трейсинг; готовые трейсы складываются в список вместо файла."""
+    traces: list[dict] = []
+
+    def export(owner, root):
+        traces.append(
+            {
+                "job_id": owner.job_id,
+                "root": root,
+                "spans": {s.name: s for s in owner.spans},
+            }
+        )
+
+    monkeypatch.setattr(tracing, "_enabled", True)
+    monkeypatch.setattr(tracing, "_export", export)
+    return traces
+
+
+def _job_ids_in_worker(bound: bool) -> tuple[str | None, str | None]:
+    """job_id трейса и job_id, который увидела задача в воркере планировщика."""
+
+    async def main():
+        scheduler = JobScheduler(workers=1, max_queue_depth=10)
+
+        async def noop() -> None:
+            return None
+
+        # воркер создаётся вне трейса — как в боте, на первом сообщении
+        await scheduler.run(0, 1, noop)
+
+        async def job() -> str | None:
+            with span("download"):
+                return current_job_id()
+
+        with trace("voice_message") as root:
+            seen = await scheduler.run(1, 1, bind(job) if bound else job)
+        # контекст воркера после задачи прежний
+        after = await scheduler.run(0, 1, lambda: asyncio.sleep(0, current_job_id()))
+        await scheduler.stop()
+        assert after is None
+        return root.trace.job_id, seen
+
+    return asyncio.run(main())
+
+
+def test_bind_carries_the_trace_into_the_scheduler_worker(exported):
+    job_id, seen = _job_ids_in_worker(bound=True)
+    assert seen == job_id
+
+    [record] = exported
+    spans = record["spans"]
+    assert spans["download"].parent_id == spans["voice_message"].span_id
+
+
+def test_without_bind_the_worker_does_not_see_the_trace(exported):
+    _, seen = _job_ids_in_worker(bound=False)
+    assert seen is None
+    assert "download" not in exported[0]["spans"]
+
+
+def test_bind_outside_a_trace_returns_the_factory(exported):
+    async def job() -> None:
+        return None
+
+    assert bind(job) is job
+
+
+def test_thread_executor_keeps_the_trace(exported, monkeypatch):
+    # без загрузки модели в инициализаторе потока
+    monkeypatch.setattr(executor_module, "_init_worker", lambda: None)
+    executor = InferenceExecutor(InferenceExecutorKind.THREAD, workers=1)
+
+    def decode() -> str | None:
+        with span("whisper_decode"):
+            return current_job_id()
+
+    async def main():
+        with trace("voice_message") as root:
+            seen = await executor.submit(decode)
+        return root.trace.job_id, seen
+
+    try:
+        job_id, seen = asyncio.run(main())
+    finally:
+        executor.shutdown()
+
+    assert seen == job_id
+    assert "whisper_decode" in exported[0]["spans"]
+
+
+def test_job_id_is_added_to_log_records(exported):
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, "msg", (), None)
+    job_filter = tracing.JobIdFilter()
+
+    with trace("voice_message") as root:
+        job_filter.filter(record)
+    assert record.job_id == root.trace.job_id
+
+    outside = logging.LogRecord("test", logging.INFO, __file__, 1, "msg", (), None)
+    job_filter.filter(outside)
+    assert outside.job_id == "-"
@@ -0,0 +1,81 @@
+import asyncio
+import importlib.util
+import threading
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app import transcription
+from app.config import InferenceExecutorKind, Settings, TranscriberBackend
+
+
+def _settings(model: str) -> Settings:
+    return Settings(
+        bot_token="x",
+        transcriber_backend=TranscriberBackend.FASTER_WHISPER,
+        debug=False,
+        log_dir=Path("logs"),
+        ffmpeg_path=None,
+        whisper_model=model,
+        inference_executor=InferenceExecutorKind.THREAD,
+    )
+
+
+@pytest.fixture
+def engines(monkeypatch):
+    """faster-whisper падает, обычный Whisper отвечает; вызовы запоминаются."""
+    calls: list[str] = []
+
+    async def transcribe_local(pcm, settings, on_partial=None, *, faster=False):
+        calls.append("faster-whisper" if faster else "whisper")
+        if faster:
+            raise RuntimeError("CUDA out of memory")
+        return "text"
+
+    monkeypatch.setattr(transcription, "faster_whisper_available", lambda: True)
+    monkeypatch.setattr(transcription, "_transcribe_local", transcribe_local)
+    return calls
+
+
+def test_faster_whisper_falls_back_to_the_same_whisper_model(engines):
+    pcm = np.zeros(16000, dtype=np.float32)
+    text = asyncio.run(transcription.transcribe(pcm, settings=_settings("small")))
+    assert text == "text"
+    assert engines == ["faster-whisper", "whisper"]
+
+
+@pytest.mark.parametrize(
+    "model", ["distil-large-v3", "Systran/faster-whisper-small", "/models/ct2"]
+)
+def test_no_fallback_for_faster_whisper_only_models(engines, model):
+    pcm = np.zeros(16000, dtype=np.float32)
+    with pytest.raises(RuntimeError, match="CUDA"):
+        asyncio.run(transcription.transcribe(pcm, settings=_settings(model)))
+    assert engines == ["faster-whisper"]
+
+
+@pytest.mark.skipif(
+    importlib.util.find_spec("whisper") is None,
+    reason="openai-whisper is not installed",
+)
+def test_whisper_backend_uses_the_job_settings(monkeypatch):
+    from app.transcription import whisper_backend
+
+    class FakeModel:
+        def transcribe(self, audio, **options):
+            self.options = options
+            return {"text": " hi ", "language": "en"}
+
+    def no_env():
+        raise AssertionError("settings must come from the job")
+
+    model = FakeModel()
+    monkeypatch.setattr(whisper_backend, "get_settings", no_env)
+    monkeypatch.setitem(whisper_backend._models, "fake", model)
+    monkeypatch.setitem(whisper_backend._model_locks, "fake", threading.Lock())
+
+    settings = _settings("fake")
+    pcm = np.zeros(16000, dtype=np.float32)
+    assert whisper_backend.transcribe_pcm(pcm, settings=settings) == "hi"
+    assert model.options["beam_size"] == settings.whisper_beam_size
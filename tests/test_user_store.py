@@ -0,0 +1,155 @@
+import asyncio
+from dataclasses import replace
+from pathlib import Path
+
+import pytest
+
+from app import user_store
+from app.config import Settings, TranscriberBackend, UserStoreBackend
+from app.user_store import SqliteLanguageBackend, UserLanguageStore
+
+
+class FlakyBackend:
+    """Бэкенд в памяти, запись в который падает заданное число раз."""
+
+    def __init__(self, failures: int = 0) -> None:
+        self.data: dict[int, str] = {}
+        self.failures = failures
+        self.reads = 0
+
+    def get(self, user_id: int) -> str | None:
+        self.reads += 1
+        return self.data.get(user_id)
+
+    def put_many(self, items: dict[int, str]) -> None:
+        if self.failures:
+            self.failures -= 1
+            raise OSError("disk is full")
+        self.data.update(items)
+
+    def close(self) -> None:
+        return None
+
+
+def _store(backend, **kwargs) -> UserLanguageStore:
+    options = {"cache_size": 100, "cache_ttl_s": 30.0, "flush_interval_s": 60.0}
+    options.update(kwargs)
+    return UserLanguageStore(backend, **options)
+
+
+@pytest.fixture
+def settings(tmp_path) -> Settings:
+    return Settings(
+        bot_token="x",
+        transcriber_backend=TranscriberBackend.WHISPER,
+        debug=False,
+        log_dir=tmp_path / "logs",
+        ffmpeg_path=None,
+        user_store_path=tmp_path / "users.db",
+    )
+
+
+@pytest.fixture(autouse=True)
+def no_shared_stores():
+    yield
+    user_store.close_user_store()
+
+
+def test_memory_store_keeps_choices_in_process():
+    store = _store(None)
+    assert store.get(1) is None
+    store.set(1, "en")
+    assert store.get(1) == "en"
+    store.close()
+
+
+def test_writes_are_batched_until_flush():
+    backend = FlakyBackend()
+    store = _store(backend)
+    store.set(1, "en")
+    store.set(2, "ru")
+
+    # запись сразу видна в этом процессе, но бэкенд ещё не тронут
+    assert store.get(1) == "en"
+    assert backend.data == {}
+
+    store.flush()
+    assert backend.data == {1: "en", 2: "ru"}
+    store.close()
+
+
+def test_failed_flush_is_retried_without_losing_newer_writes():
+    backend = FlakyBackend(failures=1)
+    store = _store(backend)
+    store.set(1, "en")
+    store.flush()
+    assert backend.data == {}
+
+    store.set(1, "ru")
+    store.flush()
+    assert backend.data == {1: "ru"}
+    store.close()
+
+
+def test_load_reads_a_miss_off_the_loop_and_caches_it():
+    backend = FlakyBackend()
+    backend.data[1] = "de"
+    store = _store(backend)
+
+    asyncio.run(store.load(1))
+    assert store.get(1) == "de"
+    assert store.get(1) == "de"
+    assert backend.reads == 1
+    store.close()
+
+
+def test_missing_language_is_cached_too():
+    store = _store(FlakyBackend())
+    asyncio.run(store.load(1))
+    assert store.get(1) is None
+    assert store.stats()["hits"] == 1
+    store.close()
+
+
+def test_close_persists_pending_writes(tmp_path):
+    path = tmp_path / "users.db"
+    store = _store(SqliteLanguageBackend(path))
+    store.set(7, "uk")
+    store.close()
+
+    # другой процесс (новое хранилище на том же файле) видит выбор
+    other = _store(SqliteLanguageBackend(path))
+    asyncio.run(other.load(7))
+    assert other.get(7) == "uk"
+    other.close()
+
+
+def test_lru_evicts_only_when_backed():
+    backend = FlakyBackend()
+    store = _store(backend, cache_size=2)
+    for user_id in range(3):
+        store.set(user_id, "en")
+    store.flush()
+    assert store.stats()["cached"] == 2
+    store.close()
+
+    memory = _store(None, cache_size=2)
+    for user_id in range(3):
+        memory.set(user_id, "en")
+    assert memory.get(0) == "en"
+    memory.close()
+
+
+def test_default_backend_writes_nothing_to_disk(settings):
+    user_store.init_user_store(settings)
+    user_store.get_user_store().set(1, "en")
+    user_store.close_user_store()
+    assert not Path(settings.user_store_path).exists()
+
+
+def test_redis_without_url_falls_back_to_sqlite(settings):
+    settings = replace(settings, user_store_backend=UserStoreBackend.REDIS)
+    user_store.init_user_store(settings)
+    user_store.get_user_store().set(1, "en")
+    user_store.close_user_store()
+    assert Path(settings.user_store_path).exists()
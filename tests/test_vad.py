@@ -0,0 +1,62 @@
+import numpy as np
+
+from app.utils.audio import SAMPLE_RATE
+from app.utils.vad import FRAME_MS, speech_mask, trim_silence
+
+
+def _tone(seconds: float, amplitude: float = 0.3) -> np.ndarray:
+    t = np.arange(int(seconds * SAMPLE_RATE), dtype=np.float32) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * 220.0 * t)).astype(np.float32)
+
+
+def _silence(seconds: float) -> np.ndarray:
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+
+
+def test_silence_is_dropped_entirely():
+    trimmed, stats = trim_silence(_silence(3))
+    assert trimmed.size == 0
+    assert stats.all_silent
+    assert stats.kept_s == 0.0
+
+
+def test_leading_and_trailing_silence_are_trimmed():
+    pcm = np.concatenate([_silence(2), _tone(1), _silence(2)])
+    trimmed, stats = trim_silence(pcm, padding_s=0.1)
+
+    assert not stats.all_silent
+    # тон + паддинг с обеих сторон (с точностью до кадра)
+    assert 1.0 <= stats.kept_s <= 1.2 + 2 * FRAME_MS / 1000
+    assert stats.leading_s > 1.5
+    assert stats.trailing_s > 1.5
+    assert stats.pauses_s == 0
+    assert abs(stats.removed_s - (stats.original_s - stats.kept_s)) < 1e-9
+    assert trimmed.size == round(stats.kept_s * SAMPLE_RATE)
+
+
+def test_long_pause_is_shortened_to_max_pause():
+    pcm = np.concatenate([_tone(1), _silence(5), _tone(1)])
+    _, stats = trim_silence(pcm, max_pause_s=1.0, padding_s=0.0)
+
+    assert 2.9 <= stats.kept_s <= 3.1
+    assert 3.9 <= stats.pauses_s <= 4.1
+    assert stats.leading_s == 0 and stats.trailing_s == 0
+
+
+def test_short_pause_is_kept():
+    pcm = np.concatenate([_tone(1), _silence(0.5), _tone(1)])
+    trimmed, _ = trim_silence(pcm, max_pause_s=1.0, padding_s=0.0)
+    assert trimmed.size == pcm.size
+
+
+def test_clip_shorter_than_a_frame_is_kept_as_is():
+    pcm = _tone(0.01)
+    trimmed, stats = trim_silence(pcm)
+    assert trimmed is pcm
+    assert not stats.all_silent
+
+
+def test_continuous_speech_is_not_treated_as_silence():
+    # сплошная речь без пауз: порог не должен подняться выше сигнала
+    mask = speech_mask(_tone(3), padding_s=0.0)
+    assert mask.all()
@@ -0,0 +1,78 @@
+import asyncio
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app import warmup
+from app.config import InferenceExecutorKind, Settings, TranscriberBackend
+from app.transcription import executor as executor_module
+from app.transcription.executor import (
+    get_inference_executor,
+    shutdown_inference_executor,
+)
+
+
+@pytest.fixture
+def settings() -> Settings:
+    return Settings(
+        bot_token="x",
+        transcriber_backend=TranscriberBackend.WHISPER,
+        debug=False,
+        log_dir=Path("logs"),
+        ffmpeg_path=None,
+        inference_executor=InferenceExecutorKind.THREAD,
+        inference_workers=1,
+        warmup_retry_initial_s=0.01,
+        warmup_retry_max_s=0.02,
+    )
+
+
+@pytest.fixture(autouse=True)
+def fake_pipeline(monkeypatch):
+    monkeypatch.setattr(warmup, "readiness", warmup.ReadinessState())
+    monkeypatch.setattr(warmup, "check_ffmpeg_available", lambda path: True)
+
+    async def convert(data, **kwargs) -> np.ndarray:
+        return np.zeros(16000, dtype=np.float32)
+
+    async def transcribe(pcm, *, settings) -> str:
+        # как настоящий Whisper — через пул executor'а
+        return await get_inference_executor(settings).submit(str, "")
+
+    monkeypatch.setattr(warmup, "convert_audio_to_pcm_async", convert)
+    monkeypatch.setattr(warmup, "transcribe", transcribe)
+    yield
+    shutdown_inference_executor()
+
+
+def test_failed_model_load_is_retried_until_ready(monkeypatch, settings):
+    attempts = []
+
+    def init() -> None:
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RuntimeError("model volume is not mounted")
+
+    monkeypatch.setattr(executor_module, "_init_worker", init)
+
+    asyncio.run(warmup.run_warmup(settings, retry=True))
+
+    ready, report = warmup.readiness_report(settings)
+    assert ready
+    assert report["warmup_attempts"] == 3
+    assert report["warmup_error"] is None
+
+
+def test_single_attempt_without_retry(monkeypatch, settings):
+    def init() -> None:
+        raise RuntimeError("model volume is not mounted")
+
+    monkeypatch.setattr(executor_module, "_init_worker", init)
+
+    asyncio.run(warmup.run_warmup(settings))
+
+    ready, report = warmup.readiness_report(settings)
+    assert not ready
+    assert report["warmup_attempts"] == 1
+    assert report["warmup_error"]
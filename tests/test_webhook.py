@@ -0,0 +1,90 @@
+import asyncio
+import logging
+
+from app.webhook import BackgroundUpdateProcessor, UpdateDeduplicator
+
+
+def test_repeated_update_is_a_duplicate():
+    dedup = UpdateDeduplicator(window_size=10)
+    assert not dedup.is_duplicate(1)
+    dedup.remember(1)
+    dedup.remember(1)
+    assert dedup.is_duplicate(1)
+    assert not dedup.is_duplicate(2)
+
+
+def test_window_forgets_the_oldest_updates():
+    dedup = UpdateDeduplicator(window_size=2)
+    for update_id in (1, 2, 3):
+        dedup.remember(update_id)
+    assert not dedup.is_duplicate(1)
+    assert dedup.is_duplicate(2) and dedup.is_duplicate(3)
+
+
+def test_processor_rejects_updates_over_the_limit():
+    async def scenario():
+        processor = BackgroundUpdateProcessor(max_tasks=1)
+        release = asyncio.Event()
+        assert processor.submit(release.wait, name="first")
+        assert not processor.submit(release.wait, name="second")
+        assert processor.active == 1
+
+        release.set()
+        await processor.drain(timeout_s=1)
+        assert processor.active == 0
+
+    asyncio.run(scenario())
+
+
+def test_drain_waits_for_running_tasks_and_closes_intake():
+    async def scenario():
+        processor = BackgroundUpdateProcessor(max_tasks=4)
+        done = []
+
+        async def handle():
+            await asyncio.sleep(0.05)
+            done.append(True)
+
+        processor.submit(handle, name="update")
+        await processor.drain(timeout_s=1)
+        assert done == [True]
+        assert not processor.submit(handle, name="late")
+
+    asyncio.run(scenario())
+
+
+def test_drain_cancels_tasks_that_overrun_the_timeout():
+    async def scenario():
+        processor = BackgroundUpdateProcessor(max_tasks=4)
+        cancelled = asyncio.Event()
+
+        async def hang():
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        processor.submit(hang, name="stuck")
+        await asyncio.sleep(0)
+        await processor.drain(timeout_s=0.05)
+        assert cancelled.is_set()
+        assert processor.active == 0
+
+    asyncio.run(scenario())
+
+
+def test_failed_task_is_logged_and_frees_its_slot(caplog):
+    async def scenario():
+        processor = BackgroundUpdateProcessor(max_tasks=1)
+
+        async def fail():
+            raise RuntimeError("boom")
+
+        processor.submit(fail, name="update-7")
+        await processor.drain(timeout_s=1)
+        assert processor.active == 0
+
+    with caplog.at_level(logging.ERROR, logger="app.webhook"):
+        asyncio.run(scenario())
+    assert "update-7 failed" in caplog.text
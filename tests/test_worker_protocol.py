@@ -0,0 +1,118 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.transcription.worker_protocol import (
+    FLAG_LANGUAGE,
+    FLAG_MODEL,
+    FLAG_PCM_S16,
+    HEADER,
+    Frame,
+    Op,
+    ProtocolError,
+    decode_transcribe,
+    encode_transcribe,
+    pack_frame,
+    parse_address,
+    read_frame,
+)
+
+
+def _read(data: bytes, *, eof: bool = True) -> Frame | None:
+    async def main() -> Frame | None:
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        if eof:
+            reader.feed_eof()
+        return await read_frame(reader)
+
+    return asyncio.run(main())
+
+
+def _read_all(data: bytes) -> list[Frame]:
+    async def main() -> list[Frame]:
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        frames = []
+        while (frame := await read_frame(reader)) is not None:
+            frames.append(frame)
+        return frames
+
+    return asyncio.run(main())
+
+
+def test_frame_round_trip():
+    frames = [
+        Frame(op=Op.TRANSCRIBE, request_id=7, payload=b"\x00\x01" * 100, flags=1),
+        Frame(op=Op.HEALTH, request_id=8),
+        Frame(op=Op.RESULT, request_id=2**32 - 1, payload="привет".encode()),
+    ]
+    assert _read_all(b"".join(pack_frame(f) for f in frames)) == frames
+
+
+def test_clean_eof_returns_none():
+    assert _read(b"") is None
+
+
+def test_truncated_header_is_a_protocol_error():
+    with pytest.raises(ProtocolError):
+        _read(pack_frame(Frame(op=Op.HEALTH, request_id=1))[:5])
+
+
+def test_bad_version_and_op_are_rejected():
+    with pytest.raises(ProtocolError, match="version"):
+        _read(HEADER.pack(99, Op.HEALTH, 0, 1, 0))
+    with pytest.raises(ProtocolError, match="op"):
+        _read(HEADER.pack(1, 0x7F, 0, 1, 0))
+
+
+def test_oversized_payload_is_rejected_before_reading():
+    with pytest.raises(ProtocolError, match="too large"):
+        _read(HEADER.pack(1, Op.TRANSCRIBE, 0, 1, 2**31), eof=False)
+
+
+@pytest.mark.parametrize("pcm_format", ["s16", "f32"])
+@pytest.mark.parametrize(
+    "model, language", [(None, None), ("small", None), (None, "ru"), ("base", "en")]
+)
+def test_transcribe_payload_round_trip(pcm_format, model, language):
+    pcm = np.linspace(-1.0, 1.0, 1600, dtype=np.float32)
+    payload, flags = encode_transcribe(pcm, pcm_format, model, language)
+
+    assert bool(flags & FLAG_PCM_S16) == (pcm_format == "s16")
+    assert bool(flags & FLAG_MODEL) == (model is not None)
+    assert bool(flags & FLAG_LANGUAGE) == (language is not None)
+
+    frame = _read(pack_frame(Frame(Op.TRANSCRIBE, 1, payload, flags)))
+    decoded, decoded_model, decoded_language = decode_transcribe(
+        frame.payload, frame.flags
+    )
+    assert (decoded_model, decoded_language) == (model, language)
+    assert decoded.dtype == np.float32
+    np.testing.assert_allclose(decoded, pcm, atol=1 / 16384)
+
+
+def test_truncated_model_name_is_a_value_error():
+    payload, flags = encode_transcribe(np.zeros(4, np.float32), "f32", "small")
+    with pytest.raises(ValueError):
+        decode_transcribe(payload[:3], flags)
+
+
+@pytest.mark.parametrize(
+    "address, expected",
+    [
+        ("unix:/run/voice2text.sock", ("unix", "/run/voice2text.sock", 0)),
+        ("10.0.0.5:8765", ("tcp", "10.0.0.5", 8765)),
+        (":8765", ("tcp", "127.0.0.1", 8765)),
+    ],
+)
+def test_parse_address(address, expected):
+    assert parse_address(address) == expected
+
+
+@pytest.mark.parametrize("address", ["localhost", "host:port", ""])
+def test_parse_address_rejects_garbage(address):
+    with pytest.raises(ValueError):
+        parse_address(address)
@@ -1,16 +1,32 @@
 # webapp.py
 from __future__ import annotations
 
+import asyncio
 import logging
 
 from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from aiogram import Bot
 from aiogram.types import Update
+from pydantic import ValidationError
 
 from app.config import get_settings
 from app.logging_config import setup_logging
+from app.tracing import setup_tracing
 from app.bot import create_dispatcher
 from app.utils.audio import check_ffmpeg_available
+from app.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, render_metrics
+from app.warmup import readiness_report, run_warmup
+from app.webhook import BackgroundUpdateProcessor, UpdateDeduplicator
+from app.scheduler import stop_job_scheduler
+from app.transcription.cache import close_transcript_cache
+from app.user_store import close_user_store, init_user_store
+from app.transcription.deepgram_backend import (
+    close_deepgram_client,
+    init_deepgram_client,
+)
+from app.transcription.executor import shutdown_inference_executor
+from app.transcription.worker_client import close_worker_client
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +34,7 @@ logger = logging.getLogger(__name__)
 
 settings = get_settings()
 setup_logging(settings)
+setup_tracing(settings)
 
 logger.info("Starting FastAPI webhook app. debug=%s", settings.debug)
 
@@ -47,6 +64,13 @@ dp = create_dispatcher(ffmpeg_path=settings.ffmpeg_path)
 
 logger.info("Bot and dispatcher initialized for webhook mode.")
 
+# --- Быстрый ACK: апдейты обрабатываются в фоне, повторы отбрасываются ---
+
+update_processor = BackgroundUpdateProcessor(settings.webhook_max_tasks)
+update_deduplicator = UpdateDeduplicator(settings.webhook_dedup_window)
+
+warmup_task: asyncio.Task | None = None
+
 # --- Инициализация FastAPI-приложения ---
 
 app = FastAPI()
@@ -56,12 +80,47 @@ app = FastAPI()
 async def on_startup():
     """
     Хук запуска FastAPI: хорошее место для логов "приложение поднялось".
+
+    Прогрев идёт в фоне: /health отвечает сразу, а /ready станет 200,
+    когда модель и ffmpeg прогреты. Неудачный прогрев повторяется
+    с backoff'ом.
     """
+    global warmup_task
+
+    # у каждого воркера uvicorn своё соединение к общему хранилищу языков
+    init_user_store(settings)
+    if settings.dg_api_key:
+        init_deepgram_client(settings)
+    warmup_task = asyncio.create_task(
+        run_warmup(settings, ffmpeg_path=settings.ffmpeg_path, retry=True)
+    )
+
     logger.info(
         "FastAPI application startup complete. Webhook is ready to receive updates."
     )
 
 
+@app.on_event("shutdown")
+async def on_shutdown():
+    """
+    Хук остановки FastAPI: дожидаемся фоновых апдейтов,
+    потом гасим inference executor (потоки/процессы с моделью)
+    и закрываем пул соединений Deepgram.
+    """
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+        await asyncio.gather(warmup_task, return_exceptions=True)
+
+    await update_processor.drain(settings.webhook_drain_timeout_s)
+    await stop_job_scheduler()
+    shutdown_inference_executor()
+    await close_worker_client()
+    close_transcript_cache()
+    close_user_store()
+    await close_deepgram_client()
+    logger.info("FastAPI application shutdown complete.")
+
+
 @app.get("/health")
 async def health():
     """
@@ -71,21 +130,76 @@ async def health():
     return {"status": "ok"}
 
 
+@app.get("/ready")
+async def ready():
+    """
+    Readiness для балансировщика: 200 только когда инстанс прогрет
+    (модель загружена, прогрев прошёл, ffmpeg доступен), иначе 503.
+    Заодно отдаёт текущую глубину очереди.
+    """
+    is_ready, report = readiness_report(settings)
+    return JSONResponse(status_code=200 if is_ready else 503, content=report)
+
+
+if settings.metrics_enabled:
+
+    @app.get("/metrics")
+    async def metrics():
+        """Метрики в текстовом формате Prometheus."""
+        return PlainTextResponse(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+
 @app.post(WEBHOOK_PATH)
 async def telegram_webhook(request: Request):
     """
     Endpoint, куда Telegram будет присылать апдейты.
+
+    В fast-ack режиме (по умолчанию) апдейт только валидируется и уходит
+    в фоновый пул, а Telegram сразу получает 200 — без этого долгая
+    транскрипция приводит к таймауту и повторной доставке того же апдейта.
     """
     data = await request.json()
 
-    # Легкий лог, чтобы видеть "сырые" апдейты (на первое время)
-    logger.debug("Received update from Telegram: %s", data)
+    # Только id и тип апдейта: целиком апдейт (с текстом и данными
+    # пользователя) в лог не пишем, а на INFO не тратим даже на это
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Received update from Telegram: update_id=%s, types=%s",
+            data.get("update_id"),
+            [key for key in data if key != "update_id"],
+        )
 
     # Превращаем JSON в объект Update из aiogram
-    update = Update.model_validate(data)
-
-    # Передаем апдейт в диспетчер — он уже разрулит handlers
-    await dp.feed_update(bot, update)
+    try:
+        update = Update.model_validate(data)
+    except ValidationError as exc:
+        logger.warning("Invalid update payload rejected: %s", exc)
+        return JSONResponse(status_code=400, content={"ok": False})
+
+    if not settings.webhook_fast_ack:
+        # Старый режим: ждём весь пайплайн до ответа Telegram
+        await dp.feed_update(bot, update)
+        return {"ok": True}
+
+    if update_deduplicator.is_duplicate(update.update_id):
+        logger.info("Duplicate update dropped: update_id=%s", update.update_id)
+        return {"ok": True}
+
+    accepted = update_processor.submit(
+        lambda: dp.feed_update(bot, update),
+        name=f"update-{update.update_id}",
+    )
+    if not accepted:
+        # Не запоминаем update_id: Telegram повторит доставку, и мы её примем
+        logger.warning(
+            "Background pool is full (%d tasks), asking Telegram to retry: "
+            "update_id=%s",
+            update_processor.active,
+            update.update_id,
+        )
+        return JSONResponse(status_code=503, content={"ok": False})
+
+    update_deduplicator.remember(update.update_id)
 
     # Telegram ожидает любой 2xx, но JSON ok=true — классика
     return {"ok": True}
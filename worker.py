@@ -0,0 +1,101 @@
+"""
+Standalone transcription worker: loads the Whisper model once and serves
+transcription requests from bot processes started with INFERENCE_EXECUTOR=remote.
+
+Usage:
+    python worker.py            # serve on WORKER_ADDRESS
+    python worker.py --health   # query a running worker, exit code 0 = healthy
+"""
+
+import argparse
+import asyncio
+import dataclasses
+import json
+import logging
+import signal
+import sys
+
+from app.config import InferenceExecutorKind, get_settings
+from app.logging_config import setup_logging
+from app.tracing import setup_tracing
+from app.transcription.executor import (
+    get_inference_executor,
+    shutdown_inference_executor,
+)
+from app.transcription.worker_client import WorkerClient, WorkerError
+from app.transcription.worker_server import WorkerServer
+
+logger = logging.getLogger(__name__)
+
+
+async def serve() -> None:
+    settings = get_settings()
+    # Воркер и бот обычно читают один .env: remote здесь означал бы
+    # "отправь самому себе", так что модель крутится в потоках процесса
+    if settings.inference_executor == InferenceExecutorKind.REMOTE:
+        settings = dataclasses.replace(
+            settings, inference_executor=InferenceExecutorKind.THREAD
+        )
+    setup_logging(settings)
+    setup_tracing(settings)
+
+    logger.info(
+        "Starting transcription worker. backend=%s model=%s executor=%s",
+        settings.transcriber_backend.value,
+        settings.whisper_model,
+        settings.inference_executor.value,
+    )
+
+    # модель грузится до того, как воркер начнёт принимать соединения
+    await get_inference_executor(settings).start()
+
+    server = WorkerServer(settings)
+    await server.start()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+
+    try:
+        await stop.wait()
+    finally:
+        logger.info("Stopping transcription worker. Stats: %s", server.health())
+        await server.close()
+        shutdown_inference_executor()
+
+
+async def check_health() -> int:
+    settings = get_settings()
+    client = WorkerClient(settings.worker_address, timeout_s=10.0)
+    try:
+        report = await client.health()
+    except WorkerError as e:
+        print(json.dumps({"status": "unavailable", "error": str(e)}))
+        return 1
+    finally:
+        await client.close()
+
+    print(json.dumps(report, indent=2))
+    return 0 if report.get("status") == "ok" else 1
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="voice2text transcription worker")
+    parser.add_argument(
+        "--health",
+        action="store_true",
+        help="query the worker at WORKER_ADDRESS and exit",
+    )
+    args = parser.parse_args()
+
+    if args.health:
+        sys.exit(asyncio.run(check_health()))
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()